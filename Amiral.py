@@ -9,14 +9,35 @@ Objectifs :
 - Ajouter des déterminants possessifs (mon, ma, mes, etc.) dans les GN
 """
 
+import bisect
+import hashlib
+import itertools
+import marshal
+import math
+import mmap
+import os
 import random
 import re
+import struct
+import sys
+import threading
+import time
+import warnings
+import zlib
+from array import array
+from collections import Counter, deque
+from collections.abc import Sequence
+from functools import partial
 
 # =============================================================================
 # PARAMÈTRES
 # =============================================================================
 
 NOMBRE_DE_PHRASES_SOUHAITE = 120
+# Mode parallèle : nombre de phrases par lot (indépendant du nombre de workers)
+TAILLE_LOT_PARALLELE = 1000
+# Écriture en flux : taille (en caractères) des blocs envoyés au fichier
+TAILLE_TAMPON_ECRITURE = 1 << 20
 MAX_PROFONDEUR_RECURSIVITE_CN = 4
 MAX_PROFONDEUR_RECURSIVITE_SUB = 3
 MAX_EXPANSION_DEPTH = 60
@@ -27,6 +48,272 @@ MAX_RETRY_SENTENCE = 30
 # Probabilité d'introduire un déterminant possessif (mon/ma/mes)
 POSSESSIVE_DET_PROB = 0.22
 
+# Points de décision binaires : probabilité de la branche « oui »
+PROBABILITES = {
+    "adjectif_gn": 0.40,         # GN : adjectif épithète
+    "complement_gn": 0.30,       # GN : complément du nom
+    "relative_gn": 0.22,         # GN : relative
+    "relative_sujet_qui": 0.65,  # relative en « qui » plutôt qu'en « que »
+    "finale_infinitive": 0.70,   # finale « pour + infinitif » plutôt que « pour que »
+    "objet_indefini": 0.70,      # objet indéfini plutôt que défini
+    "anaphore_pronom": 0.13,     # sujet repris par un pronom
+}
+
+# Points de décision à plusieurs issues : poids relatifs, dans l'ordre des
+# seuils (voir TableTirage). regler_poids() les modifie en cours d'exécution.
+POIDS_CHOIX = {
+    "politique_personne": {"impersonal": 0.10, "nous": 0.12, None: 0.78},
+    "sujet": {"GNImpersonnel": 0.10, "GNPersonnel": 0.14, "Coordination": 0.14, "GNDefini": 0.62},
+    "sp": {"locatif": 0.40, "moyen": 0.45, "comme": 0.15},
+}
+
+# Dédoublonnage optionnel (Generator(dedup=...)) : taille du filtre de Bloom,
+# taux de faux positifs visé, tirages max pour obtenir une phrase inédite
+MEMOIRE_FILTRE_DEDUP = 16 << 20
+TAUX_FAUX_POSITIFS_DEDUP = 1e-3
+MAX_RETRY_DOUBLON = 10
+
+# Récence lexicale optionnelle (Generator(recence=...)) : nombre de noms et
+# d'adjectifs récents retenus par classe, et facteur appliqué à leur poids
+FENETRE_RECENCE = 32
+FACTEUR_RECENCE = 0.05
+
+# =============================================================================
+# GÉNÉRATEUR COURANT
+# =============================================================================
+# L'aléa, l'anaphore (dernier GN sujet) et les paramètres appartiennent à un
+# Generator (section Génération). Les fonctions de ce module lisent celui qui
+# est actif dans le thread courant ; hors de tout Generator, c'est le
+# générateur implicite du module (random global + constantes ci-dessus).
+
+class _EtatThread(threading.local):
+    gen = None
+
+_ETAT_THREAD = _EtatThread()
+
+def _gen():
+    return _ETAT_THREAD.gen or _GENERATEUR_MODULE
+
+def _rng():
+    return (_ETAT_THREAD.gen or _GENERATEUR_MODULE).rng
+
+# =============================================================================
+# SOURCES D'ALÉA
+# =============================================================================
+# Un générateur tire son aléa dans n'importe quel objet offrant random(),
+# choice(), sample(), getrandbits() et seed() — random.Random par défaut.
+# SourceAleaRapide remplace choice()/sample() par un seul tirage uniforme
+# indexé (pas de _randbelow ni de getrandbits par appel). Avec NumPy, les
+# uniformes sont en plus pré-tirées par blocs de TAILLE_POOL_ALEA (PCG64) et
+# random() n'est plus qu'un __next__ sur la liste. Chaque source est
+# déterministe pour une graine donnée, mais leurs flux diffèrent entre eux.
+
+try:
+    import numpy
+except ImportError:  # dépendance optionnelle
+    numpy = None
+
+TAILLE_POOL_ALEA = 1 << 16
+
+class SourceAleaRapide:
+
+    def __init__(self, seed=None, use_numpy=False, taille=TAILLE_POOL_ALEA):
+        if use_numpy and numpy is None:
+            raise ImportError("SourceAleaRapide(use_numpy=True) nécessite numpy")
+        self.use_numpy = use_numpy
+        self.taille = taille
+        self.seed(seed)
+
+    def seed(self, seed=None):
+        self._base = random.Random(seed)
+        if self.use_numpy:
+            self._np = numpy.random.default_rng(self._base.getrandbits(128))
+            self.random = itertools.chain.from_iterable(self._blocs()).__next__
+        else:
+            self.random = self._base.random
+
+    def _blocs(self):
+        while True:
+            yield self._np.random(self.taille).tolist()
+
+    def choice(self, seq):
+        return seq[int(self.random() * len(seq))]
+
+    def sample(self, population, k):
+        n = len(population)
+        if not 0 <= k <= n:
+            raise ValueError("Sample larger than population or is negative")
+        suivant = self.random
+        if 3 * k <= n:
+            pris = set()
+            res = []
+            for _ in range(k):
+                j = int(suivant() * n)
+                while j in pris:
+                    j = int(suivant() * n)
+                pris.add(j)
+                res.append(population[j])
+            return res
+        pool = list(population)
+        for i in range(k):
+            j = i + int(suivant() * (n - i))
+            pool[i], pool[j] = pool[j], pool[i]
+        return pool[:k]
+
+    def getrandbits(self, k):
+        return self._base.getrandbits(k)
+
+SOURCES_ALEA = {
+    "stdlib": random.Random,
+    "rapide": SourceAleaRapide,
+    "numpy": partial(SourceAleaRapide, use_numpy=True),
+}
+
+# =============================================================================
+# TIRAGES PONDÉRÉS
+# =============================================================================
+# Une loi finie est tirée d'un seul random() : l'issue k sort quand
+# cumul[k-1] <= u < cumul[k], exactement comme dans une cascade de
+# `if u < seuil` ; la table guide (Chen & Asau) donne en O(1) l'issue par
+# où commencer, au lieu d'essayer les seuils un par un.
+
+class TableTirage:
+    """Loi catégorielle (issue -> poids relatif) tirée en temps constant."""
+
+    __slots__ = ("issues", "poids", "cumul", "guide", "_m")
+
+    def __init__(self, poids):
+        paires = list(poids.items()) if isinstance(poids, dict) else list(poids)
+        if not paires:
+            raise ValueError("TableTirage : aucune issue")
+        if any(w < 0 for _, w in paires):
+            raise ValueError("TableTirage : poids négatif")
+        total = math.fsum(w for _, w in paires)
+        if total <= 0:
+            raise ValueError("TableTirage : poids tous nuls")
+        self.issues = tuple(issue for issue, _ in paires)
+        self.poids = tuple(w for _, w in paires)
+        # Arrondi des seuils : 0.10 + 0.14 donne 0.24, le seuil tel qu'on l'écrit
+        cumul = [round(c / total, 12) for c in itertools.accumulate(self.poids)]
+        cumul[-1] = 1.0
+        self.cumul = tuple(cumul)
+        # Case j de [0, 1) : première issue possible, un cran en dessous par
+        # prudence sur l'arrondi de u * m
+        self._m = m = len(cumul)
+        self.guide = tuple(max(bisect.bisect_right(cumul, j / m) - 1, 0) for j in range(m))
+
+    def __len__(self):
+        return self._m
+
+    def probabilite(self, issue):
+        i = self.issues.index(issue)
+        return self.cumul[i] - (self.cumul[i - 1] if i else 0.0)
+
+    def tirer(self, rng):
+        u = rng.random()
+        i = self.guide[int(u * self._m)]
+        cumul = self.cumul
+        while u >= cumul[i]:
+            i += 1
+        return self.issues[i]
+
+TABLES_CHOIX = {point: TableTirage(poids) for point, poids in POIDS_CHOIX.items()}
+
+# =============================================================================
+# INSTANTANÉ DES STRUCTURES DÉRIVÉES
+# =============================================================================
+# Les structures calculées à partir du vocabulaire (index GN, participes
+# automatiques, listes ADJ_*, tables de formes, FINITE_FORMS) sont relues
+# d'un instantané marshal dans __pycache__ au lieu d'être reconstruites à
+# chaque import. Le nom du fichier porte la clé du source (sha1 de ce
+# fichier) : toute modification du module, vocabulaire compris, en produit
+# un nouveau. La charge utile est vérifiée (sha1) avant usage ; au moindre
+# doute on reconstruit, et l'instantané est réécrit en fin d'import. Les
+# caches marshal (instantané, grammaires compilées) portent tous
+# cette clé : à chaque écriture, ceux d'une autre version du source sont
+# supprimés (_purger_cache). Gain mesuré par bench_amiral.py (banc import).
+
+VERSION_INSTANTANE = 1
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "__pycache__")
+
+def _ecrire_marshal(chemin, objet):
+    """Écriture atomique (fichier temporaire + os.replace) ; échec silencieux."""
+    try:
+        os.makedirs(os.path.dirname(chemin), exist_ok=True)
+        tmp = f"{chemin}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            marshal.dump(objet, f)
+        os.replace(tmp, chemin)
+    except OSError:
+        pass
+
+def _cle_source():
+    try:
+        with open(os.path.abspath(__file__), "rb") as f:
+            source = f.read()
+    except OSError:
+        return None
+    return hashlib.sha1(source).hexdigest()[:16]
+
+def _purger_cache(dossier):
+    """
+    Supprime de `dossier` les fichiers marshal amiral_* écrits par une autre
+    version du source, y compris ceux de caches qui n'existent plus.
+    """
+    if _CLE_INSTANTANE is None:
+        return
+    tag = sys.implementation.cache_tag or "py"
+    try:
+        noms = os.listdir(dossier)
+    except OSError:
+        return
+    for nom in noms:
+        champs = nom.split(".")
+        if (champs[0].startswith("amiral_") and nom.endswith(f".{tag}.marshal") and len(champs) > 3
+                and champs[1] != _CLE_INSTANTANE):
+            try:
+                os.remove(os.path.join(dossier, nom))
+            except OSError:
+                pass
+
+def chemin_instantane(cle=None):
+    tag = sys.implementation.cache_tag or "py"
+    return os.path.join(CACHE_DIR, f"amiral_derives.{cle or _CLE_INSTANTANE}.{tag}.marshal")
+
+def _lire_instantane(cle):
+    if cle is None:
+        return {}
+    try:
+        with open(chemin_instantane(cle), "rb") as f:
+            version, cle_lue, empreinte, charge = marshal.load(f)
+        if (version, cle_lue) == (VERSION_INSTANTANE, cle) and hashlib.sha1(charge).hexdigest() == empreinte:
+            return marshal.loads(charge)
+    except (OSError, EOFError, ValueError, TypeError):
+        pass
+    return {}
+
+_CLE_INSTANTANE = _cle_source()
+_INSTANTANE = _lire_instantane(_CLE_INSTANTANE)
+_DERIVES_CONSTRUITS = {}
+# nom -> fonction de construction, pour comparer instantané et reconstruction
+_CONSTRUCTEURS_DERIVES = {}
+
+def _derive(nom, construire):
+    """Structure `nom` lue dans l'instantané, sinon construite (et notée pour l'écriture)."""
+    _CONSTRUCTEURS_DERIVES[nom] = construire
+    valeur = _INSTANTANE.get(nom)
+    if valeur is None:
+        valeur = _DERIVES_CONSTRUITS[nom] = construire()
+    return valeur
+
+def _enregistrer_instantane():
+    if not _DERIVES_CONSTRUITS or _CLE_INSTANTANE is None:
+        return
+    charge = marshal.dumps({**_INSTANTANE, **_DERIVES_CONSTRUITS})
+    _ecrire_marshal(chemin_instantane(), (VERSION_INSTANTANE, _CLE_INSTANTANE,
+                                          hashlib.sha1(charge).hexdigest(), charge))
+    _purger_cache(CACHE_DIR)
+
 # =============================================================================
 # SECTION 1 — VOCABULAIRE (patché)
 # =============================================================================
@@ -92,14 +379,34 @@ def map_gn_bases(gn_list, g, n):
     for gn in gn_list:
         GN_BASE_MAP[gn] = {'g': g, 'n': n}
 
-map_gn_bases(GN_MS_BASE, 'm', 's')
-map_gn_bases(GN_FS_BASE, 'f', 's')
-map_gn_bases(GN_MP_BASE, 'm', 'p')
-map_gn_bases(GN_FP_BASE, 'f', 'p')
+def _construire_gn_base_map():
+    map_gn_bases(GN_MS_BASE, 'm', 's')
+    map_gn_bases(GN_FS_BASE, 'f', 's')
+    map_gn_bases(GN_MP_BASE, 'm', 'p')
+    map_gn_bases(GN_FP_BASE, 'f', 'p')
+    return GN_BASE_MAP
+
+GN_BASE_MAP = _derive("GN_BASE_MAP", _construire_gn_base_map)
+
+# Index lexical (construit une fois) : tuples immuables par (genre, nombre) et
+# par nombre, dans l'ordre de GN_BASE_MAP ; (genre, nombre) positionnel par base.
+def _construire_index_gn():
+    genre_nombre = {gn: (info['g'], info['n']) for gn, info in GN_BASE_MAP.items()}
+    par_genre_nombre = {
+        (g, n): tuple(gn for gn, gn_info in genre_nombre.items() if gn_info == (g, n))
+        for g in ('m', 'f') for n in ('s', 'p')
+    }
+    par_nombre = {
+        n: tuple(gn for gn, (_g, gn_n) in genre_nombre.items() if gn_n == n)
+        for n in ('s', 'p')
+    }
+    return genre_nombre, par_genre_nombre, par_nombre
+
+GN_GENRE_NOMBRE, GN_PAR_GENRE_NOMBRE, GN_PAR_NOMBRE = _derive("INDEX_GN", _construire_index_gn)
 
 GNDefini = list(GN_BASE_MAP.keys())
-GNIndefini_Singulier = [gn for gn, info in GN_BASE_MAP.items() if info['n'] == 's']
-GNIndefini_Pluriel = [gn for gn, info in GN_BASE_MAP.items() if info['n'] == 'p']
+GNIndefini_Singulier = list(GN_PAR_NOMBRE['s'])
+GNIndefini_Pluriel = list(GN_PAR_NOMBRE['p'])
 GNIndefini = GNIndefini_Singulier + GNIndefini_Pluriel
 GNComplexe = GNDefini
 
@@ -268,20 +575,30 @@ ADJ_MORPHOLOGY = {
     "lié": {"m": {"s": "lié", "p": "liés"}, "f": {"s": "liée", "p": "liées"}},
 }
 
-for base, pp in VERBES_PASSIFS.items():
-    if pp not in ADJ_MORPHOLOGY:
-        ADJ_MORPHOLOGY[pp] = {
-            "m": {"s": pp, "p": pp + ("s" if not pp.endswith("s") else "")},
-            "f": {"s": pp + "e", "p": pp + "es"},
-        }
+def _participes_auto():
+    participes = {}
+    for base, pp in VERBES_PASSIFS.items():
+        if pp not in ADJ_MORPHOLOGY:
+            participes[pp] = {
+                "m": {"s": pp, "p": pp + ("s" if not pp.endswith("s") else "")},
+                "f": {"s": pp + "e", "p": pp + "es"},
+            }
+    return participes
+
+ADJ_MORPHOLOGY.update(_derive("ADJ_PARTICIPES", _participes_auto))
+
+def _construire_adj_formes():
+    ms, fs, mp, fp = [], [], [], []
+    for base, forms in ADJ_MORPHOLOGY.items():
+        ms.append(forms["m"]["s"])
+        fs.append(forms["f"]["s"])
+        mp.append(forms["m"]["p"])
+        fp.append(forms["f"]["p"])
+    return ms, fs, mp, fp
 
 ADJECTIFS_DISPONIBLES = list(ADJ_MORPHOLOGY.keys())
-ADJ_MS, ADJ_FS, ADJ_MP, ADJ_FP = [], [], [], []
-for base, forms in ADJ_MORPHOLOGY.items():
-    ADJ_MS.append(forms["m"]["s"])
-    ADJ_FS.append(forms["f"]["s"])
-    ADJ_MP.append(forms["m"]["p"])
-    ADJ_FP.append(forms["f"]["p"])
+ADJ_MS, ADJ_FS, ADJ_MP, ADJ_FP = _derive("ADJ_FORMES", _construire_adj_formes)
+ADJ_PAR_GENRE_NOMBRE = {('m', 's'): ADJ_MS, ('f', 's'): ADJ_FS, ('m', 'p'): ADJ_MP, ('f', 'p'): ADJ_FP}
 
 AdvConnecteur = ["De plus", "Par ailleurs", "En outre", "Dès lors", "Toutefois", "Néanmoins",
                  "De surcroît", "Nonobstant", "Ainsi", "Également"]
@@ -311,6 +628,12 @@ def _select_pronoun_from_info(g: str, n: str) -> str:
     return "il" if g == "m" else "elle"
 
 def accorder_attribut(attribut_base, sujet_g, sujet_n):
+    forme = FORMES_ADJECTIVALES.get((attribut_base, sujet_g, sujet_n))
+    if forme is not None:
+        return forme
+    return _accorder_attribut_regles(attribut_base, sujet_g, sujet_n)
+
+def _accorder_attribut_regles(attribut_base, sujet_g, sujet_n):
     if attribut_base in ADJ_MORPHOLOGY:
         return ADJ_MORPHOLOGY[attribut_base][sujet_g][sujet_n]
 
@@ -329,24 +652,35 @@ def accorder_attribut(attribut_base, sujet_g, sujet_n):
 
 def conjuguer_verbe(verbe_dict, sujet_n, sujet_g="m", verbe_cle=None, voix='active', sujet_v=None):
     if verbe_cle is None:
-        verbe_cle = random.choice(list(verbe_dict.keys()))
-
+        cles = _CLES_PAR_DICT.get(id(verbe_dict))
+        verbe_cle = _rng().choice(cles if cles is not None else list(verbe_dict.keys()))
+    forme = FORMES_VERBALES.get((verbe_cle, sujet_n, sujet_g, voix, sujet_v))
+    if forme is not None:
+        return forme
+    return _conjuguer_verbe_regles(verbe_dict, sujet_n, sujet_g, verbe_cle, voix, sujet_v)
+
+def _conjuguer_verbe_regles(verbe_dict, sujet_n, sujet_g, verbe_cle, voix, sujet_v):
     if sujet_v:
         sv = sujet_v.lower().strip()
 
+        if sv == "nous" and voix == 'passive' and verbe_cle in VERBES_PASSIFS:
+            return "sommes " + accorder_attribut(VERBES_PASSIFS[verbe_cle], sujet_g, "p")
+
         if sv == "nous":
             base_inf = verbe_cle
+            reflechi = ""
             if base_inf.startswith("se ") or base_inf.startswith("s'"):
                 base_inf = re.sub(r"^s'|^se\s", "", base_inf)
+                reflechi = "nous "  # "nous nous définissons", pas "nous définissons"
             if base_inf in GV_PERSONNEL_NOUS_EXPLICIT:
-                return GV_PERSONNEL_NOUS_EXPLICIT[base_inf]
+                return reflechi + GV_PERSONNEL_NOUS_EXPLICIT[base_inf]
             if base_inf.endswith("er"):
-                return base_inf[:-2] + "ons"
+                return reflechi + base_inf[:-2] + "ons"
             if base_inf.endswith("ir"):
-                return base_inf[:-2] + "issons"
+                return reflechi + base_inf[:-2] + "issons"
             if base_inf.endswith("re"):
-                return base_inf[:-2] + "ons"
-            return base_inf
+                return reflechi + base_inf[:-2] + "ons"
+            return reflechi + base_inf
 
         if sv == "on":
             sujet_n = "s"
@@ -373,6 +707,44 @@ def conjuguer_verbe(verbe_dict, sujet_n, sujet_g="m", verbe_cle=None, voix='acti
 
     return ""
 
+# -----------------------------------------------------------------------------
+# Tables plates de conjugaison et d'accord
+# -----------------------------------------------------------------------------
+# Forme finale de chaque (verbe, nombre, genre, voix, pronom sujet) et de
+# chaque (adjectif, genre, nombre), calculée une fois par les règles
+# ci-dessus : conjuguer_verbe et accorder_attribut se réduisent à une
+# consultation. Les dictionnaires de verbes partagent leurs clés (même verbe,
+# mêmes formes), la table est donc indexée par la clé seule. Hors table
+# (pronom inattendu, verbe ou adjectif inconnu), les règles s'appliquent.
+
+# Listes de clés figées pour les tirages (même tirage que list(d.keys()))
+CLES_GV_TRANSITIF = tuple(GVTransitif)
+CLES_GV_ATTRIBUTIF = tuple(GVAttributif)
+CLES_GV_INTRANSITIF = tuple(GVIntransitif)
+CLES_GV_MODAL = tuple(GVModalPersonal)
+CLES_GV_REFLEXIF = tuple(GVReflexifAttributif)
+CLES_VERBES_PASSIFS = tuple(VERBES_PASSIFS)
+_CLES_PAR_DICT = {id(GVTransitif): CLES_GV_TRANSITIF, id(GVAttributif): CLES_GV_ATTRIBUTIF,
+                  id(GVIntransitif): CLES_GV_INTRANSITIF, id(GVModalPersonal): CLES_GV_MODAL,
+                  id(GVReflexifAttributif): CLES_GV_REFLEXIF, id(GVPassif): CLES_VERBES_PASSIFS}
+
+PRONOMS_SUJETS = (None, "nous", "on", "il", "elle", "ils", "elles")
+
+def _table_formes_verbales():
+    table = {}
+    sources = [(d, "active") for d in (GVTransitif, GVAttributif, GVIntransitif, GVModalPersonal,
+                                       GVModalImpersonal, GVReflexifAttributif)]
+    sources.append((GVPassif, "passive"))
+    for d, voix in sources:
+        for cle in d:
+            for n, g, v in itertools.product("sp", "mf", PRONOMS_SUJETS):
+                table.setdefault((cle, n, g, voix, v), _conjuguer_verbe_regles(d, n, g, cle, voix, v))
+    return table
+
+FORMES_ADJECTIVALES = _derive("FORMES_ADJECTIVALES", lambda: {
+    (base, g, n): formes[g][n] for base, formes in ADJ_MORPHOLOGY.items() for g in "mf" for n in "sp"})
+FORMES_VERBALES = _derive("FORMES_VERBALES", _table_formes_verbales)
+
 def eliminer_article_devant_voyelle(text):
     text = re.sub(r'\b(le|la)\s+([aeiouyéèàôêïh])', r"l'\2", text, flags=re.IGNORECASE)
     text = re.sub(r'\bde\s+([aeiouyéèàôêïh])', r"d'\1", text, flags=re.IGNORECASE)
@@ -400,16 +772,16 @@ def _apply_determinant_and_elision(gn_bare, g, n, type):
     return (det + gn_bare).strip()
 
 def get_random_adjective_form_from_category(g, n):
-    if g == 'm' and n == 's': return random.choice(ADJ_MS)
-    if g == 'f' and n == 's': return random.choice(ADJ_FS)
-    if g == 'm' and n == 'p': return random.choice(ADJ_MP)
-    if g == 'f' and n == 'p': return random.choice(ADJ_FP)
-    return ""
+    formes = ADJ_PAR_GENRE_NOMBRE.get((g, n))
+    return _tirer_adjectif(_gen(), formes) if formes else ""
 
 def formatter_sp_gn_fixed(preposition, gn_info):
-    gn_str_bare = gn_info['v_bare']
-    gn_g, gn_n = gn_info['g'], gn_info['n']
-    starts = _starts_with_vowel(gn_str_bare)
+    if isinstance(gn_info, GroupeNominal):
+        gn_str_bare, gn_g, gn_n, starts = gn_info.v_bare, gn_info.g, gn_info.n, gn_info.voyelle
+    else:
+        gn_str_bare = gn_info['v_bare']
+        gn_g, gn_n = gn_info['g'], gn_info['n']
+        starts = _starts_with_vowel(gn_str_bare)
 
     p_raw = (preposition or "").strip()
     p = p_raw.lower()
@@ -450,26 +822,32 @@ def formatter_sp_gn_fixed(preposition, gn_info):
             return f"à la {gn_str_bare}"
         return f"aux {gn_str_bare}"
 
+    if isinstance(gn_info, GroupeNominal):
+        # Article déjà élidé au rendu : rien à re-analyser
+        return f"{p_raw} {gn_info.article_defini()}{gn_str_bare}"
     full_gn = _apply_determinant_and_elision(gn_str_bare, gn_g, gn_n, type='defini')
     return eliminer_article_devant_voyelle(f"{p_raw} {full_gn}")
 
 def construire_sp_locatif():
-    prepo = random.choice(["dans", "sur", "par", "via"])
-    gn_base = random.choice([b for b, i in GN_BASE_MAP.items() if i['n'] == 's'])
+    gen = _gen()
+    prepo = gen.rng.choice(["dans", "sur", "par", "via"])
+    gn_base = _tirer_nom(gen, GN_PAR_NOMBRE['s'])
     gn_info = get_gn_info(gn_base, n='s', role='complement')
     return formatter_sp_gn_fixed(prepo, gn_info)
 
 def construire_sp_moyen():
-    prepo = random.choice(["au moyen de", "grâce à", "via", "par"])
-    gn_base = random.choice([b for b, i in GN_BASE_MAP.items() if i['n'] == 's'])
+    gen = _gen()
+    prepo = gen.rng.choice(["au moyen de", "grâce à", "via", "par"])
+    gn_base = _tirer_nom(gen, GN_PAR_NOMBRE['s'])
     gn_info = get_gn_info(gn_base, n='s', role='complement')
     return formatter_sp_gn_fixed(prepo, gn_info)
 
 def construire_sp():
-    choice = random.random()
-    if choice < 0.40:
+    rng = _rng()
+    issue = TABLES_CHOIX["sp"].tirer(rng)
+    if issue == "locatif":
         return construire_sp_locatif()
-    if choice < 0.85:
+    if issue == "moyen":
         return construire_sp_moyen()
     gn = get_gn_info(GNIndefini, role="complement")
     return f"comme {gn['v']}"
@@ -478,43 +856,124 @@ def construire_sp():
 # Génération GN (récursif + relatives + possessifs)
 # =============================================================================
 
-LAST_GN_INFO = None
+class GroupeNominal:
+    """
+    GN structuré : déterminant ("defini", "indefini", "possessif" ou None),
+    tête, adjectifs postposés, complément du nom (GroupeNominal introduit
+    par « de ») et relative. Élision et contraction ne sont appliquées
+    qu'au rendu, une fois : v_bare (sans déterminant) et v sont mémorisés.
+    Se lit comme les dictionnaires GN du module (gn["v"], gn.get("is_pronoun")).
+    """
+
+    __slots__ = ("det", "tete", "adjectifs", "complement", "relative", "g", "n", "voyelle", "_nu", "_v")
+
+    def __init__(self, tete, g, n, det="defini", adjectifs=()):
+        self.det = det
+        self.tete = tete
+        self.adjectifs = adjectifs
+        self.complement = None
+        self.relative = None
+        self.g = g
+        self.n = n
+        self.voyelle = _starts_with_vowel(tete)
+        self._nu = self._v = None
+
+    @property
+    def v_bare(self):
+        if self._nu is None:
+            mots = [self.tete, *self.adjectifs]
+            if self.complement is not None:
+                mots.append(formatter_sp_gn_fixed("de", self.complement))
+            if self.relative:
+                mots.append(self.relative)
+            self._nu = " ".join(mots)
+        return self._nu
+
+    def article_defini(self):
+        if self.n != "s":
+            return "les "
+        return "l'" if self.voyelle else ("le " if self.g == "m" else "la ")
+
+    def determinant(self):
+        det, g, n = self.det, self.g, self.n
+        if det == "defini":
+            return self.article_defini()
+        if det == "indefini":
+            return ("un " if g == "m" else "une ") if n == "s" else "des "
+        if det == "possessif":
+            return ("mon " if g == "m" or self.voyelle else "ma ") if n == "s" else "mes "
+        return ""
+
+    @property
+    def v(self):
+        if self._v is None:
+            self._v = self.determinant() + self.v_bare
+        return self._v
+
+    def rendre_possessif(self):
+        """mon/ma/mes à la place de l'article, sauf article élidé (l'), qui reste."""
+        if self.det == "indefini" or (self.det == "defini" and not (self.n == "s" and self.voyelle)):
+            self.det = "possessif"
+            self._v = None
+
+    _CLES = {"v": "v", "v_bare": "v_bare", "g": "g", "n": "n"}
+
+    def __getitem__(self, cle):
+        if cle == "is_pronoun":
+            return False
+        attribut = self._CLES.get(cle)
+        if attribut is None:
+            raise KeyError(cle)
+        return getattr(self, attribut)
+
+    def get(self, cle, defaut=None):
+        try:
+            return self[cle]
+        except KeyError:
+            return defaut
+
 
 def generer_ps_relative(gn_antecedent_info):
+    rng = _rng()
     ant_n = gn_antecedent_info['n']
     ant_g = gn_antecedent_info['g']
 
-    ant_surface = (gn_antecedent_info.get('v_bare') or gn_antecedent_info.get('v') or "").strip().lower()
-    ant_is_pron = gn_antecedent_info.get("is_pronoun", False) or ant_surface in {"nous", "on", "il", "elle", "ils", "elles"}
-    sujet_v_for_person = ant_surface if ant_is_pron else None
+    if isinstance(gn_antecedent_info, GroupeNominal):
+        sujet_v_for_person = None
+    else:
+        ant_surface = (gn_antecedent_info.get('v_bare') or gn_antecedent_info.get('v') or "").strip().lower()
+        ant_is_pron = gn_antecedent_info.get("is_pronoun", False) or ant_surface in {"nous", "on", "il", "elle", "ils", "elles"}
+        sujet_v_for_person = ant_surface if ant_is_pron else None
 
-    if random.random() < 0.65:
+    if rng.random() < PROBABILITES["relative_sujet_qui"]:
         verbe = conjuguer_verbe(GVTransitif, ant_n, sujet_g=ant_g, sujet_v=sujet_v_for_person)
         obj = get_gn_info(GNIndefini, role='object')
         return f"qui {verbe} {obj['v']}"
 
-    sujet2 = get_gn_info(GNDefini, n=random.choice(['s','p']), role='subject')
+    sujet2 = get_gn_info(GNDefini, n=rng.choice(['s','p']), role='subject')
     verbe = conjuguer_verbe(GVTransitif, sujet2['n'], sujet_g=sujet2['g'], sujet_v=(sujet2['v'] if sujet2.get("is_pronoun") else None))
     return f"que {sujet2['v']} {verbe}"
 
 def construire_ps_initiale_clause():
-    clause_type = random.choice(['causale', 'temporelle', 'gerondif', 'detache'])
+    rng = _rng()
+    clause_type = rng.choice(['causale', 'temporelle', 'gerondif', 'detache'])
     sujet_nom = get_gn_info(GNDefini, role='subject')
     verbe = conjuguer_verbe(GVTransitif, sujet_nom['n'], sujet_g=sujet_nom["g"], sujet_v=(sujet_nom["v"] if sujet_nom.get("is_pronoun") else None))
     objet = get_gn_info(GNIndefini, role='object')
 
     if clause_type == 'causale':
-        return f"{random.choice(['parce que','puisque','comme'])} {sujet_nom['v']} {verbe} {objet['v']}"
+        return f"{rng.choice(['parce que','puisque','comme'])} {sujet_nom['v']} {verbe} {objet['v']}"
     if clause_type == 'temporelle':
-        return f"{random.choice(['lorsque','quand','dès que','alors que'])} {sujet_nom['v']} {verbe} {objet['v']}"
+        return f"{rng.choice(['lorsque','quand','dès que','alors que'])} {sujet_nom['v']} {verbe} {objet['v']}"
     if clause_type == 'gerondif':
-        return random.choice(Gerondif)
-    return random.choice(AdjDetache)
+        return rng.choice(Gerondif)
+    return rng.choice(AdjDetache)
 
 def generer_ps_finale_simple():
-    if random.random() < 0.7:
-        prefixe = random.choice(["afin de", "pour"])
-        infinitive = random.choice(GVInfinitifTransitif)
+    rng = _rng()
+    if rng.random() < PROBABILITES["finale_infinitive"]:
+        prefixe = rng.choice(["afin de", "pour"])
+        infinitive = rng.choice(GVInfinitifTransitif)
         objet = get_gn_info(GNDefini, role='object')
         if prefixe == "afin de":
             if _starts_with_vowel(infinitive):
@@ -522,7 +981,7 @@ def generer_ps_finale_simple():
             return f"afin de {infinitive} {objet['v']}".strip()
         return f"pour {infinitive} {objet['v']}".strip()
 
-    prefixe = random.choice(["pour que", "afin que"])
+    prefixe = rng.choice(["pour que", "afin que"])
     sujet_sub = get_gn_info(GNDefini, role='subject')
     verbe = conjuguer_verbe(GVTransitif, sujet_sub['n'], sujet_g=sujet_sub["g"], sujet_v=(sujet_sub["v"] if sujet_sub.get("is_pronoun") else None))
     objet = get_gn_info(GNIndefini, role='object')
@@ -532,17 +991,18 @@ def construire_ps_finale():
     return generer_ps_finale_simple()
 
 def construire_attribut_correct(sujet_info, _verbe_key=None):
-    attribut_type = random.choice(['adj','gn'])
+    gen = _gen()
+    attribut_type = gen.rng.choice(['adj','gn'])
     n_cible, g_cible = sujet_info['n'], sujet_info['g']
     if attribut_type == 'adj':
-        base = random.choice(ADJECTIFS_DISPONIBLES)
+        base = _tirer_adjectif(gen, ADJECTIFS_DISPONIBLES)
         return accorder_attribut(base, g_cible, n_cible)
-    gn_base = random.choice([gn for gn, info in GN_BASE_MAP.items() if info['n'] == n_cible])
+    gn_base = _tirer_nom(gen, GN_PAR_NOMBRE[n_cible])
     gn_attr = get_gn_info(gn_base, type='indefini', n=n_cible)['v']
     return gn_attr
 
 def construire_opposition(sujet_info):
-    adj_base = random.choice(ADJECTIFS_DISPONIBLES)
+    adj_base = _tirer_adjectif(_gen(), ADJECTIFS_DISPONIBLES)
     adj_acc = accorder_attribut(adj_base, sujet_info['g'], sujet_info['n'])
     sujet_v = sujet_info["v"] if sujet_info.get("is_pronoun") else None
     verbe_etre = conjuguer_verbe(GVAttributif, sujet_info['n'], verbe_cle='être', sujet_v=sujet_v)
@@ -550,43 +1010,43 @@ def construire_opposition(sujet_info):
     return f"mais {neg}{verbe_etre} pas {adj_acc}"
 
 def generer_gn_recursif_fixed(base_gn_str, type, profondeur=0, allow_recursion=True):
-    gn_info_base = _get_base_gn_info(base_gn_str)
-    g, n = gn_info_base['g'], gn_info_base['n']
+    gen = _gen()
+    rng = gen.rng
+    g, n = GN_GENRE_NOMBRE.get(base_gn_str, ('m', 's'))
+    gn = GroupeNominal(base_gn_str, g, n, det=type if type in ("defini", "indefini") else None)
 
-    adjs_post = []
-    if random.random() < 0.40:
+    if rng.random() < PROBABILITES["adjectif_gn"]:
         adj = get_random_adjective_form_from_category(g, n)
         if adj:
-            adjs_post.append(adj)
-
-    gn_final_bare = f"{base_gn_str} {' '.join(adjs_post)}".strip()
-
-    if allow_recursion and profondeur < MAX_PROFONDEUR_RECURSIVITE_CN:
-        if random.random() < 0.30:
-            cn_base = random.choice(GNDefini)
-            cn_rec = generer_gn_recursif_fixed(cn_base, type='defini', profondeur=profondeur+1)
-            cn_final = formatter_sp_gn_fixed("de", cn_rec)
-            gn_final_bare = f"{gn_final_bare} {cn_final}".strip()
-
-        if random.random() < 0.22:
-            ant = {
-                'v': _apply_determinant_and_elision(gn_final_bare, g, n, "defini"),
-                'g': g, 'n': n, 'v_bare': gn_final_bare,
-                'is_pronoun': False
-            }
-            relative = generer_ps_relative(ant)
-            gn_final_bare = f"{gn_final_bare} {relative}".strip()
+            gn.adjectifs = (adj,)
+
+    if allow_recursion and profondeur < gen.max_profondeur_cn:
+        if rng.random() < PROBABILITES["complement_gn"]:
+            cn_base = _tirer_nom(gen, GNDefini)
+            gn.complement = generer_gn_recursif_fixed(cn_base, type='defini', profondeur=profondeur+1)
 
-    full = gn_final_bare if type == "aucun" else _apply_determinant_and_elision(gn_final_bare, g, n, type)
-    return {"v": full.strip(), "g": g, "n": n, "v_bare": gn_final_bare.strip()}
+        if rng.random() < PROBABILITES["relative_gn"]:
+            gn.relative = generer_ps_relative(gn)
+
+    return gn
 
 def generer_gn_coordonne(liste_gn_bases, coord='et'):
-    n_choice = random.choice(['s', 'p'])
-    candidates = [b for b in liste_gn_bases if GN_BASE_MAP.get(b, {}).get('n') == n_choice]
+    gen = _gen()
+    rng = gen.rng
+    n_choice = rng.choice(['s', 'p'])
+    if liste_gn_bases is GNDefini:
+        candidates = GN_PAR_NOMBRE[n_choice]
+    else:
+        candidates = [b for b in liste_gn_bases if GN_GENRE_NOMBRE.get(b, (None, None))[1] == n_choice]
     if len(candidates) < 2:
         candidates = liste_gn_bases[:]
 
-    base1, base2 = random.sample(candidates, 2)
+    if gen.recence is None:
+        base1, base2 = rng.sample(candidates, 2)
+    else:
+        base1 = base2 = _tirer_nom(gen, candidates)
+        while base2 == base1:
+            base2 = _tirer_nom(gen, candidates)
     gn1 = generer_gn_recursif_fixed(base1, type='defini', profondeur=0)
     gn2 = generer_gn_recursif_fixed(base2, type='defini', profondeur=0)
 
@@ -600,6 +1060,10 @@ def _apply_possessive_determiner(gn_info):
     Transforme éventuellement 'le/la/les/un/une/des X' en 'mon/ma/mes X'
     en respectant genre/nombre et élision minimale.
     """
+    if isinstance(gn_info, GroupeNominal):
+        gn_info.rendre_possessif()
+        return gn_info
+
     v = gn_info.get("v", "")
     if not v:
         return gn_info
@@ -652,66 +1116,548 @@ def maybe_apply_possessive(gn_info, role, ctx=None):
         return gn_info
 
     # Tirage aléatoire
-    if random.random() >= POSSESSIVE_DET_PROB:
+    gen = _gen()
+    if gen.rng.random() >= gen.possessive_det_prob:
         return gn_info
 
     return _apply_possessive_determiner(gn_info)
 
 def get_gn_info(gn_list_or_key=None, type='defini', n=None, g=None, role='subject', ctx=None):
-    global LAST_GN_INFO
-
-    if role == 'subject' and ctx and ctx.get('person_policy') is None and LAST_GN_INFO and not LAST_GN_INFO.get('is_pronoun') and random.random() < 0.13:
-        pron = _select_pronoun_from_info(LAST_GN_INFO['g'], LAST_GN_INFO['n'])
-        result = {"v": pron, "g": LAST_GN_INFO['g'], "n": LAST_GN_INFO['n'], "v_bare": pron, "is_pronoun": True}
-        LAST_GN_INFO = result
+    gen = _gen()
+    rng = gen.rng
+    last = gen.last_gn_info
+
+    if role == 'subject' and ctx and ctx.get('person_policy') is None and last and not last.get('is_pronoun') and rng.random() < PROBABILITES["anaphore_pronom"]:
+        pron = _select_pronoun_from_info(last['g'], last['n'])
+        result = {"v": pron, "g": last['g'], "n": last['n'], "v_bare": pron, "is_pronoun": True}
+        gen.last_gn_info = result
         return result
 
     if role == 'subject' and ctx and ctx.get('person_policy') == "nous":
         result = {"v": "nous", "g": "m", "n": "p", "v_bare": "nous", "is_pronoun": True}
-        LAST_GN_INFO = result
+        gen.last_gn_info = result
         return result
 
     if role == 'subject' and ctx and ctx.get('person_policy') == "impersonal":
         result = {"v": "il", "g": "m", "n": "s", "v_bare": "il", "is_pronoun": True}
-        LAST_GN_INFO = result
+        gen.last_gn_info = result
         return result
 
     if gn_list_or_key == 'GNPersonnel':
         if ctx and ctx.get('person_policy') == "nous":
             chosen = {"v": "nous", "n": "p", "g": "m"}
         else:
-            chosen = random.choice(GNPersonnel)
+            chosen = rng.choice(GNPersonnel)
         result = {"v": chosen["v"], "g": chosen["g"], "n": chosen["n"], "v_bare": chosen["v"], "is_pronoun": True}
 
     elif gn_list_or_key == 'GNImpersonnel':
-        chosen = random.choice(GNImpersonnel)
+        chosen = rng.choice(GNImpersonnel)
         result = {"v": chosen["v"], "g": chosen["g"], "n": chosen["n"], "v_bare": chosen["v"], "is_pronoun": True}
 
     elif gn_list_or_key == 'Coordination':
         result = generer_gn_coordonne(GNDefini)
 
     else:
-        if isinstance(gn_list_or_key, list):
-            base = random.choice(gn_list_or_key)
-            type = 'defini' if gn_list_or_key in [GNDefini, GNComplexe] else 'indefini'
+        if isinstance(gn_list_or_key, (list, VueLexique)):
+            base = _tirer_nom(gen, gn_list_or_key)
+            type = 'defini' if gn_list_or_key is GNDefini or gn_list_or_key is GNComplexe else 'indefini'
         else:
-            base = gn_list_or_key if gn_list_or_key in GNDefini else random.choice(GNDefini)
+            base = gn_list_or_key if gn_list_or_key in GN_GENRE_NOMBRE else _tirer_nom(gen, GNDefini)
 
-        info = _get_base_gn_info(base)
-        if n is None: n = info['n']
-        if g is None: g = info['g']
         result = generer_gn_recursif_fixed(base, type=type, profondeur=0)
 
     # Injection éventuelle de mon/ma/mes
     result = maybe_apply_possessive(result, role, ctx)
 
     if role == 'subject' and not result.get('is_pronoun', False) and type == 'defini':
-        LAST_GN_INFO = result
+        gen.last_gn_info = result
     else:
-        LAST_GN_INFO = None
+        gen.last_gn_info = None
 
     return result
 
+# =============================================================================
+# Lexique compact sur disque (mmap)
+# =============================================================================
+# Pour des lexiques de 100k+ entrées : un fichier binaire ouvert par mmap et
+# lu directement par les tirages et les recherches, sans dictionnaires
+# Python. Disposition (petit-boutiste) :
+#   en-tête     MAGIC_LEXIQUE, version, décomptes et décalages
+#   noms        enregistrements de 8 octets (début, longueur, genre, nombre)
+#               rangés par catégorie m.s, f.s, m.p, f.p : chaque (genre,
+#               nombre) et chaque nombre forme une plage contiguë
+#   adjectifs   enregistrements de 5 chaînes (base, m.s, f.s, m.p, f.p)
+#   index       tables de hachage ouvertes (crc32, sondage linéaire) vers
+#               les noms et les bases d'adjectifs
+#   chaînes     réserve UTF-8 commune
+# utiliser_lexique() substitue ses vues aux listes et index du vocabulaire
+# intégré (GNDefini, GN_PAR_NOMBRE, ADJ_PAR_GENRE_NOMBRE...) : un tirage ou
+# une recherche coûte le même prix quelle que soit la taille du lexique. Les
+# verbes restent ceux du module.
+
+MAGIC_LEXIQUE = b"AMLX"
+VERSION_LEXIQUE = 1
+_ENTETE_LEXIQUE = struct.Struct("<4s14I")
+_REC_NOM = struct.Struct("<IHBB")
+_REC_ADJ = struct.Struct("<" + "IH" * 5)
+_CASE_INDEX = struct.Struct("<I")
+_CATEGORIES_LEXIQUE = (("m", "s"), ("f", "s"), ("m", "p"), ("f", "p"))
+
+def _table_index(cles):
+    """Table de hachage ouverte (octets) : case = rang + 1, 0 si vide."""
+    taille = 1 << max(3, (2 * len(cles) - 1).bit_length())
+    masque = taille - 1
+    cases = array("I", bytes(4 * taille))
+    for rang, cle in enumerate(cles):
+        h = zlib.crc32(cle) & masque
+        while cases[h]:
+            h = (h + 1) & masque
+        cases[h] = rang + 1
+    if sys.byteorder != "little":
+        cases.byteswap()
+    return taille, cases.tobytes()
+
+def ecrire_lexique(chemin, noms, adjectifs=()):
+    """
+    Écrit un lexique compact. `noms` : itérable de (mot, genre, nombre) ;
+    `adjectifs` : itérable de (base, m.s, f.s, m.p, f.p). En cas de doublon,
+    la première occurrence l'emporte. Chaque (genre, nombre) doit avoir au
+    moins un nom, et il faut au moins un adjectif.
+    """
+    reserve = bytearray()
+    def chaine(texte):
+        octets = texte.encode("utf-8")
+        if len(octets) > 0xFFFF:
+            raise ValueError(f"entrée trop longue pour le lexique : {texte[:40]!r}...")
+        debut = len(reserve)
+        reserve.extend(octets)
+        return debut, len(octets), octets
+
+    rangs = {cat: k for k, cat in enumerate(_CATEGORIES_LEXIQUE)}
+    par_categorie = ([], [], [], [])
+    vus = set()
+    for mot, g, n in noms:
+        if mot not in vus:
+            vus.add(mot)
+            par_categorie[rangs[g, n]].append((mot, g, n))
+    if not all(par_categorie):
+        raise ValueError("chaque (genre, nombre) doit avoir au moins un nom")
+
+    recs_noms, cles_noms = bytearray(), []
+    for mot, g, n in itertools.chain(*par_categorie):
+        debut, longueur, octets = chaine(mot)
+        recs_noms += _REC_NOM.pack(debut, longueur, ord(g), ord(n))
+        cles_noms.append(octets)
+
+    recs_adj, cles_adj = bytearray(), []
+    vus.clear()
+    for formes in adjectifs:
+        if formes[0] in vus:
+            continue
+        vus.add(formes[0])
+        champs = []
+        for k, forme in enumerate(formes):
+            debut, longueur, octets = chaine(forme)
+            champs += (debut, longueur)
+            if k == 0:
+                cles_adj.append(octets)
+        recs_adj += _REC_ADJ.pack(*champs)
+    if not cles_adj:
+        raise ValueError("il faut au moins un adjectif")
+
+    taille_idx_noms, idx_noms = _table_index(cles_noms)
+    taille_idx_adj, idx_adj = _table_index(cles_adj)
+    bornes = list(itertools.accumulate(len(c) for c in par_categorie))
+    off_noms = _ENTETE_LEXIQUE.size
+    off_adj = off_noms + len(recs_noms)
+    off_idx_noms = off_adj + len(recs_adj)
+    off_idx_adj = off_idx_noms + len(idx_noms)
+    off_chaines = off_idx_adj + len(idx_adj)
+    entete = _ENTETE_LEXIQUE.pack(MAGIC_LEXIQUE, VERSION_LEXIQUE, len(cles_noms), len(cles_adj),
+                                  bornes[0], bornes[1], bornes[2], off_noms, off_adj,
+                                  off_idx_noms, taille_idx_noms, off_idx_adj, taille_idx_adj,
+                                  off_chaines, len(reserve))
+    tmp = f"{chemin}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        for bloc in (entete, recs_noms, recs_adj, idx_noms, idx_adj, reserve):
+            f.write(bloc)
+    os.replace(tmp, chemin)
+
+def exporter_vocabulaire(chemin):
+    """Écrit le vocabulaire intégré (noms et adjectifs) au format lexique compact."""
+    integre = _VOCABULAIRE_INTEGRE or globals()
+    ecrire_lexique(
+        chemin,
+        ((gn, g, n) for gn, (g, n) in integre["GN_GENRE_NOMBRE"].items()),
+        ((base, f["m"]["s"], f["f"]["s"], f["m"]["p"], f["f"]["p"]) for base, f in ADJ_MORPHOLOGY.items()),
+    )
+
+class VueLexique(Sequence):
+    """Plage d'enregistrements d'un Lexique, vue comme une séquence de chaînes."""
+
+    __slots__ = ("_lire", "_debut", "_taille", "_rang")
+
+    def __init__(self, lire, debut, fin, rang=None):
+        self._lire, self._debut, self._taille = lire, debut, fin - debut
+        self._rang = rang
+
+    def __len__(self):
+        return self._taille
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self._lire(self._debut + k) for k in range(*i.indices(self._taille))]
+        if i < 0:
+            i += self._taille
+        if not 0 <= i < self._taille:
+            raise IndexError("indice hors du lexique")
+        return self._lire(self._debut + i)
+
+    def rang(self, valeur):
+        """Indice de `valeur` dans la vue, -1 si elle n'y est pas (recherche indexée si possible)."""
+        if self._rang is None:
+            try:
+                return self.index(valeur)
+            except ValueError:
+                return -1
+        r = self._rang(valeur)
+        i = r - self._debut
+        return i if r >= 0 and 0 <= i < self._taille else -1
+
+class _IndexLexique:
+    """Vue dictionnaire (get / in / []) sur une recherche du Lexique."""
+
+    __slots__ = ("_chercher",)
+
+    def __init__(self, chercher):
+        self._chercher = chercher
+
+    def get(self, cle, defaut=None):
+        valeur = self._chercher(cle)
+        return defaut if valeur is None else valeur
+
+    def __contains__(self, cle):
+        return self._chercher(cle) is not None
+
+    def __getitem__(self, cle):
+        valeur = self._chercher(cle)
+        if valeur is None:
+            raise KeyError(cle)
+        return valeur
+
+class Lexique:
+    """Lexique compact (voir ecrire_lexique) ouvert en lecture par mmap."""
+
+    def __init__(self, chemin):
+        self.chemin = os.fspath(chemin)
+        with open(self.chemin, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, self.nb_noms, self.nb_adjectifs, fs, mp, fp, self._off_noms, self._off_adj,
+         self._off_idx_noms, self._taille_idx_noms, self._off_idx_adj, self._taille_idx_adj,
+         self._off_chaines) = _ENTETE_LEXIQUE.unpack_from(self._mm, 0)[:14]
+        if magic != MAGIC_LEXIQUE or version != VERSION_LEXIQUE:
+            self._mm.close()
+            raise ValueError(f"{self.chemin} : lexique absent ou de version incompatible")
+        self._bornes = {("m", "s"): (0, fs), ("f", "s"): (fs, mp), ("m", "p"): (mp, fp),
+                        ("f", "p"): (fp, self.nb_noms)}
+
+    def fermer(self):
+        self._mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fermer()
+
+    def _chaine(self, debut, longueur):
+        debut += self._off_chaines
+        return self._mm[debut:debut + longueur].decode("utf-8")
+
+    def nom(self, i):
+        debut, longueur, _g, _n = _REC_NOM.unpack_from(self._mm, self._off_noms + 8 * i)
+        return self._chaine(debut, longueur)
+
+    def forme_adjectif(self, i, k):
+        """k : 0 base, 1 m.s, 2 f.s, 3 m.p, 4 f.p."""
+        champs = _REC_ADJ.unpack_from(self._mm, self._off_adj + _REC_ADJ.size * i)
+        return self._chaine(champs[2 * k], champs[2 * k + 1])
+
+    def _chercher(self, octets, off_index, taille, cle_de):
+        masque = taille - 1
+        h = zlib.crc32(octets) & masque
+        while True:
+            rang = _CASE_INDEX.unpack_from(self._mm, off_index + 4 * h)[0]
+            if not rang:
+                return -1
+            debut, longueur = cle_de(rang - 1)
+            debut += self._off_chaines
+            if self._mm[debut:debut + longueur] == octets:
+                return rang - 1
+            h = (h + 1) & masque
+
+    def rang_nom(self, mot):
+        return self._chercher(mot.encode("utf-8"), self._off_idx_noms, self._taille_idx_noms,
+                              lambda i: _REC_NOM.unpack_from(self._mm, self._off_noms + 8 * i)[:2])
+
+    def rang_adjectif(self, base):
+        return self._chercher(base.encode("utf-8"), self._off_idx_adj, self._taille_idx_adj,
+                              lambda i: _REC_ADJ.unpack_from(self._mm, self._off_adj + _REC_ADJ.size * i)[:2])
+
+    def genre_nombre(self, mot):
+        """(genre, nombre) du nom, None s'il est absent."""
+        if not isinstance(mot, str):
+            return None
+        i = self.rang_nom(mot)
+        if i < 0:
+            return None
+        _debut, _longueur, g, n = _REC_NOM.unpack_from(self._mm, self._off_noms + 8 * i)
+        return chr(g), chr(n)
+
+    def accord(self, cle):
+        """Forme de (base, genre, nombre), None si l'adjectif est absent."""
+        if not isinstance(cle, tuple) or len(cle) != 3:
+            return None
+        base, g, n = cle
+        i = self.rang_adjectif(base) if isinstance(base, str) else -1
+        if i < 0:
+            return None
+        return self.forme_adjectif(i, 1 + _CATEGORIES_LEXIQUE.index((g, n)))
+
+    def vues(self):
+        """Remplaçants des structures du vocabulaire intégré (voir utiliser_lexique)."""
+        noms, rang = self.nom, self.rang_nom
+        tous = VueLexique(noms, 0, self.nb_noms, rang)
+        singulier = VueLexique(noms, 0, self._bornes["m", "p"][0], rang)
+        pluriel = VueLexique(noms, self._bornes["m", "p"][0], self.nb_noms, rang)
+        adj = {cat: VueLexique(partial(lambda k, i: self.forme_adjectif(i, k), 1 + k), 0, self.nb_adjectifs)
+               for k, cat in enumerate(_CATEGORIES_LEXIQUE)}
+
+        def infos_gn(mot):
+            gn = self.genre_nombre(mot)
+            return None if gn is None else {'g': gn[0], 'n': gn[1]}
+
+        return {
+            "GN_BASE_MAP": _IndexLexique(infos_gn),
+            "GN_GENRE_NOMBRE": _IndexLexique(self.genre_nombre),
+            "GN_PAR_GENRE_NOMBRE": {cat: VueLexique(noms, *bornes, rang) for cat, bornes in self._bornes.items()},
+            "GN_PAR_NOMBRE": {"s": singulier, "p": pluriel},
+            "GNDefini": tous,
+            "GNComplexe": tous,
+            # Objets distincts de GNDefini : get_gn_info en déduit l'article indéfini
+            "GNIndefini": VueLexique(noms, 0, self.nb_noms, rang),
+            "GNIndefini_Singulier": VueLexique(noms, 0, len(singulier), rang),
+            "GNIndefini_Pluriel": VueLexique(noms, len(singulier), self.nb_noms, rang),
+            "ADJECTIFS_DISPONIBLES": VueLexique(lambda i: self.forme_adjectif(i, 0), 0, self.nb_adjectifs),
+            "ADJ_MS": adj["m", "s"], "ADJ_FS": adj["f", "s"], "ADJ_MP": adj["m", "p"], "ADJ_FP": adj["f", "p"],
+            "ADJ_PAR_GENRE_NOMBRE": adj,
+            "FORMES_ADJECTIVALES": _IndexLexique(self.accord),
+        }
+
+_NOMS_VOCABULAIRE = ("GN_BASE_MAP", "GN_GENRE_NOMBRE", "GN_PAR_GENRE_NOMBRE", "GN_PAR_NOMBRE", "GNDefini",
+                     "GNComplexe", "GNIndefini", "GNIndefini_Singulier", "GNIndefini_Pluriel",
+                     "ADJECTIFS_DISPONIBLES", "ADJ_MS", "ADJ_FS", "ADJ_MP", "ADJ_FP", "ADJ_PAR_GENRE_NOMBRE",
+                     "FORMES_ADJECTIVALES")
+_VOCABULAIRE_INTEGRE = None
+LEXIQUE_ACTIF = None
+
+def utiliser_lexique(lexique):
+    """
+    Fait tirer noms et adjectifs dans `lexique` (Lexique ou chemin) au lieu du
+    vocabulaire intégré ; None rétablit ce dernier. Réglage global du module,
+    comme MOTEUR_EXPANSION : il vaut pour tous les Generator du processus.
+    Les lots calculés par d'autres processus (mode par lots, serveur)
+    portent le chemin du lexique actif et le rouvrent (_generateur_lot), quel
+    que soit le mode de démarrage des workers. Renvoie le Lexique actif.
+    """
+    global _VOCABULAIRE_INTEGRE, LEXIQUE_ACTIF
+    if _VOCABULAIRE_INTEGRE is None:
+        _VOCABULAIRE_INTEGRE = {nom: globals()[nom] for nom in _NOMS_VOCABULAIRE}
+    if lexique is None:
+        globals().update(_VOCABULAIRE_INTEGRE)
+    else:
+        if not isinstance(lexique, Lexique):
+            lexique = Lexique(lexique)
+        globals().update(lexique.vues())
+    LEXIQUE_ACTIF = lexique
+    return lexique
+
+# =============================================================================
+# RÉCENCE LEXICALE
+# =============================================================================
+# Optionnelle (Generator(recence=...)) : les noms et adjectifs tirés restent
+# un temps « récents » (fenêtre glissante par classe lexicale) et leur poids
+# est multiplié par FACTEUR_RECENCE, ce qui espace les répétitions d'une
+# phrase à l'autre. Chaque classe a un arbre de Fenwick des poids sur une
+# séquence de référence (GNIndefini, ADJECTIFS_DISPONIBLES) : tirage et mise
+# à jour en O(log n). Les séquences tirées (GNDefini, GN_PAR_NOMBRE['s'],
+# ADJ_MS...) y sont des plages, tirées par sommes préfixes. Tous les poids
+# partant de la même valeur, l'arbre ne stocke que leurs écarts : une table
+# d'entiers nuls à l'initialisation, rien à calculer même pour un lexique
+# d'un million de noms.
+
+_POIDS_PLEIN = 1 << 16
+
+class ArbreFenwick:
+    """Poids entiers de n éléments (tous `plein` au départ) : ajustement et recherche par somme en O(log n)."""
+
+    __slots__ = ("n", "plein", "total", "_ecarts", "_haut")
+
+    def __init__(self, n, plein=_POIDS_PLEIN):
+        self.n = n
+        self.plein = plein
+        self.total = n * plein
+        # Nœud j : plein * (j & -j) + _ecarts[j] ; seuls les écarts sont stockés
+        self._ecarts = array("q", bytes(8 * (n + 1)))
+        self._haut = 1 << (n.bit_length() - 1) if n else 0
+
+    def ajuster(self, i, delta):
+        """Ajoute `delta` au poids de l'élément i."""
+        self.total += delta
+        ecarts, n = self._ecarts, self.n
+        i += 1
+        while i <= n:
+            ecarts[i] += delta
+            i += i & -i
+
+    def prefixe(self, i):
+        """poids[0] + ... + poids[i - 1]."""
+        total = self.plein * i
+        ecarts = self._ecarts
+        while i:
+            total += ecarts[i]
+            i &= i - 1
+        return total
+
+    def chercher(self, cible):
+        """Plus petit i tel que poids[0] + ... + poids[i] > cible (0 <= cible < total)."""
+        ecarts, plein, n = self._ecarts, self.plein, self.n
+        pos, pas = 0, self._haut
+        while pas:
+            j = pos + pas
+            if j <= n:
+                # Le nœud j couvre `pas` éléments : pos est multiple de 2 * pas
+                v = plein * pas + ecarts[j]
+                if v <= cible:
+                    pos = j
+                    cible -= v
+            pas >>= 1
+        return pos
+
+class RecenceLexicale:
+    """Fenêtres de récence (noms, adjectifs) d'un Generator, un arbre de Fenwick par classe."""
+
+    CLASSES = ("noms", "adjectifs")
+
+    def __init__(self, fenetre=FENETRE_RECENCE, facteur=FACTEUR_RECENCE):
+        if fenetre < 1 or not 0.0 <= facteur <= 1.0:
+            raise ValueError("RecenceLexicale : fenêtre >= 1 et facteur dans [0, 1] attendus")
+        self.fenetre = fenetre
+        self.facteur = facteur
+        self._delta = round(facteur * _POIDS_PLEIN) - _POIDS_PLEIN
+        self.vider()
+
+    def vider(self):
+        # Clés récentes : rang dans la séquence de référence de la classe
+        self._recents = {classe: deque() for classe in self.CLASSES}
+        self._comptes = {classe: Counter() for classe in self.CLASSES}
+        self._arbres = {}
+        # id(séquence) -> (séquence, référence, début, fin, lire) ; la séquence
+        # est gardée pour que l'id reste le sien
+        self._plages = {}
+
+    @staticmethod
+    def _reference(classe):
+        # Noms : singuliers puis pluriels, dont GN_PAR_NOMBRE['s'] / ['p'] sont
+        # des plages et GNDefini l'ensemble ; adjectifs : séquences parallèles
+        return GNIndefini if classe == "noms" else ADJECTIFS_DISPONIBLES
+
+    def _plage(self, classe, seq):
+        reference = self._reference(classe)
+        arbre = self._arbres.get(classe)
+        if arbre is None or arbre[0] is not reference:
+            # Autre vocabulaire (utiliser_lexique) : la fenêtre repart de zéro
+            self._recents[classe].clear()
+            self._comptes[classe].clear()
+            arbre = self._arbres[classe] = (reference, ArbreFenwick(len(reference)))
+        plage = self._plages.get(id(seq))
+        if plage is None or plage[0] is not seq or plage[1] is not reference:
+            if len(self._plages) > 256:
+                self._plages.clear()
+            plage = self._plages[id(seq)] = (seq, reference, *_plage_lexicale(classe, seq, reference))
+        return arbre[1], plage
+
+    def _noter(self, classe, arbre, cle):
+        comptes = self._comptes[classe]
+        if not comptes[cle]:
+            arbre.ajuster(cle, self._delta)
+        comptes[cle] += 1
+        recents = self._recents[classe]
+        recents.append(cle)
+        if len(recents) > self.fenetre:
+            ancienne = recents.popleft()
+            comptes[ancienne] -= 1
+            if not comptes[ancienne]:
+                del comptes[ancienne]
+                arbre.ajuster(ancienne, -self._delta)
+
+    def tirer(self, classe, seq, rng):
+        """Élément de `seq`, les récents de `classe` étant sous-pondérés ; le note comme récent."""
+        arbre, (_seq, _ref, debut, fin, lire) = self._plage(classe, seq)
+        if lire is None:
+            return rng.choice(seq)
+        u = rng.random()
+        if debut == 0 and fin == arbre.n:
+            avant, masse = 0, arbre.total
+        else:
+            avant = arbre.prefixe(debut)
+            masse = arbre.prefixe(fin) - avant
+        # Tous récents avec un facteur nul : retour au tirage uniforme de la plage
+        i = arbre.chercher(avant + int(u * masse)) if masse > 0 else debut + int(u * (fin - debut))
+        self._noter(classe, arbre, i)
+        return lire(i)
+
+def _plage_lexicale(classe, seq, reference):
+    """
+    (début, fin, lire) : plage de `reference` formée des mêmes éléments que
+    `seq`, et lecture de l'élément de rang i ; lire vaut None si `seq` n'est
+    pas une telle plage (tirage uniforme, sans récence).
+    """
+    n = len(seq)
+    if classe == "adjectifs":
+        return (0, n, seq.__getitem__) if n == len(reference) else (0, 0, None)
+    if seq is reference:
+        return 0, n, reference.__getitem__
+    if isinstance(seq, VueLexique) and isinstance(reference, VueLexique) and seq._lire is reference._lire:
+        debut = seq._debut - reference._debut
+        if 0 <= debut and debut + n <= len(reference):
+            return debut, debut + n, reference.__getitem__
+        return 0, 0, None
+    if isinstance(reference, VueLexique):
+        rangs = sorted(map(reference.rang, seq))
+    else:
+        index = _rangs_reference(reference)
+        rangs = sorted(index.get(mot, -1) for mot in seq)
+    if n and rangs[0] >= 0 and rangs[-1] - rangs[0] == n - 1 and len(set(rangs)) == n:
+        return rangs[0], rangs[0] + n, reference.__getitem__
+    return 0, 0, None
+
+_RANGS_REFERENCE = {}
+
+def _rangs_reference(reference):
+    entree = _RANGS_REFERENCE.get(id(reference))
+    if entree is None or entree[0] is not reference:
+        entree = _RANGS_REFERENCE[id(reference)] = (reference, {mot: i for i, mot in enumerate(reference)})
+    return entree[1]
+
+def _tirer_nom(gen, noms):
+    recence = gen.recence
+    return gen.rng.choice(noms) if recence is None else recence.tirer("noms", noms, gen.rng)
+
+def _tirer_adjectif(gen, adjectifs):
+    recence = gen.recence
+    return gen.rng.choice(adjectifs) if recence is None else recence.tirer("adjectifs", adjectifs, gen.rng)
+
 # =============================================================================
 # GRAMMAIRE
 # =============================================================================
@@ -761,10 +1707,10 @@ GRAMMAR = {
     ],
     "GV_TRANS": [["VERBE_TRANS", "OBJET", "SP_CHAIN", "REL_OPT"]],
     "GV_ATTR": [["VERBE_ATTR", "ATTRIBUT", "SP_CHAIN"]],
-    "GV_INTRANS": [["VERBE_INTRANS", "SP_CHAIN"]],
+    "GV_INTRANS": [["VERBE_INTRANS", "SP_MIN", "SP_CHAIN"]],
     "GV_PASSIF": [["VERBE_PASSIF", "AGENT_OPT", "SP_CHAIN"]],
     "GV_MODAL": [["VERBE_MODAL", "INFINITIF_NU", "OBJET_OPT", "SP_CHAIN"]],
-    "GV_REFLEXIF": [["VERBE_REFLEXIF", "SP_CHAIN", "PS_FINALE_OPT"]],
+    "GV_REFLEXIF": [["VERBE_REFLEXIF", "SP_MIN", "SP_CHAIN", "PS_FINALE_OPT"]],
 
     "GV_TRANS_SUB": [["VERBE_TRANS_SUB", "OBJET", "SP_CHAIN", "REL_OPT"]],
     "GV_ATTR_SUB": [["VERBE_ATTR_SUB", "ATTRIBUT_SUB", "SP_CHAIN"]],
@@ -781,156 +1727,278 @@ GRAMMAR = {
     "QUE": [["que"]],
 }
 
+# Poids relatifs des règles d'un non-terminal (dans l'ordre de GRAMMAR) ;
+# un symbole absent, ou à poids tous égaux, est tiré uniformément par choice().
+# Exemple : {"SP_CHAIN": (2, 1)} raccourcit les chaînes de SP.
+POIDS_REGLES = {}
+
+def _tables_regles(grammaire, poids):
+    """{symbole: TableTirage des indices de règle} pour les poids non uniformes."""
+    tables = {}
+    for sym, w in poids.items():
+        regles = grammaire.get(sym)
+        if regles is None:
+            continue
+        if len(w) != len(regles):
+            raise ValueError(f"POIDS_REGLES[{sym!r}] : {len(w)} poids pour {len(regles)} règles")
+        if len(set(w)) > 1:
+            tables[sym] = TableTirage(enumerate(w))
+    return tables
+
+def _signature_poids(grammaire, poids):
+    return tuple(sorted((sym, tuple(w)) for sym, w in poids.items() if sym in grammaire))
+
+TABLES_REGLES = _tables_regles(GRAMMAR, POIDS_REGLES)
+
 # =============================================================================
 # Réalisation / Expansion
 # =============================================================================
 
-def realize(symbol, ctx):
-    if symbol == "PS_INIT":
-        return construire_ps_initiale_clause()
-    if symbol == "ADV_DETACHE":
-        return random.choice(AdjDetache + Gerondif + AdvConnecteur + Coordination)
-    if symbol == "PS_FINALE":
-        return construire_ps_finale()
-
-    if symbol == "INTRO_SUB":
-        s = ctx["sujet"]
-        sujet_v = s["v"] if s.get("is_pronoun") else None
-        v = conjuguer_verbe(
-            GVIntroductif,
-            s["n"],
-            sujet_g=s["g"],
-            verbe_cle=random.choice(["affirmer","montrer","démontrer","suggérer"]),
-            sujet_v=sujet_v,
-        )
-        return "et " + v
-
-    if symbol == "SUJET":
-        if ctx.get("person_policy") is None:
-            r = random.random()
-            if r < 0.10:
-                ctx["person_policy"] = "impersonal"
-            elif r < 0.22:
-                ctx["person_policy"] = "nous"
-            else:
-                ctx["person_policy"] = None
-
-        pick = random.random()
-        if ctx.get("person_policy") == "nous":
-            s = get_gn_info(role="subject", ctx=ctx)
-        elif ctx.get("person_policy") == "impersonal":
-            s = get_gn_info("GNImpersonnel", role="subject", ctx=ctx)
+# Un réalisateur par symbole terminal : realize() et le compilateur de
+# grammaire (plus bas) y accèdent directement, sans chaîne de if.
+
+_ADV_DETACHES = AdjDetache + Gerondif + AdvConnecteur + Coordination
+
+def _sujet_v(s):
+    return s["v"] if s.get("is_pronoun") else None
+
+def _realiser_ps_init(ctx):
+    return construire_ps_initiale_clause()
+
+def _realiser_adv_detache(ctx):
+    rng = _rng()
+    return rng.choice(_ADV_DETACHES)
+
+def _realiser_ps_finale(ctx):
+    return construire_ps_finale()
+
+def _realiser_intro_sub(ctx):
+    rng = _rng()
+    s = ctx["sujet"]
+    v = conjuguer_verbe(
+        GVIntroductif,
+        s["n"],
+        sujet_g=s["g"],
+        verbe_cle=rng.choice(["affirmer","montrer","démontrer","suggérer"]),
+        sujet_v=_sujet_v(s),
+    )
+    return "et " + v
+
+def _realiser_sujet(ctx):
+    rng = _rng()
+    if ctx.get("person_policy") is None:
+        ctx["person_policy"] = TABLES_CHOIX["politique_personne"].tirer(rng)
+
+    # Tiré même quand la politique impose le sujet : le flux d'aléa n'en dépend pas
+    pick = TABLES_CHOIX["sujet"].tirer(rng)
+    if ctx.get("person_policy") == "nous":
+        s = get_gn_info(role="subject", ctx=ctx)
+    elif ctx.get("person_policy") == "impersonal":
+        s = get_gn_info("GNImpersonnel", role="subject", ctx=ctx)
+    else:
+        if pick != "GNDefini":
+            s = get_gn_info(pick, role="subject", ctx=ctx)
         else:
-            if pick < 0.10:
-                s = get_gn_info("GNImpersonnel", role="subject", ctx=ctx)
-            elif pick < 0.24:
-                s = get_gn_info("GNPersonnel", role="subject", ctx=ctx)
-            elif pick < 0.38:
-                s = get_gn_info("Coordination", role="subject", ctx=ctx)
-            else:
-                s = get_gn_info(GNDefini, n=random.choice(['s','p']), role="subject", ctx=ctx)
-
-        ctx["sujet"] = s
-        return s["v"]
-
-    if symbol == "SUJET_SUB":
-        s = get_gn_info(GNDefini, n=random.choice(['s','p']), role='subject', ctx=ctx)
-        if ctx.get("person_policy") == "nous" and s["v"] in ("il", "on"):
-            s = get_gn_info(GNDefini, n=random.choice(['s','p']), role='subject', ctx=ctx)
-        ctx["sujet_sub"] = s
-        return s["v"]
-
-    if symbol == "OBJET":
-        return (get_gn_info(GNIndefini, role='object', ctx=ctx) if random.random() < 0.7
-                else get_gn_info(GNDefini, role='object', ctx=ctx))["v"]
-
-    if symbol == "VERBE_TRANS":
-        s = ctx["sujet"]
-        return conjuguer_verbe(GVTransitif, s["n"], s["g"], sujet_v=(s["v"] if s.get("is_pronoun") else None))
-    if symbol == "VERBE_ATTR":
-        s = ctx["sujet"]
-        key = random.choice(list(GVAttributif.keys()))
-        ctx["verbe_attr"] = key
-        return conjuguer_verbe(GVAttributif, s["n"], verbe_cle=key, sujet_v=(s["v"] if s.get("is_pronoun") else None))
-    if symbol == "VERBE_INTRANS":
-        s = ctx["sujet"]
-        return conjuguer_verbe(GVIntransitif, s["n"], sujet_g=s["g"], sujet_v=(s["v"] if s.get("is_pronoun") else None))
-    if symbol == "VERBE_PASSIF":
-        s = ctx["sujet"]
-        key = random.choice(list(VERBES_PASSIFS.keys()))
-        return conjuguer_verbe(GVPassif, s["n"], s["g"], verbe_cle=key, voix="passive", sujet_v=(s["v"] if s.get("is_pronoun") else None))
-    if symbol == "VERBE_MODAL":
-        s = ctx["sujet"]
-        key = random.choice(["devoir", "pouvoir"])
-        ctx["modal_key"] = key
-        return conjuguer_verbe(GVModalPersonal, s["n"], sujet_g=s["g"], verbe_cle=key, sujet_v=(s["v"] if s.get("is_pronoun") else None))
-    if symbol == "VERBE_REFLEXIF":
-        s = ctx["sujet"]
-        key = random.choice(list(GVReflexifAttributif.keys()))
-        return conjuguer_verbe(GVReflexifAttributif, s["n"], verbe_cle=key, sujet_v=(s["v"] if s.get("is_pronoun") else None))
-    if symbol == "ATTRIBUT":
-        return construire_attribut_correct(ctx["sujet"], ctx.get("verbe_attr"))
-
-    if symbol == "VERBE_TRANS_SUB":
-        s = ctx["sujet_sub"]
-        return conjuguer_verbe(GVTransitif, s["n"], s["g"], sujet_v=(s["v"] if s.get("is_pronoun") else None))
-    if symbol == "VERBE_ATTR_SUB":
-        s = ctx["sujet_sub"]
-        key = random.choice(list(GVAttributif.keys()))
-        ctx["verbe_attr_sub"] = key
-        return conjuguer_verbe(GVAttributif, s["n"], verbe_cle=key, sujet_v=(s["v"] if s.get("is_pronoun") else None))
-    if symbol == "VERBE_INTRANS_SUB":
-        s = ctx["sujet_sub"]
-        return conjuguer_verbe(GVIntransitif, s["n"], sujet_g=s["g"], sujet_v=(s["v"] if s.get("is_pronoun") else None))
-    if symbol == "VERBE_PASSIF_SUB":
-        s = ctx["sujet_sub"]
-        key = random.choice(list(VERBES_PASSIFS.keys()))
-        return conjuguer_verbe(GVPassif, s["n"], s["g"], verbe_cle=key, voix="passive", sujet_v=(s["v"] if s.get("is_pronoun") else None))
-    if symbol == "VERBE_MODAL_SUB":
-        s = ctx["sujet_sub"]
-        key = random.choice(["devoir", "pouvoir"])
-        return conjuguer_verbe(GVModalPersonal, s["n"], sujet_g=s["g"], verbe_cle=key, sujet_v=(s["v"] if s.get("is_pronoun") else None))
-    if symbol == "VERBE_REFLEXIF_SUB":
-        s = ctx["sujet_sub"]
-        key = random.choice(list(GVReflexifAttributif.keys()))
-        return conjuguer_verbe(GVReflexifAttributif, s["n"], verbe_cle=key, sujet_v=(s["v"] if s.get("is_pronoun") else None))
-    if symbol == "ATTRIBUT_SUB":
-        return construire_attribut_correct(ctx["sujet_sub"], ctx.get("verbe_attr_sub"))
-
-    if symbol == "SP_AGENT":
-        agent = get_gn_info(GNIndefini, role='complement', ctx=ctx)
-        return formatter_sp_gn_fixed("par", agent)
-    if symbol == "INFINITIF_NU":
-        return random.choice(GVInfinitifTransitif)
-    if symbol == "SP":
+            s = get_gn_info(GNDefini, n=rng.choice(['s','p']), role="subject", ctx=ctx)
+
+    ctx["sujet"] = s
+    return s["v"]
+
+def _realiser_sujet_sub(ctx):
+    rng = _rng()
+    s = get_gn_info(GNDefini, n=rng.choice(['s','p']), role='subject', ctx=ctx)
+    if ctx.get("person_policy") == "nous" and s["v"] in ("il", "on"):
+        s = get_gn_info(GNDefini, n=rng.choice(['s','p']), role='subject', ctx=ctx)
+    ctx["sujet_sub"] = s
+    return s["v"]
+
+def _realiser_objet(ctx):
+    rng = _rng()
+    return (get_gn_info(GNIndefini, role='object', ctx=ctx) if rng.random() < PROBABILITES["objet_indefini"]
+            else get_gn_info(GNDefini, role='object', ctx=ctx))["v"]
+
+# Les verbes de la principale sont notés dans ctx["verbe"] : la phrase est
+# ainsi construite avec son verbe fini, et SP_MIN sait si elle resterait
+# trop courte. La validité de la phrase se décide aussi là, sur la forme
+# réalisée (formes composées comprises : « se constitue », « est
+# conditionné ») : verbe absent, et l'expansion est abandonnée aussitôt
+# (_PhraseAvortee). Un pronom sujet suivi d'une préposition (« Il via... »,
+# voir raison_fragment) ne peut pas sortir de la grammaire : SUJET est
+# toujours suivi de GV, qui commence par le verbe.
+# raison_invalidite(ctx) n'a plus qu'à relire ce qui a été noté.
+
+class _PhraseAvortee(Exception):
+    """Expansion abandonnée : la phrase ne peut plus être recevable (raison : motif)."""
+
+    def __init__(self, raison):
+        super().__init__(raison)
+        self.raison = raison
+
+def _noter_verbe(ctx, cle_sujet, forme):
+    if cle_sujet == "sujet":
+        if not forme:
+            raise _PhraseAvortee("sans verbe fini")
+        ctx["verbe"] = forme
+    return forme
+
+def raison_invalidite(ctx):
+    """
+    Motif de rejet d'une expansion d'après ctx (None si elle est recevable) :
+    sujet et verbe fini de la principale notés. La longueur minimale est
+    assurée par la grammaire (SP_MIN, compléments obligatoires).
+    """
+    if "sujet" not in ctx:
+        return "sans sujet"
+    if not ctx.get("verbe"):
+        return "sans verbe fini"
+    return None
+
+def _realiser_verbe_trans(ctx, cle_sujet="sujet"):
+    s = ctx[cle_sujet]
+    return _noter_verbe(ctx, cle_sujet, conjuguer_verbe(GVTransitif, s["n"], s["g"], sujet_v=_sujet_v(s)))
+
+def _realiser_verbe_attr(ctx, cle_sujet="sujet", cle_verbe="verbe_attr"):
+    rng = _rng()
+    s = ctx[cle_sujet]
+    key = rng.choice(CLES_GV_ATTRIBUTIF)
+    ctx[cle_verbe] = key
+    return _noter_verbe(ctx, cle_sujet, conjuguer_verbe(GVAttributif, s["n"], verbe_cle=key, sujet_v=_sujet_v(s)))
+
+def _realiser_verbe_intrans(ctx, cle_sujet="sujet"):
+    s = ctx[cle_sujet]
+    return _noter_verbe(ctx, cle_sujet, conjuguer_verbe(GVIntransitif, s["n"], sujet_g=s["g"], sujet_v=_sujet_v(s)))
+
+def _realiser_verbe_passif(ctx, cle_sujet="sujet"):
+    rng = _rng()
+    s = ctx[cle_sujet]
+    key = rng.choice(CLES_VERBES_PASSIFS)
+    return _noter_verbe(ctx, cle_sujet, conjuguer_verbe(GVPassif, s["n"], s["g"], verbe_cle=key, voix="passive",
+                                                        sujet_v=_sujet_v(s)))
+
+def _realiser_verbe_modal(ctx):
+    rng = _rng()
+    s = ctx["sujet"]
+    key = rng.choice(["devoir", "pouvoir"])
+    ctx["modal_key"] = key
+    return _noter_verbe(ctx, "sujet", conjuguer_verbe(GVModalPersonal, s["n"], sujet_g=s["g"], verbe_cle=key,
+                                                      sujet_v=_sujet_v(s)))
+
+def _realiser_verbe_modal_sub(ctx):
+    rng = _rng()
+    s = ctx["sujet_sub"]
+    key = rng.choice(["devoir", "pouvoir"])
+    return conjuguer_verbe(GVModalPersonal, s["n"], sujet_g=s["g"], verbe_cle=key, sujet_v=_sujet_v(s))
+
+def _realiser_verbe_reflexif(ctx, cle_sujet="sujet"):
+    rng = _rng()
+    s = ctx[cle_sujet]
+    key = rng.choice(CLES_GV_REFLEXIF)
+    return _noter_verbe(ctx, cle_sujet, conjuguer_verbe(GVReflexifAttributif, s["n"], verbe_cle=key,
+                                                        sujet_v=_sujet_v(s)))
+
+def _nb_mots(texte):
+    """Nombre de mots après élision ("le interstice" n'en fait qu'un)."""
+    toks = texte.split()
+    return len(toks) - sum(1 for a, b in zip(toks, toks[1:])
+                           if a.lower() in _ELISIONS and b[0].lower() in _VOYELLES_ELISION)
+
+def _realiser_sp_min(ctx):
+    # Sujet + verbe en moins de trois mots ("Il réside", "L'instance opère") :
+    # phrase trop courte pour être retenue, on impose un premier complément.
+    if _nb_mots(ctx["sujet"]["v"] + " " + ctx.get("verbe", "")) < 3:
         return construire_sp()
-    if symbol == "RELATIVE":
-        return generer_ps_relative(ctx["sujet"])
-    if symbol == "OPPOSITION":
-        return construire_opposition(ctx["sujet"])
-    if symbol in ("QUE", "que"):
-        return "que"
-
     return ""
 
+def _realiser_attribut(ctx):
+    return construire_attribut_correct(ctx["sujet"], ctx.get("verbe_attr"))
+
+def _realiser_attribut_sub(ctx):
+    return construire_attribut_correct(ctx["sujet_sub"], ctx.get("verbe_attr_sub"))
+
+def _realiser_sp_agent(ctx):
+    agent = get_gn_info(GNIndefini, role='complement', ctx=ctx)
+    return formatter_sp_gn_fixed("par", agent)
+
+def _realiser_infinitif_nu(ctx):
+    rng = _rng()
+    return rng.choice(GVInfinitifTransitif)
+
+def _realiser_sp(ctx):
+    return construire_sp()
+
+def _realiser_relative(ctx):
+    return generer_ps_relative(ctx["sujet"])
+
+def _realiser_opposition(ctx):
+    return construire_opposition(ctx["sujet"])
+
+def _realiser_que(ctx):
+    return "que"
+
+REALISATEURS = {
+    "PS_INIT": _realiser_ps_init,
+    "ADV_DETACHE": _realiser_adv_detache,
+    "PS_FINALE": _realiser_ps_finale,
+    "INTRO_SUB": _realiser_intro_sub,
+    "SUJET": _realiser_sujet,
+    "SUJET_SUB": _realiser_sujet_sub,
+    "OBJET": _realiser_objet,
+    "VERBE_TRANS": _realiser_verbe_trans,
+    "VERBE_ATTR": _realiser_verbe_attr,
+    "VERBE_INTRANS": _realiser_verbe_intrans,
+    "VERBE_PASSIF": _realiser_verbe_passif,
+    "VERBE_MODAL": _realiser_verbe_modal,
+    "VERBE_REFLEXIF": _realiser_verbe_reflexif,
+    "ATTRIBUT": _realiser_attribut,
+    "VERBE_TRANS_SUB": partial(_realiser_verbe_trans, cle_sujet="sujet_sub"),
+    "VERBE_ATTR_SUB": partial(_realiser_verbe_attr, cle_sujet="sujet_sub", cle_verbe="verbe_attr_sub"),
+    "VERBE_INTRANS_SUB": partial(_realiser_verbe_intrans, cle_sujet="sujet_sub"),
+    "VERBE_PASSIF_SUB": partial(_realiser_verbe_passif, cle_sujet="sujet_sub"),
+    "VERBE_MODAL_SUB": _realiser_verbe_modal_sub,
+    "VERBE_REFLEXIF_SUB": partial(_realiser_verbe_reflexif, cle_sujet="sujet_sub"),
+    "ATTRIBUT_SUB": _realiser_attribut_sub,
+    "SP_AGENT": _realiser_sp_agent,
+    "INFINITIF_NU": _realiser_infinitif_nu,
+    "SP": _realiser_sp,
+    "SP_MIN": _realiser_sp_min,
+    "RELATIVE": _realiser_relative,
+    "OPPOSITION": _realiser_opposition,
+    "QUE": _realiser_que,
+    "que": _realiser_que,
+}
+
+def realize(symbol, ctx):
+    realiser = REALISATEURS.get(symbol)
+    return realiser(ctx) if realiser is not None else ""
+
+SYMBOLES_SUBORDONNES = ("SUB_EMBED", "PROPOSITION_SUB")
+
 def expand(symbol, ctx, depth=0, sub_depth=0):
-    if depth > MAX_EXPANSION_DEPTH:
+    gen = _gen()
+    if depth > gen.max_expansion_depth:
         return ""
 
     if symbol not in GRAMMAR:
+        if gen.metriques is not None:
+            gen.metriques.expansions[symbol] += 1
         return realize(symbol, ctx)
 
-    if symbol in ("SUB_EMBED", "PROPOSITION_SUB") and sub_depth >= MAX_PROFONDEUR_RECURSIVITE_SUB:
+    if symbol in SYMBOLES_SUBORDONNES and sub_depth >= gen.max_profondeur_sub:
         return ""
 
-    rule = random.choice(GRAMMAR[symbol])
+    regles = GRAMMAR[symbol]
+    table = TABLES_REGLES.get(symbol)
+    k = table.tirer(gen.rng) if table is not None else gen.rng.choice(range(len(regles)))
+    rule = regles[k]
+    if gen.metriques is not None:
+        gen.metriques.compter_regle(symbol, k)
     if not rule:
         return ""
 
     parts = []
     for sym in rule:
         next_sub_depth = sub_depth
-        if sym in ("SUB_EMBED", "PROPOSITION_SUB"):
+        if sym in SYMBOLES_SUBORDONNES:
             next_sub_depth = sub_depth + 1
         chunk = expand(sym, ctx, depth=depth+1, sub_depth=next_sub_depth)
         if chunk:
@@ -938,6 +2006,451 @@ def expand(symbol, ctx, depth=0, sub_depth=0):
 
     return " ".join(parts).strip()
 
+# -----------------------------------------------------------------------------
+# Compilation de la grammaire en fonctions Python
+# -----------------------------------------------------------------------------
+# Chaque non-terminal devient une fonction spécialisée (règles dépliées en
+# branches, réalisateurs terminaux appelés directement, limites de profondeur
+# en littéraux). Le tirage des règles consomme l'aléa exactement comme
+# expand() : même graine, même phrase. Le code objet est mis en cache sur
+# disque (marshal), sous une clé qui couvre la grammaire, les réalisateurs et
+# les limites : toute modification de GRAMMAR produit une nouvelle entrée.
+# La variante instrumentée (métriques actives) est un code distinct : la
+# variante normale ne paie rien.
+
+VERSION_COMPILATEUR = 2
+CACHE_GRAMMAIRE_DIR = CACHE_DIR
+
+_CODES_GRAMMAIRE = {}
+_GRAMMAIRES_COMPILEES = {}
+_EPOQUE_GRAMMAIRE = 0
+
+def _nom_fonction_nt(symbol, i):
+    return f"_nt_{symbol}" if symbol.isidentifier() else f"_nt_{i}"
+
+def _cle_grammaire(grammaire, realisateurs, max_depth, max_sub, instrumente=False, poids=()):
+    signature = repr((VERSION_COMPILATEUR, sorted(grammaire.items()), sorted(realisateurs),
+                      max_depth, max_sub, SYMBOLES_SUBORDONNES, instrumente, poids))
+    return hashlib.sha1(signature.encode("utf-8")).hexdigest()[:16]
+
+def generer_source_grammaire(grammaire, realisateurs, max_depth, max_sub, instrumente=False, pondere=()):
+    """
+    Source Python des fonctions d'expansion, une par non-terminal.
+    instrumente=True : chaque tirage de règle appelle compter(symbole, k).
+    Les symboles de `pondere` tirent leur règle par _p<i>() (TableTirage).
+    """
+    noms = {sym: _nom_fonction_nt(sym, i) for i, sym in enumerate(grammaire)}
+    terminaux = {sym: f"_t{i}" for i, sym in enumerate(realisateurs)}
+    tireurs = {sym: f"_p{i}" for i, sym in enumerate(grammaire) if sym in pondere}
+    lignes = [f"# Généré par Amiral.compiler_grammaire (v{VERSION_COMPILATEUR}) — ne pas éditer."]
+    for sym, regles in grammaire.items():
+        lignes.append(f"def {noms[sym]}(ctx, d, sd):  # {sym}")
+        lignes.append(f"    if d > {max_depth}:")
+        lignes.append("        return ''")
+        if sym in SYMBOLES_SUBORDONNES:
+            lignes.append(f"    if sd >= {max_sub}:")
+            lignes.append("        return ''")
+        if sym in tireurs:
+            lignes.append(f"    r = {tireurs[sym]}()")
+        else:
+            lignes.append(f"    r = choice({tuple(range(len(regles)))!r})")
+        if instrumente:
+            lignes.append(f"    compter({sym!r}, r)")
+        for k, regle in enumerate(regles):
+            lignes.append(f"    {'if' if k == 0 else 'elif'} r == {k}:  # {' '.join(regle) or '∅'}")
+            appels = []
+            for enfant in regle:
+                sd_enfant = "sd + 1" if enfant in SYMBOLES_SUBORDONNES else "sd"
+                if enfant in grammaire:
+                    appels.append(f"{noms[enfant]}(ctx, d + 1, {sd_enfant})")
+                elif enfant in realisateurs:
+                    appels.append(f"({terminaux[enfant]}(ctx) if d < {max_depth} else '')")
+            if not appels:
+                lignes.append("        return ''")
+            elif len(appels) == 1:
+                lignes.append(f"        return {appels[0]}.strip()")
+            else:
+                lignes.append("        p = []")
+                for appel in appels:
+                    lignes.append(f"        c = {appel}")
+                    lignes.append("        if c:")
+                    lignes.append("            p.append(c)")
+                lignes.append("        return ' '.join(p).strip()")
+        lignes.append("    return ''")
+        lignes.append("")
+    lignes.append("POINTS_ENTREE = {" + ", ".join(f"{sym!r}: {noms[sym]}" for sym in grammaire) + "}")
+    return "\n".join(lignes) + "\n"
+
+def _charger_marshal(prefixe, cle, fabriquer):
+    """
+    Objet marshal du cache disque `prefixe`.`cle`, fabriqué et écrit s'il
+    manque. Le nom du fichier porte aussi la clé du source (voir
+    _purger_cache).
+    """
+    tag = sys.implementation.cache_tag or "py"
+    chemin = os.path.join(CACHE_GRAMMAIRE_DIR, f"{prefixe}.{_CLE_INSTANTANE or 'source'}.{cle}.{tag}.marshal")
+    try:
+        with open(chemin, "rb") as f:
+            return marshal.load(f)
+    except (OSError, EOFError, ValueError, TypeError):
+        pass
+    objet = fabriquer()
+    _ecrire_marshal(chemin, objet)
+    _purger_cache(CACHE_GRAMMAIRE_DIR)
+    return objet
+
+def _charger_code_grammaire(cle, fabriquer):
+    return _charger_marshal("amiral_grammaire", cle, fabriquer)
+
+def compiler_grammaire(grammaire=None, realisateurs=None, max_depth=None, max_sub=None, rng=None,
+                       metriques=None, poids=None):
+    """
+    Renvoie {symbole: fonction(ctx, depth, sub_depth)} pour la grammaire donnée
+    (GRAMMAR / REALISATEURS / limites du générateur courant par défaut), les
+    règles étant tirées avec `rng` (module random par défaut) selon `poids`
+    (POIDS_REGLES par défaut). Avec un objet
+    Metriques, renvoie la variante instrumentée qui y compte règles et
+    terminaux. Le code est mémoïsé en mémoire et sur disque ;
+    invalider_grammaire_compilee() vide la mémoire après une modification de
+    GRAMMAR en cours d'exécution.
+    """
+    grammaire = GRAMMAR if grammaire is None else grammaire
+    realisateurs = REALISATEURS if realisateurs is None else realisateurs
+    max_depth = _gen().max_expansion_depth if max_depth is None else max_depth
+    max_sub = _gen().max_profondeur_sub if max_sub is None else max_sub
+    instrumente = metriques is not None
+    tables = _tables_regles(grammaire, POIDS_REGLES if poids is None else poids)
+    signature_poids = _signature_poids(grammaire, {sym: table.poids for sym, table in tables.items()})
+
+    memo = (id(grammaire), id(realisateurs), max_depth, max_sub, instrumente, signature_poids)
+    if rng is None and not instrumente:
+        compilee = _GRAMMAIRES_COMPILEES.get(memo)
+        if compilee is not None:
+            return compilee
+
+    code = _CODES_GRAMMAIRE.get(memo)
+    if code is None:
+        cle = _cle_grammaire(grammaire, realisateurs, max_depth, max_sub, instrumente, signature_poids)
+        code = _charger_code_grammaire(cle, lambda: compile(
+            generer_source_grammaire(grammaire, realisateurs, max_depth, max_sub, instrumente, tables),
+            f"<amiral-grammaire-{cle}>", "exec"))
+        _CODES_GRAMMAIRE[memo] = code
+
+    source = random if rng is None else rng
+    espace = {"choice": source.choice}
+    espace.update((f"_p{i}", partial(tables[sym].tirer, source))
+                  for i, sym in enumerate(grammaire) if sym in tables)
+    if instrumente:
+        espace["compter"] = metriques.compter_regle
+        espace.update((f"_t{i}", metriques.compter_terminal(sym, realiser))
+                      for i, (sym, realiser) in enumerate(realisateurs.items()))
+    else:
+        espace.update((f"_t{i}", realiser) for i, realiser in enumerate(realisateurs.values()))
+    exec(code, espace)
+    compilee = espace["POINTS_ENTREE"]
+    if rng is None and not instrumente:
+        _GRAMMAIRES_COMPILEES[memo] = compilee
+    return compilee
+
+def invalider_grammaire_compilee():
+    global _EPOQUE_GRAMMAIRE
+    _CODES_GRAMMAIRE.clear()
+    _GRAMMAIRES_COMPILEES.clear()
+    _DERIVATIONS.clear()
+    _EPOQUE_GRAMMAIRE += 1
+
+def regler_poids(regles=None, choix=None, probabilites=None):
+    """
+    Modifie les poids en cours d'exécution, par fusion dans POIDS_REGLES
+    ({symbole: poids des règles}, None pour revenir au tirage uniforme),
+    POIDS_CHOIX ({point: {issue: poids}}, mêmes issues) et PROBABILITES
+    ({point: p}). Les tables sont reconstruites et les grammaires compilées
+    invalidées : tous les générateurs du processus suivent dès la phrase
+    suivante (les workers d'un pool déjà lancé gardent leurs poids).
+    Rien n'est modifié si une valeur est invalide.
+    """
+    global TABLES_REGLES
+    poids_regles = dict(POIDS_REGLES)
+    for sym, w in (regles or {}).items():
+        if sym not in GRAMMAR:
+            raise KeyError(f"regler_poids : non-terminal inconnu {sym!r}")
+        if w is None:
+            poids_regles.pop(sym, None)
+        else:
+            poids_regles[sym] = tuple(w)
+    tables_regles = _tables_regles(GRAMMAR, poids_regles)
+
+    tables_choix = {}
+    for point, poids in (choix or {}).items():
+        if set(poids) != set(POIDS_CHOIX[point]):
+            raise ValueError(f"regler_poids : issues de {point!r} attendues : {sorted(map(str, POIDS_CHOIX[point]))}")
+        tables_choix[point] = TableTirage(poids)
+
+    probabilites = dict(probabilites or {})
+    for point, p in probabilites.items():
+        if point not in PROBABILITES:
+            raise KeyError(f"regler_poids : point de décision inconnu {point!r}")
+        if not 0.0 <= p <= 1.0:
+            raise ValueError(f"regler_poids : probabilité hors de [0, 1] pour {point!r}")
+
+    POIDS_REGLES.clear()
+    POIDS_REGLES.update(poids_regles)
+    TABLES_REGLES = tables_regles
+    for point, table in tables_choix.items():
+        POIDS_CHOIX[point] = dict(choix[point])
+        TABLES_CHOIX[point] = table
+    PROBABILITES.update(probabilites)
+    invalider_grammaire_compilee()
+
+def expand_compile(symbol, ctx, depth=0, sub_depth=0):
+    """Équivalent de expand() passant par la grammaire compilée."""
+    entree = _gen().grammaire_compilee().get(symbol)
+    if entree is None:
+        return expand(symbol, ctx, depth, sub_depth)
+    return entree(ctx, depth, sub_depth)
+
+# -----------------------------------------------------------------------------
+# Expansion itérative
+# -----------------------------------------------------------------------------
+# Même parcours que expand() (mêmes tirages dans le même ordre, même texte
+# pour une graine), sans récursion Python : une pile de travail explicite
+# et un tampon de jetons commun où chaque terminal est ajouté. La fin d'un
+# non-terminal est un marqueur (indice de début de son segment dans le
+# tampon) : le " ".join(parts).strip() de expand() n'y touche que les
+# bords du segment, ce que fait _rogner_segment sans rien joindre.
+# Pas plus rapide que expand() (bench moteurs : quelques % d'écart, dans le
+# bruit) : la pile explicite coûte autant que les appels qu'elle remplace.
+# Il sert de repli à "recursif" et "compile" quand max_expansion_depth
+# approche la limite de récursion de Python (Generator._expand_phrase), et
+# n'est pas proposé en ligne de commande.
+
+# Cadres de pile laissés à l'appelant et aux réalisateurs (GN imbriqués)
+MARGE_PILE_EXPANSION = 200
+
+def _rogner_segment(jetons, debut):
+    """Rend jetons[debut:] équivalent à " ".join(jetons[debut:]).strip(), sans joindre."""
+    while len(jetons) > debut:
+        jeton = jetons[debut].lstrip()
+        if jeton:
+            jetons[debut] = jeton
+            break
+        del jetons[debut]
+    while len(jetons) > debut:
+        jeton = jetons[-1].rstrip()
+        if jeton:
+            jetons[-1] = jeton
+            break
+        jetons.pop()
+
+def expand_iteratif(symbol, ctx, depth=0, sub_depth=0):
+    """Équivalent de expand() sur pile explicite (profondeur non bornée par la pile Python ; pas plus rapide)."""
+    gen = _gen()
+    max_depth, max_sub = gen.max_expansion_depth, gen.max_profondeur_sub
+    choice = gen.rng.choice
+    metriques = gen.metriques
+    grammaire, realisateurs, subordonnes = GRAMMAR, REALISATEURS, SYMBOLES_SUBORDONNES
+    tables, rng = TABLES_REGLES, gen.rng
+    jetons = []
+    pile = [(symbol, depth, sub_depth)]
+    while pile:
+        item = pile.pop()
+        if type(item) is int:
+            _rogner_segment(jetons, item)
+            continue
+        sym, d, sd = item
+        if d > max_depth:
+            continue
+        regles = grammaire.get(sym)
+        if regles is None:
+            if metriques is not None:
+                metriques.expansions[sym] += 1
+            realiser = realisateurs.get(sym)
+            if realiser is not None:
+                chunk = realiser(ctx)
+                if chunk:
+                    jetons.append(chunk)
+            continue
+        if sd >= max_sub and sym in subordonnes:
+            continue
+        table = tables.get(sym) if tables else None
+        k = table.tirer(rng) if table is not None else choice(range(len(regles)))
+        regle = regles[k]
+        if metriques is not None:
+            metriques.compter_regle(sym, k)
+        if not regle:
+            continue
+        pile.append(len(jetons))
+        d += 1
+        for enfant in reversed(regle):
+            pile.append((enfant, d, sd + 1 if enfant in subordonnes else sd))
+    return " ".join(jetons)
+
+# -----------------------------------------------------------------------------
+# Dénombrement des dérivations
+# -----------------------------------------------------------------------------
+# Nombre exact (entier Python, sans borne) de dérivations de chaque
+# non-terminal à (profondeur, profondeur de subordination), avec les mêmes
+# coupures que expand(). deriver(k) construit directement la dérivation
+# numéro k : règles dans l'ordre de GRAMMAR, rangs des enfants en base mixte
+# (premier enfant de poids faible). D'où un tirage exactement uniforme parmi
+# les dérivations (moteur "uniforme", sans tenir compte de POIDS_REGLES),
+# des plages de numéros partageables entre machines et une énumération sans
+# répétition de squelette (phrase_numero). Seuls les choix de règles de
+# GRAMMAR sont dénombrés : une « dérivation » est ici un squelette
+# grammatical. Les terminaux sont des réalisateurs (mots, accords, anaphore,
+# GN imbriqués jusqu'à MAX_PROFONDEUR_RECURSIVITE_CN) qui tirent leur propre
+# aléa, hors du compte ; et la réalisation d'un squelette passe encore par
+# la boucle de reprise de Generator (mots retirés si la phrase est
+# invalide). Le nombre de phrases distinctes est donc bien plus grand que
+# le total, et deux numéros peuvent rendre le même texte.
+# Le nombre de dérivations croît d'un facteur à chaque maillon de SP_CHAIN :
+# presque toutes déroulent la chaîne jusqu'à la profondeur limite. Tirées
+# uniformément, les phrases font donc plusieurs centaines de mots à la
+# profondeur 60 (médiane ~500, contre ~30 pour les autres moteurs), et plus
+# de 50 encore à la profondeur 8. C'est la loi uniforme elle-même, pas un
+# défaut de coupure : "uniforme" sert à explorer la grammaire et n'est pas
+# proposé en ligne de commande (MOTEURS_LIGNE_COMMANDE).
+
+_DERIVATIONS = {}
+
+class Derivations:
+    """Comptes des squelettes (choix de règles) de GRAMMAR pour des limites données, et dérang."""
+
+    def __init__(self, grammaire=None, realisateurs=None, max_depth=None, max_sub=None):
+        self.grammaire = GRAMMAR if grammaire is None else grammaire
+        self.realisateurs = REALISATEURS if realisateurs is None else realisateurs
+        self.max_depth = _gen().max_expansion_depth if max_depth is None else max_depth
+        self.max_sub = _gen().max_profondeur_sub if max_sub is None else max_sub
+        # (symbole, profondeur, subordination) -> [(enfants, comptes des enfants, produit)] par règle
+        self._regles = {}
+        self.total = self.compter("PHRASE")
+
+    def _coupe(self, symbole, depth, sub_depth):
+        # Mêmes coupures que expand(), plus la profondeur limite elle-même : à
+        # max_depth, tous les enfants sont coupés et chaque règle ne produit
+        # rien, ce qui ne fait qu'une dérivation
+        return depth >= self.max_depth or (symbole in SYMBOLES_SUBORDONNES and sub_depth >= self.max_sub)
+
+    def _regles_de(self, symbole, depth, sub_depth):
+        cle = (symbole, depth, sub_depth)
+        regles = self._regles.get(cle)
+        if regles is None:
+            regles = []
+            for regle in self.grammaire[symbole]:
+                enfants = tuple((e, depth + 1, sub_depth + 1 if e in SYMBOLES_SUBORDONNES else sub_depth)
+                                for e in regle)
+                comptes = tuple(self.compter(*enfant) for enfant in enfants)
+                regles.append((enfants, comptes, math.prod(comptes)))
+            self._regles[cle] = regles
+        return regles
+
+    def compter(self, symbole, depth=0, sub_depth=0):
+        """Nombre de dérivations de `symbole` (1 pour un terminal ou une branche coupée)."""
+        if symbole not in self.grammaire or self._coupe(symbole, depth, sub_depth):
+            return 1
+        return sum(n for _enfants, _comptes, n in self._regles_de(symbole, depth, sub_depth))
+
+    def deriver(self, k, symbole="PHRASE", depth=0, sub_depth=0, choix=None):
+        """
+        Terminaux, dans l'ordre, de la dérivation numéro k de `symbole` (0 <=
+        k < compter(...)). Si `choix` est une liste, y ajoute le numéro de la
+        règle choisie à chaque non-terminal non coupé, en ordre préfixe (voir rang).
+        """
+        if not 0 <= k < self.compter(symbole, depth, sub_depth):
+            raise IndexError(f"dérivation {k} hors de [0, {self.compter(symbole, depth, sub_depth)})")
+        grammaire, realisateurs = self.grammaire, self.realisateurs
+        terminaux = []
+        pile = [(symbole, depth, sub_depth, k)]
+        while pile:
+            sym, d, sd, k = pile.pop()
+            if sym not in grammaire:
+                if sym in realisateurs and d <= self.max_depth:
+                    terminaux.append(sym)
+                continue
+            if self._coupe(sym, d, sd):
+                continue
+            for j, (enfants, comptes, n) in enumerate(self._regles_de(sym, d, sd)):
+                if k < n:
+                    break
+                k -= n
+            if choix is not None:
+                choix.append(j)
+            rangs = []
+            for c in comptes:
+                k, r = divmod(k, c)
+                rangs.append(r)
+            pile.extend((*enfant, r) for enfant, r in zip(reversed(enfants), reversed(rangs)))
+        return tuple(terminaux)
+
+    def rang(self, choix, symbole="PHRASE", depth=0, sub_depth=0):
+        """Numéro de la dérivation de `symbole` dont les règles choisies sont `choix` (inverse de deriver)."""
+        suite = iter(choix)
+
+        def rang_de(sym, d, sd):
+            if sym not in self.grammaire or self._coupe(sym, d, sd):
+                return 0
+            regles = self._regles_de(sym, d, sd)
+            j = next(suite)
+            enfants, comptes, _n = regles[j]
+            k, base = 0, 1
+            for enfant, c in zip(enfants, comptes):
+                k += rang_de(*enfant) * base
+                base *= c
+            return sum(n for _enfants, _comptes, n in regles[:j]) + k
+
+        return rang_de(symbole, depth, sub_depth)
+
+    def tirer(self, rng, symbole="PHRASE", depth=0, sub_depth=0):
+        """Dérivation uniforme parmi toutes celles de `symbole`."""
+        return self.deriver(_entier_uniforme(rng, self.compter(symbole, depth, sub_depth)), symbole, depth, sub_depth)
+
+def _entier_uniforme(rng, n):
+    """Entier uniforme de [0, n), n aussi grand que voulu (rejet sur getrandbits)."""
+    bits = n.bit_length()
+    r = rng.getrandbits(bits)
+    while r >= n:
+        r = rng.getrandbits(bits)
+    return r
+
+def derivations(max_depth=None, max_sub=None):
+    """Derivations de GRAMMAR pour ces limites (celles du générateur courant par défaut), mémoïsées."""
+    max_depth = _gen().max_expansion_depth if max_depth is None else max_depth
+    max_sub = _gen().max_profondeur_sub if max_sub is None else max_sub
+    memo = (_EPOQUE_GRAMMAIRE, id(GRAMMAR), id(REALISATEURS), max_depth, max_sub)
+    table = _DERIVATIONS.get(memo)
+    if table is None:
+        table = _DERIVATIONS[memo] = Derivations(GRAMMAR, REALISATEURS, max_depth, max_sub)
+    return table
+
+def compter_derivations(symbole="PHRASE", max_depth=None, max_sub=None):
+    """Nombre exact de squelettes (choix de règles) de `symbole` dans GRAMMAR aux limites données."""
+    return derivations(max_depth, max_sub).compter(symbole)
+
+def realiser_derivation(terminaux, ctx):
+    """Texte d'une dérivation (suite de terminaux), réalisés dans l'ordre."""
+    parts = []
+    for sym in terminaux:
+        c = REALISATEURS[sym](ctx)
+        if c:
+            parts.append(c)
+    return " ".join(parts).strip()
+
+def expand_uniforme(symbol, ctx, depth=0, sub_depth=0):
+    """
+    Dérivation de `symbol` tirée uniformément (voir Derivations), puis
+    réalisée. Phrases très longues : voir l'en-tête de cette section.
+    """
+    gen = _gen()
+    table = derivations(gen.max_expansion_depth, gen.max_profondeur_sub)
+    return realiser_derivation(table.tirer(gen.rng, symbol, depth, sub_depth), ctx)
+
+MOTEURS_EXPANSION = {"recursif": expand, "iteratif": expand_iteratif, "compile": expand_compile,
+                     "uniforme": expand_uniforme}
+MOTEUR_EXPANSION = "compile"
+# Moteurs de --moteur : ceux qui suivent la loi de la grammaire (pas "uniforme"),
+# sauf "iteratif", simple repli des deux autres
+MOTEURS_LIGNE_COMMANDE = ("compile", "recursif")
+
 # =============================================================================
 # Post-traitement (ponctuation + nettoyages + anti-bégaiements)
 # =============================================================================
@@ -974,7 +2487,12 @@ def _collapse_repeated_prep_phrases(txt: str) -> str:
             break
     return cur
 
-def post_process_phrase(phrase):
+def _post_process_phrase_regex(phrase):
+    """
+    Chaîne de référence (une substitution regex par règle).
+    Sert de repli au moteur en une passe pour les entrées qu'il ne modélise pas
+    (ponctuation, bégaiement de modaux) et de témoin pour les vérifications.
+    """
     phrase = re.sub(r'\s+', ' ', phrase).strip()
     phrase = re.sub(r'\s([,.:;?!])', r'\1', phrase)
 
@@ -989,7 +2507,7 @@ def post_process_phrase(phrase):
     phrase = re.sub(r'\b(et)\s+(affirme|suggère|montre|démontre)\s*,\s*que\b', r'\1 \2 que', phrase, flags=re.IGNORECASE)
 
     phrase = re.sub(r'\b(doit|peut|devons|pouvons|doivent|peuvent)\s+\1\b', r'\1', phrase, flags=re.IGNORECASE)
-    phrase = re.sub(r'\b(\w+)\s+\1\b', r'\1', phrase, flags=re.IGNORECASE)
+    phrase = re.sub(r'\b(?!nous\b)(\w+)\s+\1\b', r'\1', phrase, flags=re.IGNORECASE)  # "nous nous" (pronominal) reste
 
     # PATCH: anti-bégaiements structurés (du X du X, etc.)
     phrase = _collapse_repeated_prep_phrases(phrase)
@@ -1002,6 +2520,172 @@ def post_process_phrase(phrase):
         phrase = phrase[0].upper() + phrase[1:]
     return phrase
 
+# -----------------------------------------------------------------------------
+# Moteur de post-traitement en une passe
+# -----------------------------------------------------------------------------
+# Doit rendre le même texte que _post_process_phrase_regex (vérifié par
+# test_amiral.py sur un corpus à graine fixe et des cas limites), mais en un
+# seul parcours gauche-droite des tokens : élision, apostrophes orphelines,
+# contractions (de+le, à+les...), bégaiements de mots, puis ponctuation finale
+# et majuscule. Comme les regex (\b), élisions et contractions portent sur le
+# segment final d'un token composé et le segment initial du suivant ("de-le à"
+# -> "de-l'à", "de le-X" -> "du-X"), en chaîne. Les cas rares que la passe ne
+# modélise pas renvoient vers la chaîne regex (ponctuation dans le brut,
+# bégaiement de modal) ; la réduction des syntagmes répétés n'est appelée que
+# si un marqueur prépositionnel se répète dans une fenêtre de 7 tokens.
+
+_ELISIONS = {"le": "l'", "la": "l'", "de": "d'", "que": "qu'", "se": "s'"}
+_VOYELLES_ELISION = frozenset("aeiouyéèàôêïh")
+_CONTRACTIONS = {"de": {"le": "du", "les": "des"}, "à": {"le": "au", "les": "aux"}}
+_FINS_CONTRACTION = tuple(_CONTRACTIONS)
+_APOSTROPHE_ORPHELINE = frozenset("dlmnstcquj")
+_MODAUX_BEGAIEMENT = frozenset({"doit", "peut", "devons", "pouvons", "doivent", "peuvent"})
+_MARQUEURS_SP = frozenset({"du", "des", "de", "au", "aux", "à"})
+_PONCTUATION_BRUTE = (",", ".", ":", ";", "?", "!")
+_FENETRE_SP = 7
+_RE_FIN_MOT = re.compile(r"\w+$")
+_RE_DEBUT_MOT = re.compile(r"\w+")
+
+def _est_car_mot(c: str) -> bool:
+    return c.isalnum() or c == "_"
+
+def _fin_mot(tok: str) -> str:
+    """Dernier segment alphanumérique du token (vide s'il finit par un non-mot)."""
+    if tok.isalnum():
+        return tok
+    m = _RE_FIN_MOT.search(tok)
+    return m.group(0) if m else ""
+
+def _sp_peut_se_repeter(toks, candidats):
+    """
+    Sur-ensemble peu coûteux des motifs de _collapse_repeated_prep_phrases :
+    même marqueur (du/des/de la/de l'/au/aux/à la/à l'/d') deux fois dans
+    la fenêtre, suivi du même premier mot.
+    """
+    nb = len(toks)
+    for x, a in enumerate(candidats):
+        la = toks[a].lower()
+        fa = la if la in _MARQUEURS_SP else _fin_mot(la)
+        da = la[la.rfind("d'"):] if "d'" in la else ""
+        for b in candidats[x + 1:]:
+            if b - a > _FENETRE_SP:
+                break
+            lb = toks[b].lower()
+            if da and lb.startswith("d'") and (lb.startswith(da) or da == "d'" or lb == "d'"):
+                return True
+            if lb != fa or lb not in _MARQUEURS_SP or b + 1 >= nb:
+                continue
+            sa, sb = toks[a + 1].lower(), toks[b + 1].lower()
+            if lb not in _CONTRACTIONS:        # du / des / au / aux
+                if sb.startswith(sa):
+                    return True
+            elif sa == "la" == sb:             # de la / à la
+                if b + 2 < nb and toks[b + 2].lower().startswith(toks[a + 2].lower()):
+                    return True
+            elif sa[:2] == "l'" and sb[:2] == "l'" and (sb.startswith(sa) or sa == "l'" or sb == "l'"):
+                return True                    # de l' / à l'
+    return False
+
+def _elider(t, low, i, fin, toks):
+    """
+    Élide le segment final `fin` de t devant toks[i], puis de même tant que
+    le token fusionné finit par un mot élidable devant une voyelle ("de
+    y-se y" -> "d'y-s'y"). Renvoie (t, low, i, fin) mis à jour.
+    """
+    nb = len(toks)
+    while True:
+        t = t[:len(t) - len(fin)] + _ELISIONS[fin] + toks[i]
+        low = t.lower()
+        i += 1
+        fin = _fin_mot(low)
+        if not (fin in _ELISIONS and i < nb and toks[i][0].lower() in _VOYELLES_ELISION):
+            return t, low, i, fin
+
+def post_process_phrase(phrase):
+    for c in _PONCTUATION_BRUTE:
+        if c in phrase:
+            return _post_process_phrase_regex(phrase)
+
+    toks = phrase.split()
+    nb = len(toks)
+    out = []
+    candidats = []
+    fin_prec = ""   # segment final (minuscule) du dernier token encore susceptible de bégayer
+    prefixe = ""
+    i = 0
+    while i < nb:
+        t = toks[i]
+        low = t.lower()
+        i += 1
+
+        # Élision (le/la/de/que/se + voyelle), sur le segment final du token
+        # comme la regex (\ble après un tiret : "de-le à" -> "de-l'à")
+        fin = low if low in _ELISIONS or low.isalnum() else _fin_mot(low)
+        if fin in _ELISIONS and i < nb and toks[i][0].lower() in _VOYELLES_ELISION:
+            t, low, i, fin = _elider(t, low, i, fin, toks)
+        # Apostrophe orpheline ("l' X" -> "l'X")
+        elif (i < nb and len(t) >= 2 and t[-1] == "'" and low[-2] in _APOSTROPHE_ORPHELINE
+              and (len(t) == 2 or not _est_car_mot(t[-3]))):
+            prefixe += t
+            continue
+
+        if prefixe:
+            t = prefixe + t
+            low = t.lower()
+            prefixe = ""
+
+        # Contractions (de le -> du, à les -> aux...) sur le segment final du
+        # token ("l'à les" -> "l'aux") et le segment initial du suivant
+        # ("de le-X" -> "du-X") ; un "le" élidé n'est pas contracté. La fin du
+        # token fusionné peut de nouveau s'élider ou se contracter.
+        while i < nb and low.endswith(_FINS_CONTRACTION):
+            fin = low if low in _CONTRACTIONS else _fin_mot(low)
+            if fin not in _CONTRACTIONS:
+                break
+            suivant = toks[i]
+            m = _RE_DEBUT_MOT.match(suivant)
+            contr = _CONTRACTIONS[fin].get(m.group(0).lower()) if m else None
+            if not contr or (len(suivant) == 2 and i + 1 < nb and toks[i + 1][0].lower() in _VOYELLES_ELISION):
+                break
+            t = t[:len(t) - len(fin)] + contr + suivant[m.end():]
+            low = t.lower()
+            i += 1
+            fin = _fin_mot(low)
+            if fin in _ELISIONS and i < nb and toks[i][0].lower() in _VOYELLES_ELISION:
+                t, low, i, fin = _elider(t, low, i, fin, toks)
+
+        # Bégaiement de mot : "X X" -> "X" (segment final du précédent répété)
+        lf = len(fin_prec)
+        if lf and low.startswith(fin_prec) and (len(low) == lf or not _est_car_mot(low[lf])) and fin_prec != "nous":
+            if fin_prec in _MODAUX_BEGAIEMENT:
+                return _post_process_phrase_regex(phrase)
+            reste = t[lf:]
+            out[-1] += reste
+            fin_prec = _fin_mot(reste.lower()) if reste else ""
+            if not candidats or candidats[-1] != len(out) - 1:
+                candidats.append(len(out) - 1)
+            continue
+
+        if low.isalnum():
+            fin_prec = low
+            if low in _MARQUEURS_SP:
+                candidats.append(len(out))
+        else:
+            fin_prec = _fin_mot(low)
+            if fin_prec in _MARQUEURS_SP or "d'" in low:
+                candidats.append(len(out))
+        out.append(t)
+
+    phrase = " ".join(out)
+    if len(candidats) > 1 and _sp_peut_se_repeter(out, candidats):
+        phrase = _collapse_repeated_prep_phrases(phrase)
+
+    if phrase:
+        phrase += "."
+        if phrase[0].isalpha():
+            phrase = phrase[0].upper() + phrase[1:]
+    return phrase
+
 # =============================================================================
 # Validation “anti-coupure” (en amont) : on refuse les fragments
 # =============================================================================
@@ -1016,66 +2700,1305 @@ def _finite_verb_forms_set():
     # formes "nous" explicites
     for f in GV_PERSONNEL_NOUS_EXPLICIT.values():
         forms.add(f)
+    # formes "nous" produites par conjuguer_verbe (dont les pronominaux)
+    for d in (GVTransitif, GVAttributif, GVIntransitif, GVModalPersonal, GVReflexifAttributif):
+        for base in d:
+            forms.add(conjuguer_verbe(d, "p", verbe_cle=base, sujet_v="nous"))
+    # la vérification compte par mot : "se constitue" -> "constitue"
+    forms.update([f.split()[-1] for f in forms if " " in f])
     # passif = "est/sont + pp" (on ne liste pas tout, mais "est"/"sont" aide)
     forms.add("est")
     forms.add("sont")
+    forms.add("sommes")
     return forms
 
-FINITE_FORMS = _finite_verb_forms_set()
+FINITE_FORMS = _derive("FINITE_FORMS", _finite_verb_forms_set)
 
-def _looks_like_fragment(s: str) -> bool:
+# Dernière structure dérivée : instantané (ré)écrit si l'une a été reconstruite
+_enregistrer_instantane()
+
+def raison_fragment(s: str):
+    """
+    Motif de rejet d'un texte de phrase fini (None s'il est recevable).
+    Le Generator n'en a plus besoin (voir raison_invalidite) ; reste utile
+    pour juger un texte venu d'ailleurs.
+    """
     s = (s or "").strip()
     if not s:
-        return True
+        return "vide"
 
     # "Nous." / "Il." / "On."
     if re.fullmatch(r"(?i)(nous|il|on)\.?", s):
-        return True
+        return "pronom seul"
 
     # Trop court, sans verbe visible
     tokens = re.findall(r"[A-Za-zÀ-ÖØ-öø-ÿœ']+", s.lower())
     if len(tokens) < 3:
-        return True
+        return "trop court"
 
     # Doit contenir au moins un verbe fini connu (heuristique robuste ici)
     has_finite = any(tok in FINITE_FORMS for tok in tokens)
     if not has_finite:
-        return True
+        return "sans verbe fini"
 
     # Empêche des enchaînements du type "Il via ..." (préposition juste après pronom)
     if re.match(r"(?i)^(il|nous|on)\s+(via|par|dans|sur|au)\b", s):
+        return "pronom + préposition"
+
+    return None
+
+def _looks_like_fragment(s: str) -> bool:
+    return raison_fragment(s) is not None
+
+# =============================================================================
+# Métriques
+# =============================================================================
+
+# Bornes (incluses) des histogrammes, en caractères et en mots par phrase
+BORNES_LONGUEUR_PHRASE = (50, 100, 200, 400, 800, 1600)
+BORNES_MOTS_PHRASE = (5, 10, 20, 40, 80, 160)
+
+def _etiquette_prometheus(valeur):
+    return str(valeur).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+class Metriques:
+    """
+    Compteurs optionnels d'un Generator (Generator(metriques=Metriques())).
+    Sans objet Metriques, le générateur suit son chemin habituel et ne paie
+    qu'un test sur None par phrase. Le mode par lots (workers/executor)
+    tourne dans d'autres processus et n'est pas compté.
+    """
+
+    def __init__(self):
+        self.expansions = Counter()      # symbole (non-terminal ou terminal) -> expansions
+        self.regles = Counter()          # (non-terminal, indice de règle) -> tirages
+        self.rejets = Counter()          # motif de rejet (abandon ou raison_invalidite) -> rejets
+        self.phrases = 0
+        self.tentatives = 0
+        self.secours = 0
+        self.doublons = 0                # phrases écartées par le dédoublonnage
+        self.saturations_dedup = 0       # remises à zéro du filtre saturé
+        self.duree_expand = 0.0          # secondes (perf_counter)
+        self.duree_post_process = 0.0
+        self.hist_longueur = [0] * (len(BORNES_LONGUEUR_PHRASE) + 1)   # dernière case : au-delà
+        self.hist_mots = [0] * (len(BORNES_MOTS_PHRASE) + 1)
+        self.somme_longueur = 0
+        self.somme_mots = 0
+
+    def compter_regle(self, symbole, k):
+        self.expansions[symbole] += 1
+        self.regles[symbole, k] += 1
+
+    def compter_terminal(self, symbole, realiser):
+        """Enveloppe un réalisateur pour compter ses appels."""
+        expansions = self.expansions
+        def realiser_compte(ctx):
+            expansions[symbole] += 1
+            return realiser(ctx)
+        return realiser_compte
+
+    def compter_phrase(self, phrase):
+        longueur, mots = len(phrase), len(phrase.split())
+        self.hist_longueur[bisect.bisect_left(BORNES_LONGUEUR_PHRASE, longueur)] += 1
+        self.hist_mots[bisect.bisect_left(BORNES_MOTS_PHRASE, mots)] += 1
+        self.somme_longueur += longueur
+        self.somme_mots += mots
+
+    def taux_rejet(self):
+        return sum(self.rejets.values()) / self.tentatives if self.tentatives else 0.0
+
+    def en_dict(self):
+        """Instantané sérialisable (JSON) des compteurs."""
+        def histogramme(bornes, cases, somme):
+            return {"bornes": list(bornes), "cases": list(cases), "somme": somme, "total": sum(cases)}
+        return {
+            "phrases": self.phrases,
+            "tentatives": self.tentatives,
+            "rejets": dict(self.rejets),
+            "taux_rejet": self.taux_rejet(),
+            "secours": self.secours,
+            "doublons": self.doublons,
+            "saturations_dedup": self.saturations_dedup,
+            "expansions": dict(self.expansions),
+            "regles": {f"{sym}[{k}]": n for (sym, k), n in self.regles.items()},
+            "duree_s": {"expand": self.duree_expand, "post_process": self.duree_post_process},
+            "longueur_phrase": histogramme(BORNES_LONGUEUR_PHRASE, self.hist_longueur, self.somme_longueur),
+            "mots_phrase": histogramme(BORNES_MOTS_PHRASE, self.hist_mots, self.somme_mots),
+        }
+
+    def en_prometheus(self, prefixe="amiral"):
+        """Compteurs au format texte d'exposition Prometheus (version 0.0.4)."""
+        lignes = []
+        def famille(nom, type_, aide, echantillons):
+            lignes.append(f"# HELP {prefixe}_{nom} {aide}")
+            lignes.append(f"# TYPE {prefixe}_{nom} {type_}")
+            for suffixe, etiquettes, valeur in echantillons:
+                texte = ",".join(f'{cle}="{_etiquette_prometheus(v)}"' for cle, v in etiquettes)
+                lignes.append(f"{prefixe}_{nom}{suffixe}{{{texte}}} {valeur}" if texte
+                              else f"{prefixe}_{nom}{suffixe} {valeur}")
+        def histogramme(bornes, cases, somme):
+            cumul, echantillons = 0, []
+            for borne, n in zip(list(bornes) + ["+Inf"], cases):
+                cumul += n
+                echantillons.append(("_bucket", [("le", borne)], cumul))
+            return echantillons + [("_sum", [], somme), ("_count", [], cumul)]
+
+        famille("phrases_total", "counter", "Phrases produites.", [("", [], self.phrases)])
+        famille("tentatives_total", "counter", "Expansions de PHRASE (retries compris).",
+                [("", [], self.tentatives)])
+        famille("rejets_total", "counter", "Expansions rejetées par motif.",
+                [("", [("motif", motif)], n) for motif, n in sorted(self.rejets.items())])
+        famille("secours_total", "counter", "Phrases de secours émises.", [("", [], self.secours)])
+        famille("doublons_total", "counter", "Phrases écartées comme doublons (filtre de Bloom).",
+                [("", [], self.doublons)])
+        famille("saturations_dedup_total", "counter", "Remises à zéro du filtre de dédoublonnage saturé.",
+                [("", [], self.saturations_dedup)])
+        famille("expansions_total", "counter", "Expansions par symbole de la grammaire.",
+                [("", [("symbole", sym)], n) for sym, n in sorted(self.expansions.items())])
+        famille("regles_total", "counter", "Tirages par règle (indice dans GRAMMAR).",
+                [("", [("symbole", sym), ("regle", k)], n) for (sym, k), n in sorted(self.regles.items())])
+        famille("duree_secondes_total", "counter", "Temps cumulé par étape.",
+                [("", [("etape", "expand")], repr(self.duree_expand)),
+                 ("", [("etape", "post_process")], repr(self.duree_post_process))])
+        famille("longueur_phrase_caracteres", "histogram", "Longueur des phrases en caractères.",
+                histogramme(BORNES_LONGUEUR_PHRASE, self.hist_longueur, self.somme_longueur))
+        famille("mots_phrase", "histogram", "Nombre de mots par phrase.",
+                histogramme(BORNES_MOTS_PHRASE, self.hist_mots, self.somme_mots))
+        return "\n".join(lignes) + "\n"
+
+# =============================================================================
+# Dédoublonnage (filtre de Bloom)
+# =============================================================================
+# Sur des millions de phrases, un ensemble exact de tout ce qui a été émis
+# ne tient plus en mémoire. Le filtre de Bloom occupe une taille fixe ; il
+# peut se tromper dans un seul sens : une phrase nouvelle prise pour un
+# doublon (faux positif, elle est alors simplement régénérée). Hachage
+# blake2b plutôt que hash() : ce dernier change d'un processus à l'autre
+# (PYTHONHASHSEED), et le texte d'une graine doit rester reproductible.
+# Au-delà de sa capacité, le taux de faux positifs tend vers 1 : presque
+# chaque phrase serait retirée MAX_RETRY_DOUBLON fois, puis acceptée quand
+# même. Le filtre saturé repart donc à vide (vider_si_sature), avec un
+# avertissement : les phrases d'avant la remise à zéro peuvent revenir.
+
+class FiltreBloom:
+    """
+    Filtre de Bloom de `memoire_octets` octets, dimensionné pour
+    `taux_faux_positifs` : capacite est le nombre d'éléments au-delà duquel
+    ce taux n'est plus tenu (voir sature()).
+    """
+
+    def __init__(self, memoire_octets=MEMOIRE_FILTRE_DEDUP, taux_faux_positifs=TAUX_FAUX_POSITIFS_DEDUP):
+        if memoire_octets < 1:
+            raise ValueError("memoire_octets doit être >= 1")
+        if not 0.0 < taux_faux_positifs < 1.0:
+            raise ValueError("taux_faux_positifs doit être dans ]0, 1[")
+        self.bits = bytearray(memoire_octets)
+        self.m = 8 * memoire_octets
+        self.k = max(1, math.ceil(-math.log2(taux_faux_positifs)))
+        self.taux_faux_positifs = taux_faux_positifs
+        self.capacite = int(self.m * math.log(2) ** 2 / -math.log(taux_faux_positifs))
+        self.elements = 0
+        self.bits_a_un = 0
+
+    def _positions(self, texte):
+        h = hashlib.blake2b(texte.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(h[:8], "little")
+        h2 = int.from_bytes(h[8:], "little") | 1
+        m = self.m
+        return [(h1 + i * h2) % m for i in range(self.k)]
+
+    def __contains__(self, texte):
+        bits = self.bits
+        return all(bits[p >> 3] >> (p & 7) & 1 for p in self._positions(texte))
+
+    def ajouter(self, texte):
+        """Ajoute `texte` ; renvoie True s'il était (probablement) déjà présent."""
+        bits = self.bits
+        nouveaux = 0
+        for p in self._positions(texte):
+            octet, masque = p >> 3, 1 << (p & 7)
+            if not bits[octet] & masque:
+                bits[octet] |= masque
+                nouveaux += 1
+        if not nouveaux:
+            return True
+        self.bits_a_un += nouveaux
+        self.elements += 1
+        return False
+
+    def remplissage(self):
+        """Part des bits à 1 (0,5 environ à pleine capacité)."""
+        return self.bits_a_un / self.m
+
+    def taux_faux_positifs_estime(self):
+        """Taux de faux positifs au remplissage actuel."""
+        return self.remplissage() ** self.k
+
+    def sature(self):
+        return self.elements > self.capacite
+
+    def vider(self):
+        """Repart d'un filtre vide, de même taille."""
+        self.bits = bytearray(len(self.bits))
+        self.elements = 0
+        self.bits_a_un = 0
+
+    def vider_si_sature(self):
+        """Vide le filtre (RuntimeWarning) s'il a dépassé sa capacité ; renvoie True dans ce cas."""
+        if not self.sature():
+            return False
+        warnings.warn(f"filtre de dédoublonnage saturé ({self.elements} phrases pour une capacité de "
+                      f"{self.capacite}) : remis à zéro", RuntimeWarning, stacklevel=3)
+        self.vider()
         return True
 
-    return False
+    def en_dict(self):
+        return {
+            "octets": len(self.bits),
+            "k": self.k,
+            "capacite": self.capacite,
+            "elements": self.elements,
+            "remplissage": self.remplissage(),
+            "taux_faux_positifs_cible": self.taux_faux_positifs,
+            "taux_faux_positifs_estime": self.taux_faux_positifs_estime(),
+        }
 
 # =============================================================================
 # Génération
 # =============================================================================
 
-def generate_sentence():
-    global LAST_GN_INFO
-    for _ in range(MAX_RETRY_SENTENCE):
-        LAST_GN_INFO = None
-        ctx = {"person_policy": None}
-        raw = expand("PHRASE", ctx)
-        s = post_process_phrase(raw)
-
-        # PATCH: si fragment -> on régénère (au lieu de “nettoyer”)
-        if _looks_like_fragment(s):
-            continue
+class Generator:
+    """
+    Générateur autonome : son propre random.Random, son état d'anaphore
+    (dernier GN sujet) et ses paramètres. Deux instances ne partagent rien,
+    on peut donc en faire tourner une par thread sans verrou ; une même
+    instance ne doit pas être utilisée par deux threads à la fois.
+    """
 
+    def __init__(self, seed=None, *, rng=None, source=None, possessive_det_prob=None, max_expansion_depth=None,
+                 max_profondeur_sub=None, max_profondeur_cn=None, max_retry_sentence=None, moteur=None,
+                 metriques=None, dedup=None, recence=None, facteur_recence=None, compteur=False, debut=0):
+        # Paramètres non fournis : valeur des constantes du module à la construction
+        def _ou(valeur, defaut):
+            return defaut if valeur is None else valeur
+
+        # Aléa : objet fourni, sinon source nommée de SOURCES_ALEA ("stdlib" par défaut)
+        source = source or "stdlib"
+        # Le mode compteur resème l'aléa à chaque phrase : avec NumPy, chaque
+        # graine coûterait un default_rng et un bloc de TAILLE_POOL_ALEA uniformes
+        if compteur and (source == "numpy" or getattr(rng, "use_numpy", False)):
+            raise ValueError('mode compteur incompatible avec la source "numpy" (utiliser "stdlib" ou "rapide")')
+        if rng is None:
+            rng = SOURCES_ALEA[source](seed)
+        self.possessive_det_prob = _ou(possessive_det_prob, POSSESSIVE_DET_PROB)
+        self.max_expansion_depth = _ou(max_expansion_depth, MAX_EXPANSION_DEPTH)
+        self.max_profondeur_sub = _ou(max_profondeur_sub, MAX_PROFONDEUR_RECURSIVITE_SUB)
+        self.max_profondeur_cn = _ou(max_profondeur_cn, MAX_PROFONDEUR_RECURSIVITE_CN)
+        self.max_retry_sentence = _ou(max_retry_sentence, MAX_RETRY_SENTENCE)
+        self.moteur = _ou(moteur, MOTEUR_EXPANSION)
+        # Métriques : objet Metriques, True pour en créer un, None (défaut) pour aucune
+        if metriques is True:
+            metriques = Metriques()
+        # Dédoublonnage : FiltreBloom, True pour un filtre par défaut, None (défaut) pour aucun
+        if dedup is True:
+            dedup = FiltreBloom()
+        # Récence lexicale : RecenceLexicale, True (fenêtre par défaut) ou taille de fenêtre ; None pour aucune
+        if recence is True:
+            recence = FENETRE_RECENCE
+        if isinstance(recence, int):
+            recence = RecenceLexicale(recence, _ou(facteur_recence, FACTEUR_RECENCE)) if recence else None
+        # Mode compteur : la phrase i est tirée d'un aléa resemé par
+        # graine_phrase(graine, i) ; debut est le numéro de la première phrase
+        if compteur:
+            if dedup is not None or recence is not None:
+                raise ValueError("mode compteur incompatible avec dedup et recence (phrases dépendantes)")
+            if seed is None:
+                seed = int.from_bytes(os.urandom(8), "big") >> 1
+        self._initialiser(rng, source, metriques=metriques, dedup=dedup, recence=recence, compteur=compteur,
+                          graine=seed, debut=debut)
+
+    def _initialiser(self, rng, source, *, metriques=None, dedup=None, recence=None, compteur=False, graine=None,
+                     debut=0):
+        """État d'un générateur hors paramètres de génération (commun avec _GenerateurModule)."""
+        self.rng = rng
+        self.source = source
+        self.metriques = metriques
+        self.dedup = dedup
+        self.recence = recence
+        self.compteur = compteur
+        self.graine = graine
+        self.index = debut
+        self.last_gn_info = None
+        self._compilee = None
+        self._cle_compilee = None
+        # Compteurs du tri final : phrases, tentatives (expansions), rejets, secours
+        self.phrases = self.tentatives = self.rejets = self.secours = 0
+        self.doublons = self.saturations_dedup = 0
+
+    def seed(self, seed=None):
+        self.rng.seed(seed)
+        self.graine = seed
+        self.index = 0
+        self.last_gn_info = None
+        if self.recence is not None:
+            self.recence.vider()
+
+    def aller_a(self, index):
+        """Mode compteur : la prochaine phrase sera la phrase numéro `index` (saut en O(1))."""
+        if not self.compteur:
+            raise ValueError("aller_a : réservé au mode compteur (Generator(compteur=True))")
+        self.index = index
+
+    def phrase(self, index):
+        """Mode compteur : phrase numéro `index`, recalculée seule ; la position courante ne change pas."""
+        position = self.index
+        self.aller_a(index)
+        try:
+            return self.generate_sentence()
+        finally:
+            self.index = position
+
+    def grammaire_compilee(self):
+        cle = (_EPOQUE_GRAMMAIRE, id(GRAMMAR), self.max_expansion_depth, self.max_profondeur_sub,
+               id(self.metriques))
+        if cle != self._cle_compilee:
+            self._compilee = compiler_grammaire(max_depth=self.max_expansion_depth,
+                                                max_sub=self.max_profondeur_sub, rng=self.rng,
+                                                metriques=self.metriques)
+            self._cle_compilee = cle
+        return self._compilee
+
+    def _expand_phrase(self, ctx):
+        moteur = self.moteur
+        # Trop profond pour la pile Python : même texte par la pile explicite
+        if (self.max_expansion_depth > sys.getrecursionlimit() - MARGE_PILE_EXPANSION
+                and moteur in ("recursif", "compile")):
+            return expand_iteratif("PHRASE", ctx)
+        if moteur == "compile":
+            return self.grammaire_compilee()["PHRASE"](ctx, 0, 0)
+        return MOTEURS_EXPANSION[moteur]("PHRASE", ctx)
+
+    def _generer_phrase(self):
+        if self.compteur:
+            self.rng.seed(graine_phrase(self.graine, self.index))
+            self.index += 1
+        if self.dedup is not None:
+            return self._generer_phrase_inedite(self.dedup)
+        return self._tirer_phrase()
+
+    def _generer_phrase_inedite(self, filtre):
+        """Retire la phrase tant que le filtre la connaît (MAX_RETRY_DOUBLON fois au plus)."""
+        if filtre.vider_si_sature():
+            self.saturations_dedup += 1
+            if self.metriques is not None:
+                self.metriques.saturations_dedup += 1
+        for _ in range(MAX_RETRY_DOUBLON):
+            s = self._tirer_phrase()
+            if not filtre.ajouter(s):
+                return s
+            self.doublons += 1
+            if self.metriques is not None:
+                self.metriques.doublons += 1
         return s
 
-    # Ultime secours : une phrase minimale toujours grammaticale
-    return "Nous formulons une hypothèse."
+    def _tirer_phrase(self, expansion=None):
+        # L'expansion garantit sujet, verbe fini et longueur minimale, et
+        # s'interrompt d'elle-même sinon : le tri ci-dessous relit ctx, sans
+        # analyser le texte, et n'est plus qu'un filet de sécurité.
+        expansion = expansion or self._expand_phrase
+        if self.metriques is not None:
+            return self._generer_phrase_mesuree(self.metriques, expansion)
+        self.phrases += 1
+        for _ in range(self.max_retry_sentence):
+            self.tentatives += 1
+            self.last_gn_info = None
+            ctx = {"person_policy": None}
+            try:
+                raw = expansion(ctx)
+            except _PhraseAvortee:
+                self.rejets += 1
+                continue
+
+            # Fragment -> on régénère (au lieu de “nettoyer”)
+            if raison_invalidite(ctx) is not None:
+                self.rejets += 1
+                continue
+
+            return post_process_phrase(raw)
+
+        # Ultime secours : une phrase minimale toujours grammaticale
+        self.secours += 1
+        return "Nous formulons une hypothèse."
+
+    def _generer_phrase_mesuree(self, m, expansion=None):
+        """_generer_phrase avec relevé des métriques (même tirage, même phrase)."""
+        expansion = expansion or self._expand_phrase
+        self.phrases += 1
+        m.phrases += 1
+        horloge = time.perf_counter
+        for _ in range(self.max_retry_sentence):
+            self.tentatives += 1
+            m.tentatives += 1
+            self.last_gn_info = None
+            ctx = {"person_policy": None}
+            t0 = horloge()
+            try:
+                raw = expansion(ctx)
+            except _PhraseAvortee as avortee:
+                m.duree_expand += horloge() - t0
+                self.rejets += 1
+                m.rejets[avortee.raison] += 1
+                continue
+            t1 = horloge()
+            m.duree_expand += t1 - t0
+
+            raison = raison_invalidite(ctx)
+            if raison is not None:
+                self.rejets += 1
+                m.rejets[raison] += 1
+                continue
+
+            s = post_process_phrase(raw)
+            m.duree_post_process += horloge() - t1
+            m.compter_phrase(s)
+            return s
+
+        self.secours += 1
+        m.secours += 1
+        s = "Nous formulons une hypothèse."
+        m.compter_phrase(s)
+        return s
 
-def generate_prose_block(n=NOMBRE_DE_PHRASES_SOUHAITE):
-    out = []
+    def taux_rejet(self):
+        """Part des expansions rejetées (abandonnées ou invalides) depuis la création."""
+        return self.rejets / self.tentatives if self.tentatives else 0.0
+
+    def taux_doublons(self):
+        """Part des phrases tirées écartées par le dédoublonnage."""
+        return self.doublons / self.phrases if self.phrases else 0.0
+
+    def stats_dedup(self):
+        """Doublons écartés et état du filtre ; None sans dédoublonnage."""
+        if self.dedup is None:
+            return None
+        return {"doublons": self.doublons, "taux_doublons": self.taux_doublons(),
+                "saturations": self.saturations_dedup, **self.dedup.en_dict()}
+
+    def generate_sentence(self):
+        precedent = _ETAT_THREAD.gen
+        _ETAT_THREAD.gen = self
+        try:
+            return self._generer_phrase()
+        finally:
+            _ETAT_THREAD.gen = precedent
+
+    def phrase_derivee(self, k):
+        """
+        Phrase de squelette grammatical k (dérivation k de PHRASE modulo leur
+        nombre, voir Derivations), les mots étant tirés dans l'aléa du
+        générateur. Même boucle de reprise que generate_sentence : si la
+        réalisation est invalide, seuls les mots sont retirés, la structure
+        reste celle du squelette k ; après max_retry_sentence échecs, c'est la
+        phrase de secours.
+        """
+        table = derivations(self.max_expansion_depth, self.max_profondeur_sub)
+        terminaux = table.deriver(k % table.total)
+        precedent = _ETAT_THREAD.gen
+        _ETAT_THREAD.gen = self
+        try:
+            return self._tirer_phrase(partial(realiser_derivation, terminaux))
+        finally:
+            _ETAT_THREAD.gen = precedent
+
+    def config(self):
+        """Paramètres de ce générateur, de quoi en reconstruire un identique (hors aléa)."""
+        return {
+            "possessive_det_prob": self.possessive_det_prob,
+            "max_expansion_depth": self.max_expansion_depth,
+            "max_profondeur_sub": self.max_profondeur_sub,
+            "max_profondeur_cn": self.max_profondeur_cn,
+            "max_retry_sentence": self.max_retry_sentence,
+            "moteur": self.moteur,
+            "source": self.source,
+            "recence": None if self.recence is None else self.recence.fenetre,
+            "facteur_recence": None if self.recence is None else self.recence.facteur,
+            "compteur": self.compteur,
+        }
+
+    def generate_prose_block(self, n=NOMBRE_DE_PHRASES_SOUHAITE, *, workers=None, seed=None,
+                             chunk_size=TAILLE_LOT_PARALLELE, executor=None):
+        """
+        Sans `workers` ni `executor` : boucle série sur l'aléa du générateur.
+        Sinon, mode par lots (voir generer_prose_par_lots) : la graine maîtresse
+        est `seed`, ou tirée dans l'aléa du générateur si elle est absente.
+        Le dédoublonnage ne vaut qu'en série : le filtre ne se partage pas
+        entre processus. En mode compteur, série et lots donnent le même texte :
+        les phrases index à index + n - 1 de la graine du générateur.
+        """
+        if workers is not None or executor is not None:
+            if self.dedup is not None:
+                raise ValueError("dédoublonnage indisponible en mode par lots (workers/executor)")
+            if self.compteur:
+                # Phrases index..index+n-1 de la graine du générateur (ou de `seed`)
+                debut, self.index = self.index, self.index + n
+                return generer_prose_par_lots(n, self.graine if seed is None else seed, workers=workers,
+                                              chunk_size=chunk_size, executor=executor, config=self.config(),
+                                              debut=debut)
+            if seed is None:
+                seed = self.rng.getrandbits(63)
+            return generer_prose_par_lots(n, seed, workers=workers, chunk_size=chunk_size,
+                                          executor=executor, config=self.config())
+
+        precedent = _ETAT_THREAD.gen
+        _ETAT_THREAD.gen = self
+        try:
+            out = []
+            for _ in range(n):
+                s = self._generer_phrase()
+                if s:
+                    out.append(s)
+            return " ".join(out)
+        finally:
+            _ETAT_THREAD.gen = precedent
+
+    def iter_sentences(self, n=None):
+        """Phrases une à une, à la demande ; flux infini si n est None."""
+        compte = itertools.count() if n is None else range(n)
+        for _ in compte:
+            yield self.generate_sentence()
+
+    def write_prose(self, fichier, n=None, *, sep=" ", end="", buffer_size=TAILLE_TAMPON_ECRITURE):
+        """
+        Écrit n phrases (infini si None) dans le fichier texte `fichier`, par
+        blocs d'environ `buffer_size` caractères : mémoire constante et
+        premier bloc disponible sans attendre la fin. Renvoie le nombre de
+        phrases écrites.
+        """
+        tampon = []
+        taille = 0
+        ecrites = 0
+        for phrase in self.iter_sentences(n):
+            if ecrites:
+                tampon.append(sep)
+            tampon.append(phrase)
+            taille += len(phrase) + len(sep)
+            ecrites += 1
+            if taille >= buffer_size:
+                fichier.write("".join(tampon))
+                fichier.flush()
+                tampon.clear()
+                taille = 0
+        tampon.append(end)
+        fichier.write("".join(tampon))
+        fichier.flush()
+        return ecrites
+
+    def ecrire_corpus(self, sortie, n=None, *, format="lignes", compression=None, niveau=None,
+                      buffer_size=TAILLE_TAMPON_ECRITURE):
+        """
+        Écrit n phrases (infini si None) dans `sortie` au travers
+        d'EcrivainPhrases : chemin (compressé selon l'extension .gz, .bz2 ou
+        .xz, ou `compression`) ou fichier binaire. En "jsonl", seed et index
+        sont ceux du générateur. Renvoie le nombre de phrases écrites.
+        """
+        with EcrivainPhrases(sortie, format, compression=compression, niveau=niveau, graine=self.graine,
+                             debut=self.index, tampon=buffer_size) as ecrivain:
+            for phrase in self.iter_sentences(n):
+                ecrivain.ecrire(phrase)
+        return ecrivain.ecrites
+
+class _GenerateurModule(Generator):
+    """
+    Générateur implicite des fonctions de module : tire dans l'état global
+    du module random (random.seed() reste donc effectif) et relit les
+    constantes du module à chaque appel.
+    """
+
+    possessive_det_prob = property(lambda self: POSSESSIVE_DET_PROB)
+    max_expansion_depth = property(lambda self: MAX_EXPANSION_DEPTH)
+    max_profondeur_sub = property(lambda self: MAX_PROFONDEUR_RECURSIVITE_SUB)
+    max_profondeur_cn = property(lambda self: MAX_PROFONDEUR_RECURSIVITE_CN)
+    max_retry_sentence = property(lambda self: MAX_RETRY_SENTENCE)
+    moteur = property(lambda self: MOTEUR_EXPANSION)
+
+    def __init__(self):
+        # Pas de Generator.__init__ : les paramètres de génération sont ici des propriétés
+        self._initialiser(random, "stdlib")
+
+    def seed(self, seed=None):
+        random.seed(seed)
+        self.graine = seed
+        self.last_gn_info = None
+
+_GENERATEUR_MODULE = _GenerateurModule()
+
+# -----------------------------------------------------------------------------
+# Génération par lots sur un pool de processus
+# -----------------------------------------------------------------------------
+# Le texte est découpé en lots de taille fixe ; le lot i est produit par un
+# Generator neuf semé avec _graine_lot(graine, i). Le découpage ne dépend pas
+# du nombre de workers : même graine, même texte, en série comme sur 32 cœurs.
+# L'anaphore est remise à zéro à chaque phrase, le découpage n'y change rien.
+#
+# En mode compteur (Generator(compteur=True)), l'aléa de la phrase i est
+# resemé par graine_phrase(graine, i), un hachage à clé du couple : chaque
+# phrase se recalcule seule et une tranche [debut, fin) s'obtient sans
+# produire les précédentes. Le lot devient une simple plage de numéros ; le
+# texte ne dépend alors ni des workers ni de la taille des lots.
+
+def _graine_lot(graine, index):
+    h = hashlib.blake2b(f"{graine}:{index}".encode("ascii"), digest_size=8).digest()
+    return int.from_bytes(h, "big")
+
+def graine_phrase(graine, index):
+    """Graine (64 bits) de la phrase numéro `index` de la graine maîtresse `graine`."""
+    h = hashlib.blake2b(f"{graine}:{index}".encode("ascii"), digest_size=8, person=b"amiral/phrase").digest()
+    return int.from_bytes(h, "big")
+
+def _tache_lot(graine, i, debut, taille, config):
+    """
+    Tâche (graine, taille, config) du lot i, qui couvre les phrases debut à
+    debut + taille - 1. config["lexique"] : chemin du lexique actif, s'il y en a un.
+    """
+    if LEXIQUE_ACTIF is not None:
+        config = {**config, "lexique": os.path.abspath(LEXIQUE_ACTIF.chemin)}
+    if config.get("compteur"):
+        return graine, taille, {**config, "debut": debut}
+    return _graine_lot(graine, i), taille, config
+
+def _generateur_lot(graine, config):
+    """Generator d'une tâche de lot, après avoir rendu actif dans ce processus le lexique de la tâche."""
+    chemin = config.get("lexique")
+    actif = None if LEXIQUE_ACTIF is None else os.path.abspath(LEXIQUE_ACTIF.chemin)
+    if chemin != actif:
+        utiliser_lexique(chemin)
+    return Generator(graine, **{cle: valeur for cle, valeur in config.items() if cle != "lexique"})
+
+def generer_plage(seed, debut, fin, config=None):
+    """Phrases numéros debut à fin - 1 de la graine `seed` en mode compteur (tranche d'un corpus)."""
+    gen = Generator(seed, **{**(config or {}), "compteur": True, "debut": debut})
+    return [gen.generate_sentence() for _ in range(fin - debut)]
+
+def phrase_numero(k, seed=0, config=None):
+    """
+    Phrase numéro k de l'énumération de graine `seed` : squelette
+    grammatical k (modulo leur nombre, voir Generator.phrase_derivee), mots
+    tirés avec une graine propre à (seed, k). Ne dépend d'aucune autre
+    phrase : chaque machine peut calculer sa plage de numéros.
+    """
+    return Generator(graine_phrase(seed, k), **(config or {})).phrase_derivee(k)
+
+def phrases_numeros(debut, fin, seed=0, config=None):
+    """
+    Phrases numéros debut à fin - 1 (voir phrase_numero) : pas deux fois le
+    même squelette sur une période de derivations().total numéros (le texte,
+    lui, peut se répéter).
+    """
+    return [phrase_numero(k, seed, config) for k in range(debut, fin)]
+
+def _generer_lot(tache):
+    graine, n, config = tache
+    return _generateur_lot(graine, config).generate_prose_block(n)
+
+def generer_prose_par_lots(n, seed, workers=None, chunk_size=TAILLE_LOT_PARALLELE, executor=None, config=None,
+                           debut=0):
+    """
+    `n` phrases en lots de `chunk_size`, réassemblées dans l'ordre.
+    workers=1 (ou 0) : lots calculés dans le processus courant. Sinon un
+    ProcessPoolExecutor de `workers` processus (os.cpu_count() si None), ou
+    `executor` s'il est fourni (il n'est alors pas fermé). En mode compteur
+    (config["compteur"]), ce sont les phrases debut à debut + n - 1.
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size doit être >= 1")
+    config = {} if config is None else config
+    taches = [_tache_lot(seed, i, debut + d, min(chunk_size, n - d), config)
+              for i, d in enumerate(range(0, n, chunk_size))]
+
+    if executor is not None:
+        lots = list(executor.map(_generer_lot, taches))
+    elif (workers is not None and workers <= 1) or len(taches) <= 1:
+        lots = [_generer_lot(t) for t in taches]
+    else:
+        from concurrent.futures import ProcessPoolExecutor  # import coûteux : seulement si utilisé
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            lots = list(pool.map(_generer_lot, taches))
+    return " ".join(lot for lot in lots if lot)
+
+# -----------------------------------------------------------------------------
+# Serveur HTTP/1.1 en flux (asyncio)
+# -----------------------------------------------------------------------------
+#   GET /phrases?n=1000&seed=42&format=lignes   (n absent : flux sans fin)
+#   GET /sante
+# Réponse en Transfer-Encoding: chunked, une connexion par requête. Comme en
+# mode par lots, le flux est découpé en lots (_graine_lot) calculés par un
+# pool de processus : même graine, même texte que generate_prose_block(n,
+# seed=..., chunk_size=TAILLE_LOT_SERVEUR). Chaque client n'a qu'un lot d'avance sur ce que sa socket a
+# accepté (writer.drain()) : un client lent ne consomme ni mémoire ni
+# workers, et les lots des autres passent dans l'ordre d'arrivée du pool.
+
+HOTE_SERVEUR = "127.0.0.1"
+PORT_SERVEUR = 8765
+# Phrases par lot envoyé au pool (et par bloc HTTP)
+TAILLE_LOT_SERVEUR = 100
+FORMATS_SORTIE = ("texte", "lignes", "jsonl")
+_TAILLE_MAX_REQUETE = 8192
+
+def _phrases_lot(tache):
+    graine, n, config = tache
+    gen = _generateur_lot(graine, config)
+    return [gen.generate_sentence() for _ in range(n)]
+
+def formater_phrases(phrases, format="texte", graine=None, debut=0, premier=True):
+    """
+    Bloc de texte pour `phrases` : "texte" (séparées par une espace),
+    "lignes" (une par ligne) ou "jsonl" ({"seed", "index", "phrase"} par
+    ligne, index global à partir de `debut`). `premier` : le bloc ouvre le
+    flux (pas d'espace de tête en "texte").
+    """
+    if format == "texte":
+        corps = " ".join(phrases)
+        return corps if premier or not corps else " " + corps
+    if format == "lignes":
+        return "".join(p + "\n" for p in phrases)
+    if format == "jsonl":
+        import json
+        return "".join(json.dumps({"seed": graine, "index": i, "phrase": p}, ensure_ascii=False) + "\n"
+                       for i, p in enumerate(phrases, debut))
+    raise ValueError(f"format inconnu : {format!r} (attendu : {', '.join(FORMATS_SORTIE)})")
+
+def _reponse_http(statut, corps, entetes=()):
+    corps = corps.encode("utf-8")
+    lignes = [f"HTTP/1.1 {statut}", "Content-Type: text/plain; charset=utf-8",
+              f"Content-Length: {len(corps)}", "Connection: close", *entetes]
+    return ("\r\n".join(lignes) + "\r\n\r\n").encode("latin-1") + corps
+
+def _lire_parametres(cible):
+    """(n, graine, format) de la requête /phrases ; ValueError si invalides."""
+    from urllib.parse import parse_qs, urlsplit
+    params = {cle: valeurs[-1] for cle, valeurs in parse_qs(urlsplit(cible).query).items()}
+    n = int(params["n"]) if "n" in params else None
+    if n is not None and n < 0:
+        raise ValueError("n doit être >= 0")
+    graine = int(params["seed"]) if "seed" in params else int.from_bytes(os.urandom(8), "big") >> 1
+    format = params.get("format", "texte")
+    if format not in FORMATS_SORTIE:
+        raise ValueError(f"format inconnu : {format!r}")
+    return n, graine, format
+
+async def _servir_client(lecteur, ecrivain, *, executor, config, taille_lot, dedup=None):
+    import asyncio
+    boucle = asyncio.get_running_loop()
+    en_cours = None
+    try:
+        try:
+            entete = await lecteur.readuntil(b"\r\n\r\n")
+        except asyncio.LimitOverrunError:
+            ecrivain.write(_reponse_http("431 Request Header Fields Too Large", "en-tête trop long\n"))
+            return
+        except asyncio.IncompleteReadError:
+            return
+        ligne = entete.split(b"\r\n", 1)[0].decode("latin-1").split()
+        if len(ligne) != 3 or not ligne[2].startswith("HTTP/1."):
+            ecrivain.write(_reponse_http("400 Bad Request", "requête invalide\n"))
+            return
+        methode, cible, _version = ligne
+        chemin = cible.split("?", 1)[0]
+        if methode != "GET":
+            ecrivain.write(_reponse_http("405 Method Not Allowed", "GET seulement\n", ("Allow: GET",)))
+            return
+        if chemin == "/sante":
+            ecrivain.write(_reponse_http("200 OK", "ok\n"))
+            return
+        if chemin != "/phrases":
+            ecrivain.write(_reponse_http("404 Not Found", "chemins : /phrases, /sante\n"))
+            return
+        try:
+            n, graine, format = _lire_parametres(cible)
+        except (ValueError, KeyError) as erreur:
+            ecrivain.write(_reponse_http("400 Bad Request", f"{erreur}\n"))
+            return
+
+        type_contenu = "application/jsonl" if format == "jsonl" else "text/plain"
+        ecrivain.write((f"HTTP/1.1 200 OK\r\nContent-Type: {type_contenu}; charset=utf-8\r\n"
+                        f"Transfer-Encoding: chunked\r\nConnection: close\r\n"
+                        f"X-Amiral-Seed: {graine}\r\n\r\n").encode("latin-1"))
+        # Dédoublonnage : filtre propre à la connexion, les doublons sont retirés
+        # des lots reçus et des lots pleins sont demandés jusqu'à n phrases
+        filtre = None if dedup is None else FiltreBloom(dedup)
+        if n is None or (filtre is not None and n):
+            lots = itertools.count()
+        else:
+            lots = range((n + taille_lot - 1) // taille_lot)
+
+        def soumettre(i):
+            taille = taille_lot if n is None or filtre is not None else min(taille_lot, n - i * taille_lot)
+            return boucle.run_in_executor(executor, _phrases_lot,
+                                          _tache_lot(graine, i, i * taille_lot, taille, config))
+
+        iterateur = iter(lots)
+        i = next(iterateur, None)
+        en_cours = soumettre(i) if i is not None else None
+        emises = 0
+        while en_cours is not None:
+            phrases = await en_cours
+            if filtre is not None:
+                filtre.vider_si_sature()
+                phrases = [p for p in phrases if not filtre.ajouter(p)]
+                if n is not None:
+                    del phrases[n - emises:]
+            fini = n is not None and emises + len(phrases) >= n
+            suivant = None if fini else next(iterateur, None)
+            # Un lot d'avance : calculé pendant l'envoi de celui-ci
+            en_cours = soumettre(suivant) if suivant is not None else None
+            bloc = formater_phrases(phrases, format, graine, emises, premier=not emises).encode("utf-8")
+            emises += len(phrases)
+            if bloc:
+                ecrivain.write(b"%x\r\n%b\r\n" % (len(bloc), bloc))
+                await ecrivain.drain()
+        ecrivain.write(b"0\r\n\r\n")
+        await ecrivain.drain()
+    except ConnectionError:
+        # Client parti : fin de cette connexion seulement
+        if en_cours is not None:
+            en_cours.cancel()
+    except asyncio.CancelledError:
+        # Serveur arrêté : le lot d'avance est abandonné, l'annulation suit son cours
+        if en_cours is not None:
+            en_cours.cancel()
+        raise
+    finally:
+        # FIN explicite : un worker forké après l'accept garde une copie de la
+        # socket, close() seul ne signalerait pas la fin du flux au client
+        try:
+            if ecrivain.can_write_eof():
+                ecrivain.write_eof()
+        except (OSError, RuntimeError):
+            pass
+        ecrivain.close()
+
+async def demarrer_serveur(hote=HOTE_SERVEUR, port=PORT_SERVEUR, *, executor=None, config=None,
+                           taille_lot=TAILLE_LOT_SERVEUR, dedup=None):
+    """
+    Démarre le serveur sur la boucle courante et renvoie l'asyncio.Server
+    (port=0 : port libre, lu dans server.sockets). `executor` : pool qui
+    calcule les lots (None : pool de threads par défaut de la boucle, sans
+    parallélisme réel) ; il n'est pas fermé ici. `dedup` : taille en octets
+    d'un filtre de Bloom par flux /phrases (True : MEMOIRE_FILTRE_DEDUP),
+    None pour servir les lots tels quels.
+    """
+    import asyncio
+    if taille_lot < 1:
+        raise ValueError("taille_lot doit être >= 1")
+    if dedup is True:
+        dedup = MEMOIRE_FILTRE_DEDUP
+    return await asyncio.start_server(
+        partial(_servir_client, executor=executor, config={} if config is None else config,
+                taille_lot=taille_lot, dedup=dedup or None),
+        hote, port)
+
+def servir(hote=HOTE_SERVEUR, port=PORT_SERVEUR, *, workers=None, config=None, taille_lot=TAILLE_LOT_SERVEUR,
+           dedup=None):
+    """Sert jusqu'à interruption, lots calculés par `workers` processus (os.cpu_count() si None)."""
+    import asyncio
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    async def principal(pool):
+        serveur = await demarrer_serveur(hote, port, executor=pool, config=config, taille_lot=taille_lot,
+                                         dedup=dedup)
+        adresses = ", ".join(f"{s.getsockname()[0]}:{s.getsockname()[1]}" for s in serveur.sockets)
+        print(f"Amiral sert sur http://{adresses}/phrases", file=sys.stderr)
+        async with serveur:
+            await serveur.serve_forever()
+
+    # forkserver : les workers ne reçoivent pas de copie des sockets clientes
+    methode = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else None
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(methode)) as pool:
+        try:
+            asyncio.run(principal(pool))
+        except KeyboardInterrupt:
+            pass
+
+def generate_sentence():
+    return _GENERATEUR_MODULE.generate_sentence()
+
+def iter_sentences(n=None):
+    return _GENERATEUR_MODULE.iter_sentences(n)
+
+def write_prose(fichier, n=None, *, sep=" ", end="", buffer_size=TAILLE_TAMPON_ECRITURE):
+    return _GENERATEUR_MODULE.write_prose(fichier, n, sep=sep, end=end, buffer_size=buffer_size)
+
+def generate_prose_block(n=NOMBRE_DE_PHRASES_SOUHAITE, *, workers=None, seed=None,
+                         chunk_size=TAILLE_LOT_PARALLELE, executor=None, dedup=None):
+    """
+    Comme Generator.generate_prose_block, sur le générateur du module.
+    `dedup` (série seulement) : True pour un filtre propre à cet appel, ou un
+    FiltreBloom à repasser d'un appel à l'autre au fil d'un long corpus.
+    """
+    gen = _GENERATEUR_MODULE
+    if dedup is None:
+        return gen.generate_prose_block(n, workers=workers, seed=seed, chunk_size=chunk_size, executor=executor)
+    gen.dedup = FiltreBloom() if dedup is True else dedup
+    try:
+        return gen.generate_prose_block(n, workers=workers, seed=seed, chunk_size=chunk_size, executor=executor)
+    finally:
+        gen.dedup = None
+
+# =============================================================================
+# Écriture en bloc (texte ou JSONL, compressée ou non)
+# =============================================================================
+# Les phrases s'accumulent telles quelles jusqu'à `tampon` caractères ; le
+# bloc est alors mis en forme (formater_phrases), encodé en UTF-8 d'un seul
+# tenant et remis en un write() au fichier brut ou au compresseur de la
+# bibliothèque standard. Un encodage et un appel au compresseur par bloc
+# d'un Mo, au lieu d'un par phrase comme avec print().
+
+# Extension du chemin de sortie -> compression
+COMPRESSIONS = {".gz": "gzip", ".bz2": "bz2", ".xz": "xz"}
+# Niveau par défaut : gzip et xz réglés pour rester loin derrière le coût
+# d'une phrase ; bz2 au niveau 9 (blocs de 900 ko, à peine plus lent que 1)
+NIVEAUX_COMPRESSION = {"gzip": 6, "bz2": 9, "xz": 1}
+
+def _compresseur(brut, compression, niveau=None):
+    """Flux compressé écrivant dans le fichier binaire `brut`, qu'il ne ferme pas."""
+    if compression not in NIVEAUX_COMPRESSION:
+        raise ValueError(f"compression inconnue : {compression!r} (attendu : {', '.join(NIVEAUX_COMPRESSION)})")
+    niveau = NIVEAUX_COMPRESSION[compression] if niveau is None else niveau
+    if compression == "gzip":
+        import gzip
+        # Ni nom ni date dans l'en-tête : même graine, même fichier à l'octet près
+        return gzip.GzipFile(filename="", mode="wb", compresslevel=niveau, fileobj=brut, mtime=0)
+    if compression == "bz2":
+        import bz2
+        return bz2.BZ2File(brut, "wb", compresslevel=niveau)
+    import lzma
+    return lzma.LZMAFile(brut, "wb", preset=niveau)
+
+class EcrivainPhrases:
+    """
+    Écrit des phrases dans `sortie` (chemin, ou fichier binaire laissé ouvert)
+    au format "texte", "lignes" ou "jsonl" de formater_phrases, par blocs
+    d'environ `tampon` caractères. `compression` : "gzip", "bz2", "xz" ou
+    None (déduite de l'extension d'un chemin : .gz, .bz2, .xz). En "jsonl",
+    `graine` et `debut` donnent les champs seed et index. Gestionnaire de
+    contexte ; fermer() écrit le dernier bloc (et la fin de ligne en "texte").
+    """
+
+    def __init__(self, sortie, format="lignes", *, compression=None, niveau=None, graine=None, debut=0,
+                 tampon=TAILLE_TAMPON_ECRITURE):
+        if format not in FORMATS_SORTIE:
+            raise ValueError(f"format inconnu : {format!r} (attendu : {', '.join(FORMATS_SORTIE)})")
+        self.format = format
+        self.graine = graine
+        self.debut = debut
+        self.tampon = tampon
+        # Phrases remises au fichier et octets UTF-8 correspondants (avant compression)
+        self.ecrites = 0
+        self.octets = 0
+        self._attente = []
+        self._taille = 0
+        self._a_fermer = []
+        if isinstance(sortie, (str, os.PathLike)):
+            if compression is None:
+                compression = COMPRESSIONS.get(os.path.splitext(os.fspath(sortie))[1].lower())
+            sortie = open(sortie, "wb")
+            self._a_fermer.append(sortie)
+        self._brut = self._flux = sortie
+        if compression is not None:
+            try:
+                self._flux = _compresseur(sortie, compression, niveau)
+            except BaseException:
+                self.fermer()
+                raise
+            self._a_fermer.insert(0, self._flux)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fermer()
+
+    def ecrire(self, phrase):
+        self._attente.append(phrase)
+        self._taille += len(phrase)
+        if self._taille >= self.tampon:
+            self.vider()
+
+    def ecrire_lot(self, phrases):
+        deja = len(self._attente)
+        self._attente.extend(phrases)
+        self._taille += sum(map(len, self._attente[deja:]))
+        if self._taille >= self.tampon:
+            self.vider()
+
+    def vider(self):
+        """Met en forme, encode et écrit les phrases en attente."""
+        if self._attente:
+            bloc = formater_phrases(self._attente, self.format, self.graine, self.debut + self.ecrites,
+                                    premier=not self.ecrites).encode("utf-8")
+            # Compteurs avant write() : une erreur d'écriture ne rejoue pas le bloc
+            self.ecrites += len(self._attente)
+            self.octets += len(bloc)
+            self._attente.clear()
+            self._taille = 0
+            self._flux.write(bloc)
+        # Flux brut seulement : flush() de gzip forcerait une fin de bloc deflate
+        if self._flux is self._brut:
+            self._flux.flush()
+
+    def fermer(self):
+        if self._flux is None:
+            return
+        flux, brut, a_fermer = self._flux, self._brut, self._a_fermer
+        try:
+            termine = self.format == "texte" and bool(self.ecrites or self._attente)
+            self.vider()
+            if termine:
+                flux.write(b"\n")
+                self.octets += 1
+        finally:
+            self._flux = self._brut = None
+            self._a_fermer = []
+            try:
+                for fichier in a_fermer:
+                    fichier.close()
+            finally:
+                if brut not in a_fermer:
+                    brut.flush()
+
+def ecrire_corpus(sortie, n=None, *, format="lignes", compression=None, niveau=None,
+                  buffer_size=TAILLE_TAMPON_ECRITURE):
+    return _GENERATEUR_MODULE.ecrire_corpus(sortie, n, format=format, compression=compression, niveau=niveau,
+                                            buffer_size=buffer_size)
+
+# =============================================================================
+# Ligne de commande
+# =============================================================================
+#   python Amiral.py -n 100000 --seed 42 --format jsonl -o corpus.jsonl --stats
+#   python Amiral.py --infini --workers 8 --format lignes | consommateur
+#   python Amiral.py --serveur 0.0.0.0:8765
+# Sans --workers : un Generator(seed) en série (texte de
+# Generator(seed).generate_prose_block(n)). Avec --workers : lots semés par
+# _graine_lot (texte de generate_prose_block(n, workers=..., seed=...)),
+# identique quel que soit le nombre de workers. Avec --compteur (ou
+# --debut), une graine par phrase : série et workers donnent le même texte,
+# et --debut 40000000 -n 10000000 produit cette tranche sans les précédentes.
+
+class _HistogrammeLatences:
+    """Quantiles approchés (à 2 % près) en mémoire bornée, pour les flux sans fin."""
+
+    RAISON = 1.02
+
+    def __init__(self):
+        self.cases = Counter()
+        self.total = 0
+        self._log_raison = math.log(self.RAISON)
+
+    def ajouter(self, durees):
+        cases, log_raison = self.cases, self._log_raison
+        for d in durees:
+            cases[math.floor(math.log(d) / log_raison) if d > 0 else None] += 1
+        self.total += len(durees)
+
+    def quantile(self, q):
+        if not self.total:
+            return 0.0
+        rang = q * (self.total - 1)
+        cumul = 0
+        for case in sorted(self.cases, key=lambda c: -math.inf if c is None else c):
+            cumul += self.cases[case]
+            if cumul > rang:
+                return 0.0 if case is None else self.RAISON ** (case + 0.5)
+        return 0.0
+
+def _phrases_lot_chronometre(tache):
+    """Comme _phrases_lot, avec durées par phrase et compteurs du tri final."""
+    graine, n, config = tache
+    gen = _generateur_lot(graine, config)
+    horloge = time.perf_counter
+    phrases, durees = [], []
     for _ in range(n):
-        s = generate_sentence()
-        if s:
-            out.append(s)
-    return " ".join(out)
+        t0 = horloge()
+        phrases.append(gen.generate_sentence())
+        durees.append(horloge() - t0)
+    return phrases, durees, gen.tentatives, gen.rejets
+
+def _tailles_lots(n, taille_lot):
+    if n is None:
+        return itertools.repeat(taille_lot)
+    return (min(taille_lot, n - debut) for debut in range(0, n, taille_lot))
+
+def _lots_serie(gen, n, taille_lot):
+    """(phrases, durées, tentatives, rejets) par lots, depuis un seul Generator."""
+    horloge = time.perf_counter
+    for taille in _tailles_lots(n, taille_lot):
+        tentatives, rejets = gen.tentatives, gen.rejets
+        phrases, durees = [], []
+        for _ in range(taille):
+            t0 = horloge()
+            phrases.append(gen.generate_sentence())
+            durees.append(horloge() - t0)
+        yield phrases, durees, gen.tentatives - tentatives, gen.rejets - rejets
+
+def _lots_paralleles(graine, n, workers, config, taille_lot=TAILLE_LOT_PARALLELE, debut=0):
+    """
+    Mêmes lots que generer_prose_par_lots, rendus dans l'ordre au fil de
+    l'eau : au plus 2 lots par worker en attente, même pour un flux infini.
+    """
+    taches = (_tache_lot(graine, i, debut + i * taille_lot, taille, config)
+              for i, taille in enumerate(_tailles_lots(n, taille_lot)))
+    if workers <= 1:
+        yield from map(_phrases_lot_chronometre, taches)
+        return
+    from concurrent.futures import ProcessPoolExecutor
+    pool = ProcessPoolExecutor(max_workers=workers)
+    try:
+        en_attente = deque()
+        for tache in taches:
+            en_attente.append(pool.submit(_phrases_lot_chronometre, tache))
+            if len(en_attente) >= 2 * workers:
+                yield en_attente.popleft().result()
+        while en_attente:
+            yield en_attente.popleft().result()
+    finally:
+        pool.shutdown(cancel_futures=True)
+
+def _afficher_stats(flux, phrases, duree, latences, tentatives, rejets, graine):
+    def ligne(etiquette, valeur):
+        print(f"{etiquette:<16}{valeur}", file=flux)
+    ligne("phrases", phrases)
+    ligne("durée", f"{duree:.3f} s")
+    ligne("débit", f"{phrases / duree if duree else 0.0:.1f} phrases/s")
+    ligne("latence p50", f"{latences.quantile(0.50) * 1e6:.1f} us")
+    ligne("latence p99", f"{latences.quantile(0.99) * 1e6:.1f} us")
+    ligne("taux de retry", f"{rejets / tentatives if tentatives else 0.0:.3%} ({rejets} / {tentatives} tentatives)")
+    ligne("graine", graine)
+
+def main(argv=None):
+    """Point d'entrée de la ligne de commande ; renvoie le code de sortie."""
+    import argparse
+    analyseur = argparse.ArgumentParser(prog="Amiral.py", description="Générateur de texte flottant en français.")
+    nombre = analyseur.add_mutually_exclusive_group()
+    nombre.add_argument("-n", "--nombre", type=int,
+                        help=f"nombre de phrases (défaut : {NOMBRE_DE_PHRASES_SOUHAITE})")
+    nombre.add_argument("--infini", action="store_true", help="flux sans fin (jusqu'à interruption)")
+    analyseur.add_argument("--seed", type=int, help="graine maîtresse (défaut : tirée au hasard, voir --stats)")
+    analyseur.add_argument("--compteur", action="store_true",
+                           help="une graine par phrase, dérivée de (seed, numéro) : tranches reproductibles")
+    analyseur.add_argument("--debut", type=int, metavar="INDEX",
+                           help="numéro de la première phrase (implique --compteur)")
+    analyseur.add_argument("--workers", type=int,
+                           help="mode par lots sur N processus (1 : lots dans ce processus)")
+    analyseur.add_argument("--moteur", choices=MOTEURS_LIGNE_COMMANDE, help="moteur d'expansion")
+    analyseur.add_argument("--recence", type=int, metavar="FENETRE", nargs="?", const=FENETRE_RECENCE,
+                           help=f"espace les répétitions de noms et d'adjectifs (fenêtre, défaut {FENETRE_RECENCE})")
+    analyseur.add_argument("--dedup", type=int, metavar="MIO", nargs="?", const=MEMOIRE_FILTRE_DEDUP >> 20,
+                           help="écarte les phrases déjà émises (filtre de Bloom de MIO Mio, "
+                                f"défaut {MEMOIRE_FILTRE_DEDUP >> 20} ; série ou serveur)")
+    analyseur.add_argument("--lexique", metavar="FICHIER",
+                           help="lexique compact (ecrire_lexique) pour les noms et adjectifs")
+    analyseur.add_argument("-o", "--sortie",
+                           help="fichier de sortie, compressé si .gz, .bz2 ou .xz (défaut : sortie standard)")
+    analyseur.add_argument("--compression", choices=sorted(NIVEAUX_COMPRESSION),
+                           help="compression de la sortie (défaut : selon l'extension de --sortie)")
+    analyseur.add_argument("--niveau", type=int, metavar="N",
+                           help="niveau de compression (gzip et bz2 : 1-9, xz : 0-9 ; défaut : débit d'abord)")
+    analyseur.add_argument("--format", choices=FORMATS_SORTIE,
+                           help="texte (une ligne, défaut), lignes (une phrase par ligne) "
+                                "ou jsonl (seed, index, phrase)")
+    analyseur.add_argument("--tampon", type=int, metavar="CARACTERES",
+                           help=f"taille des blocs écrits (défaut : {TAILLE_TAMPON_ECRITURE})")
+    analyseur.add_argument("--stats", action="store_true",
+                           help="débit, latences p50/p99 par phrase et taux de retry sur la sortie d'erreur")
+    analyseur.add_argument("--serveur", metavar="[HOTE:]PORT",
+                           help="sert le flux en HTTP (voir servir) ; n, seed et format viennent de la requête")
+    args = analyseur.parse_args(argv)
+    if args.serveur is not None:
+        # Options de la sortie locale : sans effet sur le serveur, refusées plutôt qu'ignorées
+        sans_effet = [option for option, valeur in (
+            ("-n", args.nombre), ("--infini", args.infini), ("--seed", args.seed), ("--debut", args.debut),
+            ("-o", args.sortie), ("--compression", args.compression), ("--niveau", args.niveau),
+            ("--format", args.format), ("--stats", args.stats), ("--tampon", args.tampon),
+        ) if valeur not in (None, False)]
+        if sans_effet:
+            analyseur.error(f"--serveur : {', '.join(sans_effet)} sans effet "
+                            "(n, seed et format se passent dans la requête /phrases)")
+    if args.nombre is None:
+        args.nombre = NOMBRE_DE_PHRASES_SOUHAITE
+    if args.nombre < 0:
+        analyseur.error("--nombre doit être >= 0")
+    if args.workers is not None and args.workers < 0:
+        analyseur.error("--workers doit être >= 0")
+    if args.recence is not None and args.recence < 0:
+        analyseur.error("--recence doit être >= 0")
+    if args.debut is not None and args.debut < 0:
+        analyseur.error("--debut doit être >= 0")
+    if args.dedup is not None:
+        if args.dedup < 1:
+            analyseur.error("--dedup doit être >= 1")
+        if args.compteur or args.debut is not None:
+            analyseur.error("--dedup est incompatible avec --compteur et --debut (phrases indépendantes)")
+        if args.workers is not None and args.serveur is None:
+            analyseur.error("--dedup : le filtre ne se partage pas entre processus (pas de --workers)")
+    premier_index = args.debut or 0
+    config = {} if args.moteur is None else {"moteur": args.moteur}
+    if args.recence:
+        config["recence"] = args.recence
+    if args.compteur or args.debut is not None:
+        config["compteur"] = True
+    if args.lexique is not None:
+        try:
+            utiliser_lexique(args.lexique)
+        except (OSError, ValueError) as erreur:
+            analyseur.error(f"--lexique : {erreur}")
+
+    if args.serveur is not None:
+        hote, _, port = args.serveur.rpartition(":")
+        if not port.isdigit():
+            analyseur.error(f"--serveur : port invalide : {port!r}")
+        servir(hote or HOTE_SERVEUR, int(port), workers=args.workers or None, config=config,
+               dedup=None if args.dedup is None else args.dedup << 20)
+        return 0
+
+    n = None if args.infini else args.nombre
+    graine = args.seed if args.seed is not None else int.from_bytes(os.urandom(8), "big") >> 1
+    if args.workers is None:
+        dedup = None if args.dedup is None else FiltreBloom(args.dedup << 20)
+        lots = _lots_serie(Generator(graine, debut=premier_index, dedup=dedup, **config), n, TAILLE_LOT_SERVEUR)
+    else:
+        lots = _lots_paralleles(graine, n, args.workers, config, debut=premier_index)
+
+    sys.stdout.flush()
+    ecrivain = EcrivainPhrases(sys.stdout.buffer if args.sortie is None else args.sortie, args.format or "texte",
+                               compression=args.compression, niveau=args.niveau, graine=graine,
+                               debut=premier_index,
+                               tampon=TAILLE_TAMPON_ECRITURE if args.tampon is None else args.tampon)
+    latences = _HistogrammeLatences()
+    phrases = tentatives = rejets = 0
+    code = 0
+    debut = time.perf_counter()
+    try:
+        try:
+            for lot, durees, lot_tentatives, lot_rejets in lots:
+                ecrivain.ecrire_lot(lot)
+                phrases += len(lot)
+                tentatives += lot_tentatives
+                rejets += lot_rejets
+                if args.stats:
+                    latences.ajouter(durees)
+        except KeyboardInterrupt:
+            code = 130
+        finally:
+            # Dernier bloc écrit ici : un lecteur parti se voit aussi à la fermeture
+            ecrivain.fermer()
+    except BrokenPipeError:
+        # Lecteur parti (| head...) : rien à signaler, la sortie standard est close
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        code = 1
+    if args.stats:
+        _afficher_stats(sys.stderr, phrases, time.perf_counter() - debut, latences, tentatives, rejets, graine)
+    return code
 
 if __name__ == "__main__":
-    print(generate_prose_block())
+    sys.exit(main())
@@ -0,0 +1,646 @@
+# -*- coding: utf-8 -*-
+"""
+Bancs d'essai d'Amiral.py (graines fixées, résultats reproductibles).
+
+    python bench_amiral.py                                  # tous les bancs
+    python bench_amiral.py lancer micro macro               # bancs choisis
+    python bench_amiral.py lancer macro --tailles 1000,100000
+    python bench_amiral.py lancer --sortie base.json        # référence JSON
+    python bench_amiral.py lancer --comparer base.json      # mesure + comparaison
+    python bench_amiral.py comparer base.json nouveau.json  # deux références
+
+Toutes les mesures enregistrées sont des coûts (temps, mémoire, taux de
+rejet) : plus bas est meilleur. `comparer` signale toute mesure qui dépasse
+la référence de plus de --seuil (10 % par défaut) et sort alors en code 1.
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import py_compile
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+
+import Amiral
+
+GRAINE = 1234
+TAILLES_MACRO = (1000, 100000, 1000000)
+SEUIL_REGRESSION = 0.10
+
+# =============================================================================
+# OUTILS
+# =============================================================================
+
+def mesurer(fonction, repetitions=5):
+    """Meilleur temps CPU (s) sur `repetitions` appels de fonction()."""
+    meilleur = float("inf")
+    for _ in range(repetitions):
+        t0 = time.process_time()
+        fonction()
+        meilleur = min(meilleur, time.process_time() - t0)
+    return meilleur
+
+def mesurer_murale(fonction, repetitions=3):
+    """Meilleur temps réel (s) : pour les mesures multi-processus."""
+    meilleur = float("inf")
+    for _ in range(repetitions):
+        t0 = time.perf_counter()
+        fonction()
+        meilleur = min(meilleur, time.perf_counter() - t0)
+    return meilleur
+
+def pic_memoire_kio(fonction):
+    """Pic d'allocation Python (Kio, tracemalloc) pendant fonction()."""
+    tracemalloc.start()
+    try:
+        fonction()
+        return round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+    finally:
+        tracemalloc.stop()
+
+def par_phrase_us(duree, n):
+    return round(duree / n * 1e6, 2)
+
+def avec_generateur(graine, fonction):
+    """Appelle fonction() avec un Generator(graine) neuf comme générateur courant."""
+    precedent = Amiral._ETAT_THREAD.gen
+    Amiral._ETAT_THREAD.gen = Amiral.Generator(graine)
+    try:
+        return fonction()
+    finally:
+        Amiral._ETAT_THREAD.gen = precedent
+
+# =============================================================================
+# BANCS
+# =============================================================================
+
+def bench_micro(n=20000, graine=GRAINE, repetitions=5):
+    """Coût par appel (us) des fonctions chaudes, sur des entrées tirées une fois."""
+    rng = random.Random(graine)
+    verbes = [(d, rng.choice(list(d)), rng.choice("sp"), rng.choice("mf"), rng.choice((None, "nous", "on", "il")))
+              for d in (rng.choice((Amiral.GVTransitif, Amiral.GVAttributif, Amiral.GVIntransitif,
+                                    Amiral.GVReflexifAttributif)) for _ in range(n))]
+    adjectifs = [(rng.choice(list(Amiral.ADJ_MORPHOLOGY)), rng.choice("mf"), rng.choice("sp")) for _ in range(n)]
+    bases = [rng.choice(Amiral.GNDefini) for _ in range(n)]
+    prepositions = ("de", "à", "par", "grâce à", "dans", "sur", "via")
+
+    gn_infos = avec_generateur(graine, lambda: [Amiral.get_gn_info(Amiral.GNDefini, role="complement")
+                                                for _ in range(n)])
+    sp_args = [(rng.choice(prepositions), info) for info in gn_infos]
+    gen = Amiral.Generator(graine)
+    bruts = avec_generateur(graine, lambda: [gen._expand_phrase({"person_policy": None}) for _ in range(n)])
+    phrases = [Amiral.post_process_phrase(brut) for brut in bruts]
+    sans_point = [phrase.rstrip(".") for phrase in phrases]
+
+    cas = {
+        "conjuguer_verbe": lambda: [Amiral.conjuguer_verbe(d, sn, sg, verbe_cle=k, sujet_v=v)
+                                    for d, k, sn, sg, v in verbes],
+        "accorder_attribut": lambda: [Amiral.accorder_attribut(a, g, nb) for a, g, nb in adjectifs],
+        "generer_gn_recursif_fixed": lambda: avec_generateur(graine, lambda: [
+            Amiral.generer_gn_recursif_fixed(base, "defini")["v"] for base in bases]),
+        "formatter_sp_gn_fixed": lambda: [Amiral.formatter_sp_gn_fixed(p, info) for p, info in sp_args],
+        "post_process_phrase": lambda: [Amiral.post_process_phrase(brut) for brut in bruts],
+        "_collapse_repeated_prep_phrases": lambda: [Amiral._collapse_repeated_prep_phrases(s) for s in sans_point],
+        "_looks_like_fragment": lambda: [Amiral._looks_like_fragment(s) for s in phrases],
+    }
+    resultats = {}
+    for nom, fonction in cas.items():
+        resultats[nom] = par_phrase_us(mesurer(fonction, repetitions), n)
+        print(f"  {nom:<34} {resultats[nom]:>9.3f} us/appel")
+    return resultats
+
+def bench_macro(tailles=TAILLES_MACRO, graine=GRAINE):
+    """
+    generate_sentence et generate_prose_block à plusieurs tailles : temps par
+    phrase (us, process_time) puis, dans une exécution séparée, pic mémoire
+    tracemalloc (Kio). Les grandes tailles ne sont mesurées qu'une fois.
+    """
+    resultats = {}
+    for n in tailles:
+        repetitions = 5 if n <= 10000 else 1
+
+        def phrases_une_a_une(n=n):
+            gen = Amiral.Generator(graine)
+            for _ in range(n):
+                gen.generate_sentence()
+
+        def bloc(n=n):
+            Amiral.Generator(graine).generate_prose_block(n)
+
+        for nom, fonction in (("generate_sentence", phrases_une_a_une), ("generate_prose_block", bloc)):
+            us = par_phrase_us(mesurer(fonction, repetitions), n)
+            pic = pic_memoire_kio(fonction)
+            resultats[f"{nom}[{n}].us_phrase"] = us
+            resultats[f"{nom}[{n}].pic_kio"] = pic
+            print(f"  {nom:<22} n={n:<8} {us:>9.2f} us/phrase  pic {pic:>12.1f} Kio")
+    return resultats
+
+def bench_echelle(n=20000, graine=GRAINE, workers=None):
+    """Mode par lots : temps réel selon le nombre de workers (1, 2, 4... cpu_count)."""
+    if workers is None:
+        maximum = max(2, os.cpu_count() or 1)
+        workers, w = [], 1
+        while w < maximum:
+            workers.append(w)
+            w *= 2
+        workers.append(maximum)
+    resultats = {}
+    for w in workers:
+        duree = mesurer_murale(lambda: Amiral.generate_prose_block(n, workers=w, seed=graine))
+        resultats[f"workers[{w}].s"] = round(duree, 4)
+    reference = resultats[f"workers[{workers[0]}].s"]
+    for w in workers:
+        duree = resultats[f"workers[{w}].s"]
+        print(f"  workers={w:<4} {duree:>8.3f} s  ({par_phrase_us(duree, n):>8.2f} us/phrase, x{reference / duree:.2f})")
+    return resultats
+
+def bench_sources_alea(n=1500, graine=GRAINE, tours=6):
+    """Coût par phrase selon la source d'aléa du Generator (tours entrelacés)."""
+    sources = []
+    for source, fabrique in Amiral.SOURCES_ALEA.items():
+        try:
+            fabrique(graine)
+        except ImportError:
+            print(f"  {source:<12} indisponible")
+            continue
+        sources.append(source)
+    meilleurs = dict.fromkeys(sources, float("inf"))
+    for _ in range(tours):
+        for source in sources:
+            duree = mesurer(lambda: Amiral.Generator(graine, source=source).generate_prose_block(n), 1)
+            meilleurs[source] = min(meilleurs[source], duree)
+    resultats = {source: par_phrase_us(duree, n) for source, duree in meilleurs.items()}
+    reference = resultats["stdlib"]
+    for source, us in resultats.items():
+        print(f"  {source:<12} {us:>8.2f} us/phrase  (x{reference / us:.2f})")
+    return resultats
+
+def bench_rejets(n=20000, graine=7):
+    """Taux de rejet effectif (expansions abandonnées ou invalides) par moteur."""
+    resultats = {}
+    for moteur in Amiral.MOTEURS_EXPANSION:
+        gen = Amiral.Generator(graine, moteur=moteur)
+        for _ in range(n):
+            gen.generate_sentence()
+        resultats[moteur] = gen.taux_rejet()
+        print(f"  {moteur:<12} {gen.rejets:>6} rejets / {gen.tentatives} tentatives"
+              f"  ({gen.taux_rejet():.3%}, {gen.secours} secours)")
+    return resultats
+
+_MESURE_IMPORT = "import time; t0 = time.perf_counter(); import Amiral; print(time.perf_counter() - t0)"
+
+def bench_import(repetitions=15):
+    """
+    Temps d'import d'Amiral (ms, meilleur de `repetitions` processus neufs) :
+    avec l'instantané des structures dérivées, puis à froid (instantané
+    supprimé avant chaque import, donc reconstruit et réécrit). L'écart
+    entre les deux, quelques ms, est du même ordre que le bruit d'un
+    processus à l'autre : la part de l'instantané seul est mesurée dans ce
+    processus, relecture (clé du source, vérification, marshal) contre
+    reconstruction de toutes les structures dérivées.
+    """
+    dossier = os.path.dirname(os.path.abspath(Amiral.__file__))
+    instantane = Amiral.chemin_instantane()
+
+    def importer(froid):
+        if froid:
+            try:
+                os.remove(instantane)
+            except OSError:
+                pass
+        sortie = subprocess.run([sys.executable, "-c", _MESURE_IMPORT], cwd=dossier,
+                                capture_output=True, text=True, check=True).stdout
+        return float(sortie)
+
+    py_compile.compile(Amiral.__file__)  # .pyc à jour même sous PYTHONDONTWRITEBYTECODE
+    importer(False)                      # instantané présent pour la mesure « chaude »
+    resultats = {}
+    for nom, froid in (("instantane_ms", False), ("froid_ms", True)):
+        resultats[nom] = round(min(importer(froid) for _ in range(repetitions)) * 1e3, 3)
+    importer(False)
+    tours = 20
+    resultats["derives_instantane_ms"] = round(mesurer(
+        lambda: [Amiral._lire_instantane(Amiral._cle_source()) for _ in range(tours)], repetitions) / tours * 1e3, 3)
+    constructeurs = list(Amiral._CONSTRUCTEURS_DERIVES.values())
+    resultats["derives_construits_ms"] = round(mesurer(
+        lambda: [construire() for _ in range(tours) for construire in constructeurs], repetitions) / tours * 1e3, 3)
+    for nom, ms in resultats.items():
+        print(f"  {nom:<22} {ms:>8.3f} ms")
+    return resultats
+
+TAILLES_LEXIQUE = (1000, 1000000)
+
+def _lexique_synthetique(chemin, taille):
+    """Lexique de `taille` noms dérivés du vocabulaire intégré (genre et nombre conservés)."""
+    modeles = list(Amiral.GN_GENRE_NOMBRE.items())
+    noms = ((f"{gn} {i // len(modeles)}" if i >= len(modeles) else gn, g, n)
+            for i, (gn, (g, n)) in zip(range(taille), itertools.cycle(modeles)))
+    adjectifs = ((base, f["m"]["s"], f["f"]["s"], f["m"]["p"], f["f"]["p"])
+                 for base, f in Amiral.ADJ_MORPHOLOGY.items())
+    Amiral.ecrire_lexique(chemin, noms, adjectifs)
+
+def bench_lexique(tailles=TAILLES_LEXIQUE, n=3000, graine=GRAINE):
+    """
+    Lexique compact mmap : coût par phrase (us) selon la taille du lexique,
+    comparé au vocabulaire intégré, avec le temps d'écriture et la taille du
+    fichier. Le coût doit rester plat quand le lexique grandit.
+    """
+    def generer():
+        Amiral.Generator(graine).generate_prose_block(n)
+
+    resultats = {"integre_us_phrase": par_phrase_us(mesurer(generer, 3), n)}
+    print(f"  {'intégré':<10} {resultats['integre_us_phrase']:>9.2f} us/phrase")
+    with tempfile.TemporaryDirectory() as dossier:
+        for taille in tailles:
+            chemin = os.path.join(dossier, f"lexique_{taille}.amlx")
+            t0 = time.perf_counter()
+            _lexique_synthetique(chemin, taille)
+            ecriture = time.perf_counter() - t0
+            lexique = Amiral.utiliser_lexique(chemin)
+            try:
+                us = par_phrase_us(mesurer(generer, 3), n)
+            finally:
+                Amiral.utiliser_lexique(None)
+                lexique.fermer()
+            resultats[f"{taille}_us_phrase"] = us
+            resultats[f"{taille}_ecriture_s"] = round(ecriture, 3)
+            resultats[f"{taille}_fichier_kio"] = round(os.path.getsize(chemin) / 1024, 1)
+            print(f"  {taille:<10} {us:>9.2f} us/phrase  écriture {ecriture:6.2f} s"
+                  f"  fichier {resultats[f'{taille}_fichier_kio']:>10.1f} Kio")
+    return resultats
+
+def _taux_reprises(phrases, noms, fenetre=3):
+    """Part des noms d'une phrase déjà présents dans les `fenetre` phrases précédentes."""
+    precedents = []
+    repris = total = 0
+    for phrase in phrases:
+        presents = {mot for mot in noms if mot in phrase}
+        repris += len(presents & set().union(*precedents[-fenetre:]))
+        total += len(presents)
+        precedents.append(presents)
+    return repris / total if total else 0.0
+
+def bench_recence(n=2000, graine=GRAINE, fenetres=(16, 64), taille_lexique=100000):
+    """
+    Récence lexicale : taux de noms repris d'une des 3 phrases précédentes et
+    coût par phrase (us), sans récence puis par taille de fenêtre ; coût
+    aussi sur un lexique de `taille_lexique` noms (doit rester du même ordre).
+    """
+    noms = list(Amiral.GN_BASE_MAP)
+    resultats = {}
+    for fenetre in (None,) + tuple(fenetres):
+        cle = "sans" if fenetre is None else f"fenetre_{fenetre}"
+        gen = Amiral.Generator(graine, recence=fenetre)
+        t0 = time.process_time()
+        phrases = [gen.generate_sentence() for _ in range(n)]
+        resultats[f"{cle}_us_phrase"] = par_phrase_us(time.process_time() - t0, n)
+        resultats[f"{cle}_reprises"] = round(_taux_reprises(phrases, noms), 4)
+        print(f"  {cle:<12} {resultats[f'{cle}_us_phrase']:>9.2f} us/phrase"
+              f"  noms repris {resultats[f'{cle}_reprises']:.1%}")
+    with tempfile.TemporaryDirectory() as dossier:
+        chemin = os.path.join(dossier, "lexique.amlx")
+        _lexique_synthetique(chemin, taille_lexique)
+        lexique = Amiral.utiliser_lexique(chemin)
+        try:
+            for fenetre in (None, max(fenetres)):
+                cle = f"lexique_{'sans' if fenetre is None else f'fenetre_{fenetre}'}_us_phrase"
+                gen = Amiral.Generator(graine, recence=fenetre)
+                resultats[cle] = par_phrase_us(mesurer(lambda: [gen.generate_sentence() for _ in range(n)], 3), n)
+                print(f"  lexique {taille_lexique} {'sans' if fenetre is None else fenetre:>6}"
+                      f" {resultats[cle]:>9.2f} us/phrase")
+        finally:
+            Amiral.utiliser_lexique(None)
+            lexique.fermer()
+    return resultats
+
+def bench_dedup(n=50000, graine=GRAINE, memoire_octets=1 << 20):
+    """
+    Dédoublonnage par filtre de Bloom : coût par phrase (us) avec et sans,
+    et taux de faux positifs estimé du filtre. Affiche aussi le taux de
+    doublons écartés, le remplissage du filtre et les doublons exacts
+    restants (ensemble Python, pour contrôle), qui ne sont pas des coûts.
+    """
+    resultats = {}
+    for nom, filtre in (("sans", None), ("bloom", Amiral.FiltreBloom(memoire_octets))):
+        gen = Amiral.Generator(graine, dedup=filtre)
+        t0 = time.process_time()
+        phrases = [gen.generate_sentence() for _ in range(n)]
+        resultats[f"{nom}_us_phrase"] = par_phrase_us(time.process_time() - t0, n)
+        print(f"  {nom:<6} {resultats[f'{nom}_us_phrase']:>9.2f} us/phrase"
+              f"  {n - len(set(phrases)):>6} doublons restants")
+    resultats["taux_faux_positifs"] = filtre.taux_faux_positifs_estime()
+    print(f"  écartés {gen.taux_doublons():.3%} des tirages, filtre rempli à {filtre.remplissage():.3%},"
+          f" faux positifs estimés {resultats['taux_faux_positifs']:.2e}")
+    return resultats
+
+async def _lire_http(port, cible):
+    """Corps (décodé, chunked) d'un GET sur le serveur local."""
+    lecteur, ecrivain = await asyncio.open_connection("127.0.0.1", port)
+    ecrivain.write(f"GET {cible} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode("ascii"))
+    await lecteur.readuntil(b"\r\n\r\n")
+    corps = bytearray()
+    while True:
+        taille = int(await lecteur.readline(), 16)
+        if not taille:
+            break
+        corps += await lecteur.readexactly(taille)
+        await lecteur.readline()
+    ecrivain.close()
+    return corps.decode("utf-8")
+
+def bench_serveur(n=5000, graine=GRAINE, workers=2):
+    """
+    Serveur asyncio local : temps réel pour servir n phrases à un client
+    pendant qu'un autre client ouvre un flux infini sans jamais le lire
+    (contre-pression), et contrôle que le texte reçu est celui de
+    generate_prose_block(n, seed=graine, chunk_size=TAILLE_LOT_SERVEUR).
+    """
+    async def scenario(pool):
+        serveur = await Amiral.demarrer_serveur(port=0, executor=pool)
+        port = serveur.sockets[0].getsockname()[1]
+        _, bloque = await asyncio.open_connection("127.0.0.1", port)
+        bloque.write(b"GET /phrases?seed=1 HTTP/1.1\r\nHost: localhost\r\n\r\n")
+        t0 = time.perf_counter()
+        texte = await _lire_http(port, f"/phrases?n={n}&seed={graine}")
+        duree = time.perf_counter() - t0
+        bloque.close()
+        serveur.close()
+        return texte, duree
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        texte, duree = asyncio.run(scenario(pool))
+    attendu = Amiral.generate_prose_block(n, workers=1, seed=graine, chunk_size=Amiral.TAILLE_LOT_SERVEUR)
+    if texte != attendu:
+        raise AssertionError("le serveur ne reproduit pas generate_prose_block pour la même graine")
+    resultats = {"us_phrase": par_phrase_us(duree, n)}
+    print(f"  {n} phrases servies en {duree:.2f} s ({resultats['us_phrase']:.1f} us/phrase, "
+          f"{workers} workers, un client bloqué en parallèle)")
+    return resultats
+
+# Moteurs qui doivent rendre exactement le même texte pour une graine
+MOTEURS_EXACTS = ("recursif", "iteratif", "compile")
+
+def bench_moteurs(n=5000, graine=GRAINE, tours=3):
+    """
+    Coût par phrase (us) de chaque moteur d'expansion (tours entrelacés).
+    L'égalité des textes des moteurs exacts est vérifiée par test_amiral.py.
+    """
+    meilleurs = {moteur: float("inf") for moteur in Amiral.MOTEURS_EXPANSION}
+    for _ in range(tours):
+        for moteur in meilleurs:
+            gen = Amiral.Generator(graine, moteur=moteur)
+            t0 = time.process_time()
+            gen.generate_prose_block(n)
+            meilleurs[moteur] = min(meilleurs[moteur], time.process_time() - t0)
+    resultats = {}
+    for moteur, duree in meilleurs.items():
+        resultats[f"{moteur}_us_phrase"] = par_phrase_us(duree, n)
+        print(f"  {moteur:<12} {resultats[f'{moteur}_us_phrase']:>9.2f} us/phrase")
+    return resultats
+
+def bench_poids(n=3000, graine=GRAINE, tirages=200000):
+    """
+    Tirages pondérés : coût d'un TableTirage.tirer (ns) contre la cascade de
+    seuils qu'il remplace, et effet de poids de règles sur tous les moteurs
+    (les moteurs exacts doivent rester identiques entre eux, et SP_CHAIN 1:3
+    doit allonger les phrases de tous les moteurs pondérés). Les poids du
+    module sont rétablis à la fin.
+    """
+    rng = random.Random(graine)
+    table = Amiral.TableTirage(Amiral.POIDS_CHOIX["sujet"])
+
+    def cascade():
+        for _ in range(tirages):
+            u = rng.random()
+            if u < 0.10:
+                pass
+            elif u < 0.24:
+                pass
+            elif u < 0.38:
+                pass
+
+    def pondere():
+        tirer = table.tirer
+        for _ in range(tirages):
+            tirer(rng)
+
+    resultats = {"cascade_ns": mesurer(cascade) / tirages * 1e9, "table_ns": mesurer(pondere) / tirages * 1e9}
+    print(f"  tirage : cascade {resultats['cascade_ns']:.0f} ns, table {resultats['table_ns']:.0f} ns")
+    mots = {}
+    poids_regles = dict(Amiral.POIDS_REGLES)
+    try:
+        for regle, poids in (("uniforme", None), ("SP_CHAIN 1:3", (1, 3))):
+            Amiral.regler_poids(regles={"SP_CHAIN": poids})
+            textes = {}
+            for moteur in Amiral.MOTEURS_EXPANSION:
+                gen = Amiral.Generator(graine, moteur=moteur)
+                textes[moteur] = [gen.generate_sentence() for _ in range(n)]
+            if len({tuple(textes[moteur]) for moteur in MOTEURS_EXACTS}) != 1:
+                raise AssertionError(f"poids {regle} : les moteurs exacts divergent")
+            for moteur, phrases in textes.items():
+                mots[moteur, regle] = sum(len(p.split()) for p in phrases) / len(phrases)
+            print(f"  {regle:<13} mots/phrase : "
+                  + ", ".join(f"{moteur} {mots[moteur, regle]:.1f}" for moteur in textes))
+    finally:
+        Amiral.regler_poids(regles={sym: poids_regles.get(sym) for sym in Amiral.POIDS_REGLES.keys() | poids_regles})
+    # Le moteur "uniforme" tire parmi les dérivations sans tenir compte des poids
+    for moteur in Amiral.MOTEURS_EXPANSION.keys() - {"uniforme"}:
+        if mots[moteur, "SP_CHAIN 1:3"] <= mots[moteur, "uniforme"]:
+            raise AssertionError(f"poids SP_CHAIN 1:3 : phrases du moteur {moteur} pas plus longues")
+    return resultats
+
+def bench_derivations(n=300, graine=GRAINE, profondeurs=(10, 20, 40, 60)):
+    """
+    Dénombrement des squelettes (choix de règles) de PHRASE selon la
+    profondeur maximale, coût d'un dérang (us) et d'une phrase numérotée
+    (us). L'indépendance des phrases numérotées et rang/deriver sont
+    vérifiés par test_amiral.py.
+    """
+    resultats = {}
+    for profondeur in profondeurs:
+        # Nombre de dérivations : propriété de la grammaire, affiché sans être comparé
+        total = Amiral.compter_derivations(max_depth=profondeur)
+        print(f"  profondeur {profondeur:>3} : {total} squelettes (2^{total.bit_length()})")
+    table = Amiral.derivations(Amiral.MAX_EXPANSION_DEPTH, Amiral.MAX_PROFONDEUR_RECURSIVITE_SUB)
+    rng = random.Random(graine)
+    resultats["deriver_us"] = mesurer(lambda: [table.tirer(rng) for _ in range(n)]) / n * 1e6
+    t0 = time.process_time()
+    Amiral.phrases_numeros(1000, 1000 + n, seed=graine)
+    resultats["phrase_numero_us"] = par_phrase_us(time.process_time() - t0, n)
+    print(f"  dérang {resultats['deriver_us']:.1f} us, phrase numérotée {resultats['phrase_numero_us']:.1f} us")
+    return resultats
+
+def bench_compteur(n=3000, graine=GRAINE, saut=40_000_000):
+    """
+    Mode compteur (une graine par phrase) : coût par phrase (us) contre le
+    mode courant et coût d'un saut à la phrase `saut` (us, doit être
+    constant). L'égalité des tranches en série, par lots et phrase par phrase
+    est vérifiée par test_amiral.py.
+    """
+    resultats = {}
+    for cle, options in (("courant", {}), ("compteur", {"compteur": True})):
+        gen = Amiral.Generator(graine, **options)
+        resultats[f"{cle}_us_phrase"] = par_phrase_us(mesurer(lambda: [gen.generate_sentence() for _ in range(n)], 3), n)
+    gen = Amiral.Generator(graine, compteur=True)
+    resultats["saut_us"] = mesurer(lambda: gen.phrase(saut)) * 1e6
+    print(f"  courant {resultats['courant_us_phrase']:.2f} us/phrase, compteur {resultats['compteur_us_phrase']:.2f}"
+          f" us/phrase, saut à la phrase {saut} : {resultats['saut_us']:.1f} us")
+    return resultats
+
+def bench_ecriture(n=20000, graine=GRAINE):
+    """
+    Écriture de n phrases déjà tirées (us/phrase, temps CPU) : print() phrase
+    par phrase dans un fichier texte contre EcrivainPhrases (blocs encodés
+    une fois), en lignes et en JSONL, brut puis gzip, bz2 et xz, et taille
+    des fichiers compressés (Kio). La relecture des fichiers compressés est
+    vérifiée par test_amiral.py.
+    """
+    gen = Amiral.Generator(graine)
+    phrases = [gen.generate_sentence() for _ in range(n)]
+    resultats = {}
+    # Taille brute et rapports de compression : affichés, pas comparés (plus haut est meilleur)
+    taille_brute, rapports = {}, {}
+    with tempfile.TemporaryDirectory() as dossier:
+        chemin = os.path.join(dossier, "sortie")
+
+        def imprimer():
+            with open(chemin, "w", encoding="utf-8", newline="\n") as f:
+                for phrase in phrases:
+                    print(phrase, file=f)
+
+        def ecrire(format, compression):
+            with Amiral.EcrivainPhrases(chemin, format, compression=compression, graine=graine) as ecrivain:
+                for phrase in phrases:
+                    ecrivain.ecrire(phrase)
+
+        resultats["print_us_phrase"] = par_phrase_us(mesurer(imprimer, 3), n)
+        for format in ("lignes", "jsonl"):
+            for compression in (None, "gzip", "bz2", "xz"):
+                cle = f"{format}_{compression or 'brut'}"
+                resultats[f"{cle}_us_phrase"] = par_phrase_us(mesurer(lambda: ecrire(format, compression), 3), n)
+                if compression is None:
+                    taille_brute[format] = os.path.getsize(chemin)
+                else:
+                    resultats[f"{cle}_kio"] = round(os.path.getsize(chemin) / 1024, 1)
+                    rapports[cle] = taille_brute[format] / os.path.getsize(chemin)
+    print(f"  print() {resultats['print_us_phrase']:.2f} us/phrase ; lignes : brut {resultats['lignes_brut_us_phrase']:.2f}"
+          f", gzip {resultats['lignes_gzip_us_phrase']:.2f}, bz2 {resultats['lignes_bz2_us_phrase']:.2f}"
+          f", xz {resultats['lignes_xz_us_phrase']:.2f} us/phrase")
+    print(f"  jsonl : brut {resultats['jsonl_brut_us_phrase']:.2f}, gzip {resultats['jsonl_gzip_us_phrase']:.2f}"
+          f", bz2 {resultats['jsonl_bz2_us_phrase']:.2f}, xz {resultats['jsonl_xz_us_phrase']:.2f} us/phrase"
+          f" ({taille_brute['jsonl'] / 2**20:.2f} Mio ; gzip x{rapports['jsonl_gzip']:.1f}"
+          f", bz2 x{rapports['jsonl_bz2']:.1f}, xz x{rapports['jsonl_xz']:.1f})")
+    return resultats
+
+BANCS = {
+    "micro": bench_micro,
+    "macro": bench_macro,
+    "echelle": bench_echelle,
+    "sources_alea": bench_sources_alea,
+    "rejets": bench_rejets,
+    "import": bench_import,
+    "lexique": bench_lexique,
+    "dedup": bench_dedup,
+    "serveur": bench_serveur,
+    "moteurs": bench_moteurs,
+    "poids": bench_poids,
+    "recence": bench_recence,
+    "derivations": bench_derivations,
+    "compteur": bench_compteur,
+    "ecriture": bench_ecriture,
+}
+
+# =============================================================================
+# RÉFÉRENCES JSON
+# =============================================================================
+
+def meta():
+    return {
+        "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "plateforme": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+def comparer(base, nouveau, seuil=SEUIL_REGRESSION):
+    """
+    Compare deux références {"resultats": {banc: {mesure: valeur}}} ; renvoie
+    la liste des régressions (banc, mesure, base, nouveau, rapport).
+    """
+    regressions = []
+    for banc, mesures in nouveau["resultats"].items():
+        for mesure, valeur in mesures.items():
+            ref = base["resultats"].get(banc, {}).get(mesure)
+            if ref is None:
+                print(f"  {banc}.{mesure:<40} {'':>12} -> {valeur:>12}  (nouveau)")
+                continue
+            rapport = valeur / ref if ref else (1.0 if not valeur else float("inf"))
+            regression = rapport > 1 + seuil
+            print(f"  {banc}.{mesure:<40} {ref:>12} -> {valeur:>12}  x{rapport:.2f}"
+                  + ("  RÉGRESSION" if regression else ""))
+            if regression:
+                regressions.append((banc, mesure, ref, valeur, rapport))
+    return regressions
+
+def lire_reference(chemin):
+    with open(chemin, encoding="utf-8") as f:
+        return json.load(f)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commandes = parser.add_subparsers(dest="commande")
+
+    lancer = commandes.add_parser("lancer", help="lancer des bancs")
+    lancer.add_argument("bancs", nargs="*", metavar="BANC", help=f"bancs à lancer parmi {', '.join(BANCS)} (tous par défaut)")
+    lancer.add_argument("--tailles", help="tailles du banc macro, séparées par des virgules "
+                                          f"(défaut {','.join(map(str, TAILLES_MACRO))})")
+    lancer.add_argument("--sortie", metavar="JSON", help="enregistrer les résultats comme référence")
+    lancer.add_argument("--comparer", metavar="JSON", help="comparer les résultats à cette référence")
+    lancer.add_argument("--seuil", type=float, default=SEUIL_REGRESSION, help="tolérance relative (défaut 0.10)")
+
+    cmp_ = commandes.add_parser("comparer", help="comparer deux références JSON")
+    cmp_.add_argument("base")
+    cmp_.add_argument("nouveau")
+    cmp_.add_argument("--seuil", type=float, default=SEUIL_REGRESSION, help="tolérance relative (défaut 0.10)")
+
+    args = parser.parse_args(argv)
+
+    if args.commande == "comparer":
+        regressions = comparer(lire_reference(args.base), lire_reference(args.nouveau), args.seuil)
+        print(f"{len(regressions)} régression(s)")
+        return 1 if regressions else 0
+
+    bancs = getattr(args, "bancs", None) or list(BANCS)
+    inconnus = [nom for nom in bancs if nom not in BANCS]
+    if inconnus:
+        parser.error(f"banc(s) inconnu(s) : {', '.join(inconnus)}")
+    options = {}
+    if getattr(args, "tailles", None):
+        options["macro"] = {"tailles": tuple(int(t) for t in args.tailles.split(","))}
+
+    reference = {"meta": meta(), "resultats": {}}
+    for nom in bancs:
+        print(f"[{nom}]")
+        reference["resultats"][nom] = BANCS[nom](**options.get(nom, {}))
+
+    if getattr(args, "sortie", None):
+        with open(args.sortie, "w", encoding="utf-8") as f:
+            json.dump(reference, f, ensure_ascii=False, indent=2)
+    if getattr(args, "comparer", None):
+        print("[comparaison]")
+        regressions = comparer(lire_reference(args.comparer), reference, args.seuil)
+        print(f"{len(regressions)} régression(s)")
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,513 @@
+"""
+Tests d'Amiral.py (pytest), par fonctionnalité ; le serveur HTTP est testé sur
+localhost. Graines et seuils fixés : résultats reproductibles.
+"""
+
+import asyncio
+import bz2
+import gzip
+import itertools
+import json
+import lzma
+import marshal
+import math
+import multiprocessing
+import os
+import shutil
+import subprocess
+import sys
+import zlib
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import pytest
+
+import Amiral
+
+GRAINE = 5
+
+# =============================================================================
+# Générateur du module
+# =============================================================================
+
+def test_generateur_module_meme_etat_que_generator():
+    parametres = {"possessive_det_prob", "max_expansion_depth", "max_profondeur_sub", "max_profondeur_cn",
+                  "max_retry_sentence", "moteur"}
+    assert set(vars(Amiral._GenerateurModule())) == set(vars(Amiral.Generator(GRAINE))) - parametres
+    Amiral.random.seed(GRAINE)
+    gen = Amiral.Generator(rng=Amiral.random)
+    attendu = [gen.generate_sentence() for _ in range(20)]
+    Amiral.random.seed(GRAINE)
+    assert [Amiral.generate_sentence() for _ in range(20)] == attendu
+
+# =============================================================================
+# Instantané des structures dérivées
+# =============================================================================
+
+def test_instantane_egal_reconstruction_et_purge(tmp_path):
+    # Copie du module dans un dossier neuf : même clé de source, cache vide, tout est reconstruit
+    shutil.copy(Amiral.__file__, tmp_path / "Amiral.py")
+    cache = tmp_path / "__pycache__"
+    cache.mkdir()
+    tag = sys.implementation.cache_tag
+    perimes = [cache / f"amiral_derives.0123456789abcdef.{tag}.marshal",
+               cache / f"amiral_grammaire.0123456789abcdef.fedcba9876543210.{tag}.marshal",
+               cache / f"amiral_squelettes.0123456789abcdef.fedcba9876543210.{tag}.marshal"]
+    for chemin in perimes:
+        chemin.write_bytes(b"")
+    script = ("import marshal, sys, Amiral; Amiral.Generator(1).generate_sentence();"
+              " marshal.dump(Amiral._DERIVES_CONSTRUITS, sys.stdout.buffer)")
+    sortie = subprocess.run([sys.executable, "-c", script], cwd=tmp_path, capture_output=True, check=True).stdout
+    construits = marshal.loads(sortie)
+    instantane = Amiral._lire_instantane(Amiral._CLE_INSTANTANE)
+    assert set(construits) == set(Amiral._CONSTRUCTEURS_DERIVES)
+    assert instantane == construits
+    # Fichiers d'une autre version du source supprimés, ceux de la version courante écrits
+    assert not any(chemin.exists() for chemin in perimes)
+    assert {nom.split(".")[0] for nom in os.listdir(cache) if nom.endswith(".marshal")} == {
+        "amiral_derives", "amiral_grammaire"}
+    assert all(nom.split(".")[1] == Amiral._CLE_INSTANTANE for nom in os.listdir(cache) if nom.endswith(".marshal"))
+
+# =============================================================================
+# Post-traitement en une passe
+# =============================================================================
+
+_CAS_LIMITES_POST = [
+    "de-le à", "le-de au", "de le-de arbre", "à le-de le-à le", "l'à le-de",
+    "de-de le-le", "d'de y-se y", "sur-le d'de y-se y", "de y-de arbre",
+    "de le arbre", "à les arbres", "de les-x", "que il", "l' arbre", "de l' arbre",
+    "le le mur", "porte-avion de le hôtel", "  de  le  mur ", "De Le Arbre",
+]
+
+def _brut_phrases(graine, n):
+    """Expansions brutes (avant post-traitement) d'un générateur à graine fixe."""
+    gen = Amiral.Generator(graine)
+    Amiral._ETAT_THREAD.gen = gen
+    try:
+        bruts = []
+        while len(bruts) < n:
+            try:
+                bruts.append(gen._expand_phrase({"person_policy": None}))
+            except Amiral._PhraseAvortee:
+                pass
+        return bruts
+    finally:
+        Amiral._ETAT_THREAD.gen = None
+
+@pytest.mark.parametrize("brut", _CAS_LIMITES_POST)
+def test_post_traitement_cas_limites(brut):
+    assert Amiral.post_process_phrase(brut) == Amiral._post_process_phrase_regex(brut)
+
+def test_post_traitement_egal_regex_sur_corpus():
+    for brut in _brut_phrases(GRAINE, 3000):
+        assert Amiral.post_process_phrase(brut) == Amiral._post_process_phrase_regex(brut), brut
+
+# =============================================================================
+# Moteurs d'expansion exacts
+# =============================================================================
+
+@pytest.mark.parametrize("config", [{}, {"max_expansion_depth": 120, "max_profondeur_sub": 6}])
+@pytest.mark.parametrize("graine", [GRAINE, 1234])
+def test_moteurs_exacts_meme_texte(graine, config):
+    textes = {moteur: Amiral.Generator(graine, moteur=moteur, **config).generate_prose_block(300)
+              for moteur in ("recursif", "iteratif", "compile")}
+    assert textes["iteratif"] == textes["recursif"]
+    assert textes["compile"] == textes["recursif"]
+
+def test_moteurs_recursifs_replies_sur_iteratif_en_profondeur():
+    # SP_CHAIN presque toujours prolongée : la phrase atteint la profondeur limite
+    profondeur = sys.getrecursionlimit() + 500
+    Amiral.regler_poids(regles={"SP_CHAIN": (1, 10 ** 9)})
+    try:
+        textes = {moteur: Amiral.Generator(GRAINE, moteur=moteur, max_expansion_depth=profondeur).generate_sentence()
+                  for moteur in ("recursif", "iteratif", "compile")}
+    finally:
+        Amiral.regler_poids(regles={"SP_CHAIN": None})
+    assert len(textes["iteratif"].split()) > profondeur
+    assert textes["recursif"] == textes["compile"] == textes["iteratif"]
+
+# =============================================================================
+# Dénombrement des dérivations
+# =============================================================================
+
+@pytest.mark.parametrize("profondeur", [4, 10, 40])
+def test_derivations_rang_inverse_de_deriver(profondeur):
+    table = Amiral.derivations(profondeur, Amiral.MAX_PROFONDEUR_RECURSIVITE_SUB)
+    rng = Amiral.random.Random(GRAINE)
+    rangs = range(table.total) if table.total <= 2000 else [Amiral._entier_uniforme(rng, table.total)
+                                                           for _ in range(500)]
+    for k in rangs:
+        choix = []
+        table.deriver(k, choix=choix)
+        assert table.rang(choix) == k
+
+def test_derivations_bornes():
+    table = Amiral.derivations(Amiral.MAX_EXPANSION_DEPTH, Amiral.MAX_PROFONDEUR_RECURSIVITE_SUB)
+    for k in (-1, table.total):
+        with pytest.raises(IndexError):
+            table.deriver(k)
+
+def test_phrase_numero_independante_des_autres():
+    plage = Amiral.phrases_numeros(1000, 1060, seed=GRAINE)
+    assert [Amiral.phrase_numero(k, seed=GRAINE) for k in range(1059, 999, -1)][::-1] == plage
+    assert Amiral.phrase_numero(1030, seed=GRAINE + 1) != plage[30]
+
+# =============================================================================
+# Lexique compact
+# =============================================================================
+
+_ADJECTIFS = [("vert", "vert", "verte", "verts", "vertes"), ("grand", "grand", "grande", "grands", "grandes"),
+              ("sûr", "sûr", "sûre", "sûrs", "sûres")]
+
+def _noms_en_collision(masque, nombre):
+    """Noms dont le crc32 tombe dans la dernière case d'une table de masque `masque`."""
+    noms = (f"nom {i}" for i in itertools.count())
+    return list(itertools.islice((nom for nom in noms if zlib.crc32(nom.encode("utf-8")) & masque == masque),
+                                 nombre))
+
+def test_lexique_relu_a_l_identique(tmp_path):
+    # Quatre noms dans la dernière case d'une table de 8 : le sondage repart au début
+    *en_collision, absent = _noms_en_collision(7, 5)
+    noms = [(nom, g, n) for nom, (g, n) in zip(en_collision, Amiral._CATEGORIES_LEXIQUE)]
+    chemin = tmp_path / "lexique.amlx"
+    # Doublon : la première occurrence l'emporte
+    Amiral.ecrire_lexique(chemin, noms + [(noms[0][0], "f", "p")], _ADJECTIFS + [("vert", "x", "x", "x", "x")])
+    with Amiral.Lexique(chemin) as lexique:
+        assert lexique._taille_idx_noms == 8
+        assert (lexique.nb_noms, lexique.nb_adjectifs) == (4, 3)
+        assert [lexique.nom(i) for i in range(lexique.nb_noms)] == en_collision
+        for i, (nom, g, n) in enumerate(noms):
+            assert lexique.rang_nom(nom) == i
+            assert lexique.genre_nombre(nom) == (g, n)
+        assert lexique.rang_nom(absent) == -1
+        assert lexique.genre_nombre(absent) is None
+        for i, (base, *formes) in enumerate(_ADJECTIFS):
+            assert lexique.rang_adjectif(base) == i
+            assert [lexique.accord((base, g, n)) for g, n in Amiral._CATEGORIES_LEXIQUE] == formes
+        assert lexique.accord(("bleu", "m", "s")) is None
+
+def test_lexique_grand_index(tmp_path):
+    rng = Amiral.random.Random(GRAINE)
+    noms = [(f"nom {i}", *rng.choice(Amiral._CATEGORIES_LEXIQUE)) for i in range(20000)]
+    chemin = tmp_path / "lexique.amlx"
+    Amiral.ecrire_lexique(chemin, noms, _ADJECTIFS)
+    with Amiral.Lexique(chemin) as lexique:
+        for nom, g, n in noms:
+            i = lexique.rang_nom(nom)
+            assert lexique.nom(i) == nom
+            assert lexique.genre_nombre(nom) == (g, n)
+        assert lexique.rang_nom("nom 20000") == -1
+
+def test_lexique_invalide(tmp_path):
+    with pytest.raises(ValueError, match="chaque"):
+        Amiral.ecrire_lexique(tmp_path / "a.amlx", [("mur", "m", "s")], _ADJECTIFS)
+    noms = [(f"nom {k}", g, n) for k, (g, n) in enumerate(Amiral._CATEGORIES_LEXIQUE)]
+    with pytest.raises(ValueError, match="adjectif"):
+        Amiral.ecrire_lexique(tmp_path / "b.amlx", noms, [])
+    (tmp_path / "c.amlx").write_bytes(bytes(Amiral._ENTETE_LEXIQUE.size))
+    with pytest.raises(ValueError, match="version"):
+        Amiral.Lexique(tmp_path / "c.amlx")
+
+def test_lexique_actif_dans_les_workers(tmp_path):
+    chemin = tmp_path / "lexique.amlx"
+    noms = [(f"nomlex{k}{i}", g, n) for k, (g, n) in enumerate(Amiral._CATEGORIES_LEXIQUE) for i in range(50)]
+    Amiral.ecrire_lexique(chemin, noms, _ADJECTIFS)
+    integre = Amiral.generer_prose_par_lots(60, GRAINE, workers=1, chunk_size=10)
+    Amiral.utiliser_lexique(chemin)
+    try:
+        serie = Amiral.generer_prose_par_lots(60, GRAINE, workers=1, chunk_size=10)
+        # "spawn" : les workers n'héritent pas du lexique actif, ils doivent le rouvrir
+        with ProcessPoolExecutor(2, mp_context=multiprocessing.get_context("spawn")) as pool:
+            lots = Amiral.generer_prose_par_lots(60, GRAINE, chunk_size=10, executor=pool)
+    finally:
+        Amiral.utiliser_lexique(None)
+    assert "nomlex" in serie
+    assert lots == serie != integre
+    assert Amiral.generer_prose_par_lots(60, GRAINE, workers=1, chunk_size=10) == integre
+
+# =============================================================================
+# Récence lexicale
+# =============================================================================
+
+@pytest.mark.parametrize("n", [1, 2, 7, 64, 1000])
+def test_fenwick_egal_sommes_prefixes(n):
+    rng = Amiral.random.Random(GRAINE + n)
+    arbre = Amiral.ArbreFenwick(n)
+    poids = [arbre.plein] * n
+    for _ in range(4 * n):
+        i = rng.randrange(n)
+        # Jusqu'à des poids nuls, que chercher() doit sauter
+        delta = rng.choice((-poids[i], rng.randrange(-poids[i], 3 * arbre.plein)))
+        arbre.ajuster(i, delta)
+        poids[i] += delta
+    sommes = list(itertools.accumulate(poids, initial=0))
+    assert arbre.total == sommes[-1]
+    assert [arbre.prefixe(i) for i in range(n + 1)] == sommes
+    cibles = range(arbre.total) if arbre.total <= 5000 else [rng.randrange(arbre.total) for _ in range(5000)]
+    for cible in cibles:
+        attendu = next(i for i in range(n) if sommes[i + 1] > cible)
+        assert arbre.chercher(cible) == attendu
+
+def test_recence_facteur_nul_sans_reprise_dans_la_fenetre():
+    recence = Amiral.RecenceLexicale(fenetre=40, facteur=0.0)
+    rng = Amiral.random.Random(GRAINE)
+    singuliers = Amiral.GN_PAR_NOMBRE["s"]
+    noms = [recence.tirer("noms", singuliers, rng) for _ in range(2000)]
+    assert set(noms) <= set(singuliers)
+    assert all(len(set(noms[k:k + 41])) == 41 for k in range(len(noms) - 40))
+
+def test_recence_sous_pondere_le_recent(n=40000):
+    # Fenêtre d'un élément : le dernier tiré pèse `facteur`, les autres 1
+    facteur = 0.5
+    adjectifs = Amiral.ADJECTIFS_DISPONIBLES
+    reprises = {}
+    for cle, recence in (("uniforme", None), ("recence", Amiral.RecenceLexicale(fenetre=1, facteur=facteur))):
+        rng = Amiral.random.Random(GRAINE)
+        tires = [rng.choice(adjectifs) if recence is None else recence.tirer("adjectifs", adjectifs, rng)
+                 for _ in range(n)]
+        reprises[cle] = sum(a == b for a, b in zip(tires, tires[1:]))
+    p = facteur / (len(adjectifs) - 1 + facteur)
+    assert abs(reprises["recence"] - p * (n - 1)) <= 5 * math.sqrt(p * n)
+    assert reprises["uniforme"] > 1.5 * reprises["recence"]
+
+# =============================================================================
+# Dédoublonnage
+# =============================================================================
+
+@pytest.mark.parametrize("taux", [0.05, 0.01, 1e-3])
+def test_dedup_taux_de_faux_positifs(taux, essais=100000):
+    filtre = Amiral.FiltreBloom(1 << 14, taux)
+    vus = [f"phrase {i}" for i in range(filtre.capacite)]
+    for phrase in vus:
+        filtre.ajouter(phrase)
+    assert all(phrase in filtre for phrase in vus)
+    faux = sum(f"autre {i}" in filtre for i in range(essais)) / essais
+    # À pleine capacité, le taux mesuré reste proche de la cible et de l'estimation
+    assert taux / 2 <= faux <= 2 * taux
+    assert filtre.taux_faux_positifs_estime() / 2 <= faux <= 2 * filtre.taux_faux_positifs_estime()
+
+def test_dedup_filtre_sature_remis_a_zero():
+    filtre = Amiral.FiltreBloom(64)
+    gen = Amiral.Generator(GRAINE, dedup=filtre, metriques=True)
+    with pytest.warns(RuntimeWarning, match="saturé"):
+        phrases = [gen.generate_sentence() for _ in range(3 * filtre.capacite)]
+    assert len(phrases) == 3 * filtre.capacite
+    assert gen.saturations_dedup == gen.metriques.saturations_dedup >= 2
+    assert not filtre.sature()
+
+def test_dedup_fonction_de_module():
+    Amiral.random.seed(GRAINE)
+    sans = Amiral.generate_prose_block(40)
+    Amiral.random.seed(GRAINE)
+    filtre = Amiral.FiltreBloom(1 << 16)
+    avec = Amiral.generate_prose_block(40, dedup=filtre)
+    # Sans doublon tiré, même texte ; le filtre passé a tout vu
+    assert avec == sans
+    assert filtre.elements == 40
+    assert Amiral._GENERATEUR_MODULE.dedup is None
+
+# =============================================================================
+# Mode compteur
+# =============================================================================
+
+SAUT = 40_000_000
+
+@pytest.mark.parametrize("workers, taille_lot", [(1, 7), (2, 13), (3, 100)])
+def test_compteur_tranche_independante_du_decoupage(workers, taille_lot):
+    tranche = Amiral.generer_plage(GRAINE, SAUT, SAUT + 100)
+    assert Amiral.generer_plage(GRAINE, SAUT, SAUT + 37) + Amiral.generer_plage(GRAINE, SAUT + 37, SAUT + 100) == tranche
+    par_lots = Amiral.generer_prose_par_lots(100, GRAINE, workers=workers, chunk_size=taille_lot,
+                                             config={"compteur": True}, debut=SAUT)
+    assert par_lots == " ".join(tranche)
+
+def test_compteur_phrase_par_phrase_a_rebours():
+    tranche = Amiral.generer_plage(GRAINE, SAUT, SAUT + 50)
+    gen = Amiral.Generator(GRAINE, compteur=True)
+    assert [gen.phrase(k) for k in range(SAUT + 49, SAUT - 1, -1)][::-1] == tranche
+
+def test_compteur_refuse_la_source_numpy():
+    with pytest.raises(ValueError):
+        Amiral.Generator(GRAINE, source="numpy", compteur=True)
+    with pytest.raises(ValueError):
+        Amiral.generer_plage(GRAINE, 0, 3, config={"source": "numpy"})
+
+def test_compteur_source_rapide_phrase_par_phrase():
+    plage = Amiral.generer_plage(GRAINE, 40, 60, config={"source": "rapide"})
+    gen = Amiral.Generator(GRAINE, source="rapide", compteur=True)
+    assert [gen.phrase(k) for k in range(59, 39, -1)][::-1] == plage
+
+# =============================================================================
+# Écriture compressée
+# =============================================================================
+
+_DECOMPRESSEURS = {None: open, "gzip": gzip.open, "bz2": bz2.open, "xz": lzma.open}
+
+@pytest.mark.parametrize("compression", [None, "gzip", "bz2", "xz"])
+@pytest.mark.parametrize("format", ["texte", "lignes", "jsonl"])
+def test_ecriture_relue_a_l_identique(tmp_path, format, compression):
+    gen = Amiral.Generator(GRAINE)
+    phrases = [gen.generate_sentence() for _ in range(300)]
+    chemin = tmp_path / "sortie"
+    # Petit tampon : plusieurs blocs, donc plusieurs écritures dans le compresseur
+    with Amiral.EcrivainPhrases(chemin, format, compression=compression, graine=GRAINE, debut=10,
+                                tampon=500) as ecrivain:
+        ecrivain.ecrire_lot(phrases[:100])
+        for phrase in phrases[100:]:
+            ecrivain.ecrire(phrase)
+    with _DECOMPRESSEURS[compression](chemin, "rt", encoding="utf-8", newline="") as f:
+        contenu = f.read()
+    assert len(contenu.encode("utf-8")) == ecrivain.octets
+    if format == "texte":
+        assert contenu == " ".join(phrases) + "\n"
+    elif format == "lignes":
+        assert contenu == "".join(p + "\n" for p in phrases)
+    else:
+        attendu = [{"seed": GRAINE, "index": i, "phrase": p} for i, p in enumerate(phrases, 10)]
+        assert [json.loads(ligne) for ligne in contenu.splitlines()] == attendu
+
+@pytest.mark.parametrize("extension, compression", [(".gz", "gzip"), (".bz2", "bz2"), (".xz", "xz")])
+def test_ecriture_compression_deduite_de_l_extension(tmp_path, extension, compression):
+    chemin = tmp_path / f"sortie.txt{extension}"
+    with Amiral.EcrivainPhrases(chemin) as ecrivain:
+        ecrivain.ecrire("Une phrase.")
+    with _DECOMPRESSEURS[compression](chemin, "rt", encoding="utf-8") as f:
+        assert f.read() == "Une phrase.\n"
+
+# =============================================================================
+# Ligne de commande
+# =============================================================================
+
+@pytest.mark.parametrize("options", [["-n", "5"], ["--infini"], ["--seed", "1"], ["-o", "sortie.txt"],
+                                     ["--format", "jsonl"], ["--stats"], ["--tampon", "10"], ["--debut", "3"]])
+def test_serveur_refuse_les_options_de_sortie(options, capsys):
+    with pytest.raises(SystemExit) as sortie:
+        Amiral.main(["--serveur", "0", *options])
+    assert sortie.value.code == 2
+    assert f"{options[0]} sans effet" in capsys.readouterr().err
+
+def test_ligne_de_commande_ecrit_la_sortie(tmp_path):
+    chemin = tmp_path / "sortie.txt.gz"
+    assert Amiral.main(["-n", "12", "--seed", str(GRAINE), "--format", "lignes", "-o", str(chemin)]) == 0
+    with gzip.open(chemin, "rt", encoding="utf-8") as f:
+        lignes = f.read().splitlines()
+    gen = Amiral.Generator(GRAINE)
+    assert lignes == [gen.generate_sentence() for _ in range(12)]
+
+# =============================================================================
+# Serveur HTTP en flux
+# =============================================================================
+
+class _PoolCompte(ThreadPoolExecutor):
+    """Pool de threads qui garde les futures des lots soumis."""
+
+    def __init__(self):
+        super().__init__(max_workers=2)
+        self.futures = []
+
+    def submit(self, *args, **kwargs):
+        future = super().submit(*args, **kwargs)
+        self.futures.append(future)
+        return future
+
+async def _lire_chunks(lecteur):
+    """Corps d'une réponse en Transfer-Encoding: chunked."""
+    corps = bytearray()
+    while True:
+        taille = int((await lecteur.readuntil(b"\r\n"))[:-2], 16)
+        morceau = await lecteur.readexactly(taille + 2)
+        if taille == 0:
+            return bytes(corps)
+        corps += morceau[:-2]
+
+async def _ouvrir_flux(port, cible):
+    lecteur, ecrivain = await asyncio.open_connection("127.0.0.1", port)
+    ecrivain.write(f"GET {cible} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode("latin-1"))
+    entete = await lecteur.readuntil(b"\r\n\r\n")
+    return lecteur, ecrivain, entete
+
+async def _attendre_stable(valeur, delai=0.3, limite=20.0):
+    """Attend que valeur() ne bouge plus pendant `delai` secondes ; la renvoie."""
+    boucle = asyncio.get_running_loop()
+    fin = boucle.time() + limite
+    precedente = valeur()
+    while boucle.time() < fin:
+        await asyncio.sleep(delai)
+        courante = valeur()
+        if courante == precedente:
+            return courante
+        precedente = courante
+    raise AssertionError("valeur toujours en mouvement")
+
+def _taches_clients():
+    return asyncio.all_tasks() - {asyncio.current_task()}
+
+def test_serveur_flux_chunked_egal_generer_plage():
+    async def scenario():
+        serveur = await Amiral.demarrer_serveur(port=0, config={"compteur": True}, taille_lot=7)
+        async with serveur:
+            port = serveur.sockets[0].getsockname()[1]
+            lecteur, ecrivain, entete = await _ouvrir_flux(port, f"/phrases?n=30&seed={GRAINE}&format=lignes")
+            corps = await _lire_chunks(lecteur)
+            ecrivain.close()
+        return entete, corps
+
+    entete, corps = asyncio.run(scenario())
+    assert entete.startswith(b"HTTP/1.1 200 OK\r\n")
+    assert b"Transfer-Encoding: chunked\r\n" in entete
+    assert f"X-Amiral-Seed: {GRAINE}\r\n".encode("latin-1") in entete
+    assert corps.decode("utf-8").splitlines() == Amiral.generer_plage(GRAINE, 0, 30)
+
+def test_serveur_dedup_n_phrases_distinctes():
+    async def scenario():
+        serveur = await Amiral.demarrer_serveur(port=0, taille_lot=7, dedup=1 << 16)
+        async with serveur:
+            port = serveur.sockets[0].getsockname()[1]
+            lecteur, ecrivain, _ = await _ouvrir_flux(port, f"/phrases?n=45&seed={GRAINE}&format=jsonl")
+            corps = await _lire_chunks(lecteur)
+            ecrivain.close()
+        return corps
+
+    lignes = [json.loads(ligne) for ligne in asyncio.run(scenario()).decode("utf-8").splitlines()]
+    assert [ligne["index"] for ligne in lignes] == list(range(45))
+    assert len({ligne["phrase"] for ligne in lignes}) == 45
+
+def test_serveur_contre_pression_et_deconnexion():
+    async def scenario(pool):
+        serveur = await Amiral.demarrer_serveur(port=0, executor=pool, config={"compteur": True}, taille_lot=200)
+        async with serveur:
+            port = serveur.sockets[0].getsockname()[1]
+            lecteur, ecrivain, _ = await _ouvrir_flux(port, f"/phrases?seed={GRAINE}")
+            await lecteur.readuntil(b"\r\n")
+            # Flux infini jamais lu : le serveur s'arrête sur drain(), un lot d'avance au plus
+            soumis = await _attendre_stable(lambda: len(pool.futures))
+            (tache,) = _taches_clients()
+            assert not tache.done()
+            # Client parti au milieu du flux : la connexion se termine sans erreur
+            ecrivain.transport.abort()
+            await asyncio.wait_for(tache, 10)
+            assert not tache.cancelled()
+            await asyncio.sleep(0.3)
+        return soumis
+
+    with _PoolCompte() as pool:
+        soumis = asyncio.run(scenario(pool))
+        assert len(pool.futures) <= soumis + 1
+        assert all(future.done() for future in pool.futures)
+
+def test_serveur_arret_annule_le_client():
+    async def scenario(pool):
+        serveur = await Amiral.demarrer_serveur(port=0, executor=pool, config={"compteur": True}, taille_lot=200)
+        async with serveur:
+            port = serveur.sockets[0].getsockname()[1]
+            lecteur, ecrivain, _ = await _ouvrir_flux(port, f"/phrases?seed={GRAINE}")
+            await lecteur.readuntil(b"\r\n")
+            await _attendre_stable(lambda: len(pool.futures))
+            (tache,) = _taches_clients()
+            tache.cancel()
+            await asyncio.wait([tache], timeout=10)
+            ecrivain.close()
+        return tache
+
+    with _PoolCompte() as pool:
+        tache = asyncio.run(scenario(pool))
+    # L'arrêt est une annulation, pas une fin de connexion ordinaire
+    assert tache.cancelled()